@@ -0,0 +1,216 @@
+"""End-to-end timings of the terminal's main paths against offline fakes.
+
+Times ``refresh_posts``, ``view_post``, comment paging,
+``search_and_summarize`` and the crypto sweep at several fixture sizes,
+with ``FakeReddit`` and ``FakeOpenAI`` standing in for the network. The
+Reddit cache, search index, completion cache and prefetcher are turned off
+so every run measures the same work. Run from the repository root:
+
+    python -m benchmarks.bench_e2e [--sizes small medium] [--output results.json]
+    python -m benchmarks.bench_e2e --compare before.json after.json
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import platform
+import subprocess
+import sys
+import time
+
+from src.config import config
+
+SIZES = {
+    # subreddits, posts per subreddit, comments per post
+    'small': (2, 10, 50),
+    'medium': (4, 25, 500),
+    'large': (8, 50, 2000),
+}
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def configure_offline_run(comments_per_post):
+    config.CACHE_ENABLED = False
+    config.SEARCH_INDEX_ENABLED = False
+    config.AI_CACHE_ENABLED = False
+    config.PREFETCH_ENABLED = False
+    config.SWEEP_INCREMENTAL = False
+    config.USE_AI_FEATURES = True
+    config.OPENAI_API_KEY = config.OPENAI_API_KEY or 'offline-benchmark'
+    # Build whole threads so paging and analysis scale with the fixture.
+    config.COMMENT_TREE_BUDGET = comments_per_post
+
+class BenchmarkFailed(RuntimeError):
+    """A benchmark whose work failed, so its timings mean nothing."""
+
+def check_results(benchmark, results):
+    # search_and_summarize leaves failed posts out, so no results is a failure too.
+    if not results:
+        raise BenchmarkFailed(f"{benchmark}: no results")
+    errors = [result.error for result in results if result.error is not None]
+    if errors:
+        raise BenchmarkFailed(f"{benchmark}: {len(errors)} of {len(results)} results failed, e.g. {errors[0]!r}")
+
+def check_llm_calls(benchmark, llm_calls):
+    if llm_calls <= 0:
+        raise BenchmarkFailed(f"{benchmark}: no LLM calls were made")
+
+def timed(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, timings
+
+def run_size(name, repeat, reddit_latency, llm_latency, completion_tokens):
+    from benchmarks.fakes import FakeOpenAI, FakeReddit, RedditFixture
+    from main import RedditTerminal
+
+    subreddit_count, posts_per_subreddit, comments_per_post = SIZES[name]
+    configure_offline_run(comments_per_post)
+    fixture = RedditFixture.generate(
+        subreddits=[f"bench{i}" for i in range(subreddit_count)],
+        posts_per_subreddit=posts_per_subreddit, comments_per_post=comments_per_post,
+    )
+    reddit = FakeReddit(fixture, latency=reddit_latency)
+    openai = FakeOpenAI(latency=llm_latency, completion_tokens=completion_tokens)
+
+    terminal = RedditTerminal()
+    terminal.reddit_client.reddit = reddit
+    terminal.console_ui.console.file = io.StringIO()
+    terminal.current_subreddit = 'bench0'
+    terminal.post_limit = posts_per_subreddit
+    if terminal.ai_client:
+        terminal.ai_client.client = openai
+
+    results = []
+
+    def record(benchmark, timings, **extra):
+        results.append({
+            'benchmark': benchmark,
+            'size': name,
+            'repeat': len(timings),
+            'min_seconds': min(timings),
+            'mean_seconds': sum(timings) / len(timings),
+            **extra,
+        })
+
+    output = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(output):
+            run_benchmarks(name, repeat, terminal, fixture, openai, record)
+    except Exception:
+        # What the terminal printed usually says why.
+        sys.stderr.write(output.getvalue())
+        raise
+    return results
+
+def run_benchmarks(name, repeat, terminal, fixture, openai, record):
+    from src import search
+    from src.ai_crypto import AIClientCrypto
+    from src.crypto_sweep import CryptoSweep
+
+    subreddit_count, posts_per_subreddit, comments_per_post = SIZES[name]
+    _, timings = timed(terminal.refresh_posts, repeat)
+    record('refresh_posts', timings, posts=posts_per_subreddit)
+
+    _, timings = timed(lambda: terminal.view_post(0), repeat)
+    record('view_post', timings, comments=comments_per_post)
+
+    pages = max(1, terminal.comment_manager.comment_index.visible_count() // 10)
+
+    def page_through():
+        terminal.comment_manager.comment_page = 0
+        for _ in range(pages):
+            terminal.navigate_comments('next')
+
+    _, timings = timed(page_through, repeat)
+    record('comment_paging', timings, pages=pages)
+
+    if terminal.ai_client:
+        search.get_feedback = lambda: 5  # no one is there to type a rating
+        calls = openai.calls
+        summaries, timings = timed(lambda: search.search_and_summarize(terminal.reddit_client, terminal.ai_client, 'bitcoin'), repeat)
+        check_results('search_and_summarize', summaries)
+        check_llm_calls('search_and_summarize', openai.calls - calls)
+        record('search_and_summarize', timings, llm_calls=(openai.calls - calls) // repeat)
+
+    ai_crypto = AIClientCrypto(config.OPENAI_API_KEY)
+    ai_crypto.client = openai
+    calls = openai.calls
+    sweep = lambda: CryptoSweep(terminal.reddit_client, ai_crypto, list(fixture.data),
+                                post_limit=posts_per_subreddit).run()
+    swept, timings = timed(sweep, repeat)
+    check_results('crypto_sweep', swept)
+    check_llm_calls('crypto_sweep', openai.calls - calls)
+    record('crypto_sweep', timings, posts=subreddit_count * posts_per_subreddit,
+           llm_calls=(openai.calls - calls) // repeat)
+
+def compare(before_path, after_path):
+    with open(before_path) as f:
+        before = {(r['benchmark'], r['size']): r for r in json.load(f)['results']}
+    with open(after_path) as f:
+        after = json.load(f)['results']
+    rows = []
+    for result in after:
+        old = before.get((result['benchmark'], result['size']))
+        if old is None:
+            continue
+        rows.append({
+            'benchmark': result['benchmark'],
+            'size': result['size'],
+            'before_seconds': old['min_seconds'],
+            'after_seconds': result['min_seconds'],
+            'ratio': round(result['min_seconds'] / old['min_seconds'], 3) if old['min_seconds'] else None,
+        })
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=['small', 'medium'])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--reddit-latency', type=float, default=0.0, help="seconds per fake Reddit request")
+    parser.add_argument('--llm-latency', type=float, default=0.2, help="seconds per fake OpenAI request")
+    parser.add_argument('--completion-tokens', type=int, default=300)
+    parser.add_argument('--output', metavar='PATH', help="also write the results to this file")
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help="compare two result files instead of running")
+    args = parser.parse_args()
+
+    if args.compare:
+        print(json.dumps(compare(*args.compare), indent=2))
+        return
+
+    results = []
+    for size in args.sizes:
+        try:
+            results.extend(run_size(size, args.repeat, args.reddit_latency, args.llm_latency, args.completion_tokens))
+        except BenchmarkFailed as e:
+            sys.exit(f"Benchmark failed at size {size}: {e}")
+    report = json.dumps({
+        'revision': git_revision(),
+        'python': platform.python_version(),
+        'created_utc': time.time(),
+        'settings': {
+            'repeat': args.repeat,
+            'reddit_latency': args.reddit_latency,
+            'llm_latency': args.llm_latency,
+            'completion_tokens': args.completion_tokens,
+        },
+        'results': results,
+    }, indent=2)
+    print(report)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(report + "\n")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,70 @@
+"""Compare first-come truncation with extractive selection of comments at several token budgets.
+
+Builds a thread about ``--topics`` subjects, each with its own vocabulary,
+where the first comments are all about the same subject and upvotes are
+spread over every subject. For each budget it reports how many subjects
+and what share of the upvotes the comments sent to the LLM cover, and how
+long the selection took. Run from the repository root (needs NumPy and
+scikit-learn; without tiktoken's encoding, tokens are estimated):
+
+    python -m benchmarks.bench_extractive [--comments 2000] [--budgets 500 1000 2000]
+"""
+
+import argparse
+import json
+import random
+import re
+import time
+
+from src.config import config
+
+def build_thread(count, topics, seed=0):
+    rng = random.Random(seed)
+    vocabularies = [["".join(rng.choices("abcdefghijklmnopqrstuvwxyz", k=rng.randint(4, 8))) for _ in range(40)]
+                    for _ in range(topics)]
+    comments, scores, labels = [], [], []
+    for i in range(count):
+        # Early comments pile onto the first subject, as they do under a post.
+        topic = 0 if i < count // 4 else rng.randrange(topics)
+        sentences = [" ".join(rng.choices(vocabularies[topic], k=rng.randint(6, 16))) + "."
+                     for _ in range(rng.randint(1, 3))]
+        comments.append(" ".join(sentences))
+        scores.append(int(rng.paretovariate(1.2)) - 1)
+        labels.append(topic)
+    return comments, scores, labels
+
+def coverage(selected, comments, scores, labels):
+    # A comment counts as covered when any of its sentences was sent.
+    sources = {sentence: i for i, comment in enumerate(comments) for sentence in re.split(r"(?<=\.)\s+", comment)}
+    covered = {sources[sentence] for text in selected for sentence in re.split(r"(?<=\.)\s+", text)}
+    total_score = sum(max(score, 0) for score in scores) or 1
+    return {
+        'topics': len({labels[i] for i in covered}),
+        'upvote_share': round(sum(max(scores[i], 0) for i in covered) / total_score, 3),
+    }
+
+def main():
+    from src.ai_analysis import AIClient
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--comments', type=int, default=2000)
+    parser.add_argument('--topics', type=int, default=12)
+    parser.add_argument('--budgets', type=int, nargs='+', default=[500, 1000, 2000])
+    args = parser.parse_args()
+
+    config.COMMENT_DEDUP_ENABLED = False
+    comments, scores, labels = build_thread(args.comments, args.topics)
+    client = AIClient.__new__(AIClient)  # only the local selection helpers are used
+    rows = []
+    for budget in args.budgets:
+        row = {'budget_tokens': budget}
+        for mode in ('truncate', 'extractive'):
+            start = time.perf_counter()
+            selected = client.select_comments(comments, budget, scores, mode=mode)
+            row[mode] = {**coverage(selected, comments, scores, labels),
+                         'ms': round((time.perf_counter() - start) * 1000, 1)}
+        rows.append(row)
+    print(json.dumps({'comments': args.comments, 'topics': args.topics, 'results': rows}, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+"""Memory used by 100k comments as ``Comment`` objects vs. a ``CommentStore``.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_models [--comments 100000]
+"""
+
+import argparse
+import json
+import random
+import tracemalloc
+
+from src.models import Comment, CommentStore
+
+def build_tree(count, seed=0):
+    rng = random.Random(seed)
+    authors = [f"user_{i}" for i in range(max(1, count // 20))]
+    roots = []
+    open_comments = []
+    for i in range(count):
+        depth_parent = rng.choice(open_comments) if open_comments and rng.random() < 0.7 else None
+        depth = depth_parent.depth + 1 if depth_parent else 0
+        comment = Comment(rng.choice(authors), rng.randint(-50, 5000), "lorem ipsum dolor sit amet " * rng.randint(1, 8), depth, f"c{i:07x}")
+        if depth_parent:
+            depth_parent.children.append(comment)
+        else:
+            roots.append(comment)
+        if depth < 8:
+            open_comments.append(comment)
+    return roots
+
+def measure(factory):
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    result = factory()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return result, after - before
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--comments', type=int, default=100_000)
+    args = parser.parse_args()
+
+    tree, tree_bytes = measure(lambda: build_tree(args.comments))
+    store, store_bytes = measure(lambda: CommentStore.from_tree(tree))
+    del tree
+
+    print(json.dumps({
+        'comments': args.comments,
+        'objects_bytes': tree_bytes,
+        'store_bytes': store_bytes,
+        'store_nbytes_estimate': store.nbytes(),
+        'objects_bytes_per_comment': round(tree_bytes / args.comments, 1),
+        'store_bytes_per_comment': round(store_bytes / args.comments, 1),
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
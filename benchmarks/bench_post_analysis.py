@@ -0,0 +1,76 @@
+"""Time the per-section ``extract_*`` functions against ``extract_sections``.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_post_analysis [--comments 10000] [--repeat 5]
+"""
+
+import argparse
+import json
+import random
+import timeit
+
+from src.post_analysis import (
+    SECTION_CAPS, extract_summary, extract_ideas, extract_insights, extract_quotes, extract_habits,
+    extract_facts, extract_references, extract_one_sentence_takeaway, extract_recommendations,
+    extract_sections, format_sections
+)
+
+WORDS = ("the market is up today and I think that the best approach is to hold for a while "
+         "because nobody knows what happens next with these prices").split()
+KEYWORDS = ['habit', 'fact', 'reference', 'recommendation']
+
+def build_comments(count, keyword_rate, seed=0):
+    rng = random.Random(seed)
+    comments = []
+    for _ in range(count):
+        sentences = []
+        for _ in range(rng.randint(1, 6)):
+            words = rng.choices(WORDS, k=rng.randint(4, 20))
+            if rng.random() < keyword_rate:
+                words.insert(rng.randrange(len(words)), rng.choice(KEYWORDS))
+            sentences.append(" ".join(words))
+        comments.append(". ".join(sentences) + ".")
+    return comments
+
+def separate_passes(title, content, comments):
+    ideas = extract_ideas(comments)
+    return {
+        'summary': extract_summary(title, content),
+        'ideas': ideas[:SECTION_CAPS['ideas']],
+        'insights': extract_insights(ideas)[:SECTION_CAPS['insights']],
+        'quotes': extract_quotes(comments)[:SECTION_CAPS['quotes']],
+        'habits': extract_habits(comments)[:SECTION_CAPS['habits']],
+        'facts': extract_facts(comments)[:SECTION_CAPS['facts']],
+        'references': extract_references(comments)[:SECTION_CAPS['references']],
+        'takeaway': extract_one_sentence_takeaway(title, content),
+        'recommendations': extract_recommendations(comments)[:SECTION_CAPS['recommendations']],
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--comments', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    title, content = "Benchmark thread", "What is everyone doing with their portfolio this week?"
+    results = {'comments': args.comments}
+    # Keywords are common in the first case, so every section fills early. In
+    # the second they are rare and the single pass has to read every comment.
+    for label, keyword_rate in (('common_keywords', 0.05), ('rare_keywords', 0.0005)):
+        comments = build_comments(args.comments, keyword_rate)
+        expected = format_sections(separate_passes(title, content, comments))
+        assert format_sections(extract_sections(title, content, comments)) == expected
+
+        separate = min(timeit.repeat(lambda: separate_passes(title, content, comments), number=1, repeat=args.repeat))
+        single = min(timeit.repeat(lambda: extract_sections(title, content, comments), number=1, repeat=args.repeat))
+        results[label] = {
+            'separate_ms': round(separate * 1000, 2),
+            'single_pass_ms': round(single * 1000, 2),
+            'speedup': round(separate / single, 1),
+        }
+
+    print(json.dumps(results, indent=2))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,177 @@
+"""Compare the ways of reading a thread without API credentials, on saved pages.
+
+Renders one generated thread as an old-reddit HTML page and as the
+``/comments/<id>.json`` document Reddit serves for it, saves both under
+``--fixtures`` (or reads the pages already there), then times turning each
+into comments: the original ``scrape_comments``, the current one on
+BeautifulSoup's ``html.parser`` and on lxml, and the JSON tree builder.
+Only parsing is timed; nothing touches the network. Run from the
+repository root (the HTML rows need beautifulsoup4, the lxml row lxml):
+
+    python -m benchmarks.bench_scrape [--comments 500] [--fixtures DIR] [--repeat 5]
+"""
+
+import argparse
+import html
+import json
+import os
+import tempfile
+import timeit
+
+from benchmarks.fakes import RedditFixture
+
+def _thing_html(comment, post_id):
+    author = (f'<a href="https://old.reddit.com/user/{comment["author"]}" class="author may-blank">'
+              f'{comment["author"]}</a>' if comment['author'] else '<span class="author">[deleted]</span>')
+    children = "".join(_thing_html(reply, post_id) for reply in comment['replies'])
+    paragraphs = "".join(f"<p>{html.escape(part)}.</p>" for part in comment['body'].split(". ") if part)
+    return (
+        f'<div class="thing id-t1_{comment["id"]} noncollapsed comment" id="thing_t1_{comment["id"]}" '
+        f'data-fullname="t1_{comment["id"]}" data-type="comment" data-permalink="/comments/{post_id}/_/{comment["id"]}/">'
+        f'<p class="parent"><a name="{comment["id"]}"></a></p>'
+        f'<div class="midcol unvoted"><div class="arrow up login-required" role="button"></div>'
+        f'<div class="arrow down login-required" role="button"></div></div>'
+        f'<div class="entry unvoted"><p class="tagline">{author}'
+        f'<span class="score dislikes" title="{comment["score"] - 1}">{comment["score"] - 1} points</span>'
+        f'<span class="score unvoted" title="{comment["score"]}">{comment["score"]}</span>'
+        f'<span class="score likes" title="{comment["score"] + 1}">{comment["score"] + 1} points</span>'
+        f'<time class="live-timestamp" datetime="{comment["created_utc"]}">1 hour ago</time></p>'
+        f'<form class="usertext"><div class="usertext-body may-blank-within md-container">'
+        f'<div class="md">{paragraphs}</div></div></form>'
+        f'<ul class="flat-list buttons"><li class="first"><a class="bylink" rel="nofollow">permalink</a></li>'
+        f'<li><a class="reply-button" role="button">reply</a></li></ul></div>'
+        f'<div class="child"><div class="sitetable listing">{children}</div></div>'
+        f'<div class="clearleft"></div></div>'
+    )
+
+def render_html(post, comments):
+    body = "".join(_thing_html(comment, post['id']) for comment in comments)
+    return (
+        f'<!doctype html><html><head><title>{html.escape(post["title"])}</title></head><body>'
+        f'<div class="content" role="main"><div class="sitetable linklisting"></div>'
+        f'<div class="commentarea"><div class="sitetable nestedlisting">{body}</div></div></div>'
+        f'</body></html>'
+    )
+
+def _thing_json(comment, post_id, parent_fullname, subreddit):
+    fullname = f"t1_{comment['id']}"
+    replies = [_thing_json(reply, post_id, fullname, subreddit) for reply in comment['replies']]
+    return {'kind': 't1', 'data': {
+        'id': comment['id'],
+        'name': fullname,
+        'parent_id': parent_fullname,
+        'link_id': f"t3_{post_id}",
+        'author': comment['author'] or '[deleted]',
+        'score': comment['score'],
+        'body': comment['body'],
+        'created_utc': comment['created_utc'],
+        'subreddit': subreddit,
+        'replies': {'kind': 'Listing', 'data': {'children': replies}} if replies else "",
+    }}
+
+def render_json(subreddit, post, comments):
+    listing = {'kind': 'Listing', 'data': {'children': [{'kind': 't3', 'data': {**post, 'subreddit': subreddit}}]}}
+    children = [_thing_json(comment, post['id'], f"t3_{post['id']}", subreddit) for comment in comments]
+    return json.dumps([listing, {'kind': 'Listing', 'data': {'children': children}}])
+
+def save_fixtures(directory, count):
+    """Write thread.html and thread.json for a generated thread of ``count`` comments, unless they exist."""
+    paths = os.path.join(directory, 'thread.html'), os.path.join(directory, 'thread.json')
+    if not all(os.path.exists(path) for path in paths):
+        fixture = RedditFixture.generate(subreddits=('CryptoCurrency',), posts_per_subreddit=1,
+                                         comments_per_post=count)
+        subreddit, post = next(iter(fixture.posts.values()))
+        comments = fixture.comments(post['id'])
+        with open(paths[0], 'w', encoding='utf-8') as f:
+            f.write(render_html(post, comments))
+        with open(paths[1], 'w', encoding='utf-8') as f:
+            f.write(render_json(subreddit, post, comments))
+    return paths
+
+def legacy_scrape(page):
+    # ``scrape_comments`` as it was, minus the request.
+    from bs4 import BeautifulSoup
+    from src.models import Comment
+
+    soup = BeautifulSoup(page, 'html.parser')
+    comments = []
+    for comment in soup.find_all('div', class_='comment'):
+        author = comment.find('a', class_='author').text.strip() if comment.find('a', class_='author') else '[deleted]'
+        score = comment.find('span', class_='score unvoted').text.strip() if comment.find('span', class_='score unvoted') else '0'
+        score = 0 if score == '' else int(score)  # Ensure score is parsed correctly
+        body = comment.find('div', class_='md').text.strip() if comment.find('div', class_='md') else ''
+        depth = len(comment.find_parents('div', class_='comment'))
+        if depth <= 6:  # Limit depth to 6
+            comments.append(Comment(author, score, body, depth))
+    return comments
+
+class _SavedPage:
+    """A session whose every GET returns the saved page."""
+
+    def __init__(self, text):
+        self.text = text
+
+    def get(self, url, **kwargs):
+        return self
+
+def scrape(page, parser):
+    from src.comment_utils import scrape_comments
+
+    return scrape_comments('https://old.reddit.com/saved', session=_SavedPage(page), parser=parser)
+
+def from_json(page, max_comments):
+    # What RedditClient.get_comments does with the public JSON, minus the request and the cache.
+    # It keeps the same levels as the scrapers, so every path returns the same comments.
+    from src.comment_utils import SCRAPE_MAX_DEPTH, walk_comments
+    from src.reddit_client import build_comment_tree
+    from src.reddit_json import parse_comment_listing
+
+    listing, comments = json.loads(page)
+    post_id = listing['data']['children'][0]['data']['id']
+    roots = build_comment_tree(parse_comment_listing(comments), post_id, 0, max_comments,
+                               SCRAPE_MAX_DEPTH + 1, lambda node: node.replies)
+    return list(walk_comments(roots))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--comments', type=int, default=500)
+    parser.add_argument('--fixtures', default=None, help="directory with thread.html and thread.json")
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    directory = args.fixtures or tempfile.mkdtemp(prefix='bench_scrape_')
+    os.makedirs(directory, exist_ok=True)
+    html_path, json_path = save_fixtures(directory, args.comments)
+    with open(html_path, encoding='utf-8') as f:
+        html_page = f.read()
+    with open(json_path, encoding='utf-8') as f:
+        json_page = f.read()
+    # The scrapers have no comment budget, so the JSON path gets one large enough for the whole page.
+    max_comments = json_page.count('"kind": "t1"')
+
+    paths = {
+        'legacy_html': lambda: legacy_scrape(html_page),
+        'html.parser': lambda: scrape(html_page, 'html.parser'),
+        'lxml': lambda: scrape(html_page, 'lxml'),
+        'json': lambda: from_json(json_page, max_comments),
+    }
+    results = {}
+    for name, run in paths.items():
+        try:
+            comments = run()
+        except Exception as e:  # a parser that is not installed
+            results[name] = {'error': f"{type(e).__name__}: {e}"}
+            continue
+        seconds = min(timeit.repeat(run, number=1, repeat=args.repeat))
+        results[name] = {'comments': len(comments), 'ms': round(seconds * 1000, 1)}
+
+    print(json.dumps({
+        'fixtures': directory,
+        'html_bytes': len(html_page.encode()),
+        'json_bytes': len(json_page.encode()),
+        'same_comments': len({result['comments'] for result in results.values() if 'comments' in result}) == 1,
+        'results': results,
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
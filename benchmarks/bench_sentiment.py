@@ -0,0 +1,50 @@
+"""Time per-comment ``TextBlob`` sentiment against the batched lexicon scorer.
+
+Run from the repository root (needs textblob, NumPy and scikit-learn):
+
+    python -m benchmarks.bench_sentiment [--comments 10000] [--repeat 3]
+"""
+
+import argparse
+import json
+import random
+import timeit
+
+from src.sentiment import LexiconSentiment, TextBlobSentiment
+
+WORDS = ("the market looks great today but fees are terrible and I am not happy with the "
+         "awful exchange support though the new wallet is good and fast").split()
+
+def build_comments(count, seed=0):
+    rng = random.Random(seed)
+    return [" ".join(rng.choices(WORDS, k=rng.randint(5, 60))) + "." for _ in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--comments', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    comments = build_comments(args.comments)
+    reference = TextBlobSentiment()
+    batched = LexiconSentiment()
+
+    loop = min(timeit.repeat(lambda: reference.score(comments), number=1, repeat=args.repeat))
+    batch = min(timeit.repeat(lambda: batched.score(comments), number=1, repeat=args.repeat))
+    expected = reference.score(comments)
+    actual = batched.score(comments)
+    differences = [abs(a - b) for a, b in zip(actual.scores, expected.scores)]
+
+    print(json.dumps({
+        'comments': args.comments,
+        'textblob_ms': round(loop * 1000, 1),
+        'vectorized_ms': round(batch * 1000, 1),
+        'speedup': round(loop / batch, 1),
+        'textblob_mean': round(expected.mean, 4),
+        'vectorized_mean': round(actual.mean, 4),
+        # The lexicon scorer skips TextBlob's negation and intensifier rules
+        'mean_abs_difference': round(sum(differences) / len(differences), 4),
+    }, indent=2))
+
+if __name__ == '__main__':
+    main()
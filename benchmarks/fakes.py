@@ -0,0 +1,263 @@
+"""Offline stand-ins for ``praw.Reddit`` and the OpenAI client.
+
+``RedditFixture`` describes subreddits, posts and comment forests as plain
+data. It is generated from a seed (comment forests are built on demand, so
+large fixtures stay small in memory) or loaded from a recorded JSON file.
+``FakeReddit`` serves it through the parts of the PRAW API that
+``RedditClient`` and ``search`` use, and ``FakeOpenAI`` answers chat
+completions after a configurable latency with configurable token counts,
+streaming included.
+"""
+
+import json
+import random
+import time
+from collections import deque
+from praw.models import MoreComments
+
+WORDS = ("bitcoin ethereum market price think people really good bad would could just like know "
+         "time year money buy sell hold long short fees wallet exchange coin new project team "
+         "because actually probably never always still going week".split())
+
+def _text(rng, low, high):
+    return " ".join(rng.choices(WORDS, k=rng.randint(low, high))).capitalize() + "."
+
+class RedditFixture:
+    """Subreddit listings and comment forests for ``FakeReddit``.
+
+    ``data`` maps subreddit name to a list of post dicts. A post either
+    carries its recorded ``comments`` (nested dicts with ``replies``) or a
+    ``comment_count``, in which case a forest of that size is generated from
+    the post id whenever it is requested.
+    """
+
+    def __init__(self, data):
+        self.data = data
+        self.posts = {post['id']: (subreddit, post) for subreddit, posts in data.items() for post in posts}
+
+    @classmethod
+    def generate(cls, subreddits=('CryptoCurrency', 'Bitcoin'), posts_per_subreddit=10, comments_per_post=100, seed=0):
+        rng = random.Random(seed)
+        now = time.time()
+        data = {}
+        for s, subreddit in enumerate(subreddits):
+            data[subreddit] = [{
+                'id': f"p{s:02d}{i:04d}",
+                'title': _text(rng, 4, 14),
+                'selftext': " ".join(_text(rng, 5, 25) for _ in range(rng.randint(0, 4))),
+                'author': f"user_{rng.randrange(1000)}",
+                'score': rng.randint(0, 20000),
+                'num_comments': comments_per_post,
+                'comment_count': comments_per_post,
+                'created_utc': now - rng.randint(0, 86400),
+                'edited': False,
+                'url': f"https://www.reddit.com/r/{subreddit}/comments/p{s:02d}{i:04d}/",
+            } for i in range(posts_per_subreddit)]
+        return cls(data)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def save(self, path, record_comments=False):
+        """Write the fixture as JSON; with ``record_comments`` generated forests are written out too."""
+        data = self.data
+        if record_comments:
+            data = {
+                subreddit: [{**post, 'comments': self.comments(post['id'])} for post in posts]
+                for subreddit, posts in self.data.items()
+            }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f)
+
+    def comments(self, post_id):
+        """The comment forest of ``post_id`` as nested dicts."""
+        _, post = self.posts[post_id]
+        if 'comments' in post:
+            return post['comments']
+        rng = random.Random(post_id)
+        roots = []
+        open_comments = []
+        for i in range(post.get('comment_count', 0)):
+            parent = rng.choice(open_comments) if open_comments and rng.random() < 0.6 else None
+            comment = {
+                'id': f"{post_id}c{i:05d}",
+                'author': None if rng.random() < 0.02 else f"user_{rng.randrange(5000)}",
+                'score': rng.randint(-20, 3000),
+                'body': " ".join(_text(rng, 4, 30) for _ in range(rng.randint(1, 4))),
+                'created_utc': post['created_utc'] + rng.randint(0, 86400),
+                'replies': [],
+            }
+            (parent['replies'] if parent else roots).append(comment)
+            if len(open_comments) < 200:
+                open_comments.append(comment)
+        return roots
+
+class _Author:
+    def __init__(self, name):
+        self.name = name
+
+class _Subreddit:
+    def __init__(self, reddit, name):
+        self._reddit = reddit
+        self.display_name = name
+
+    def __str__(self):
+        return self.display_name
+
+    def _listing(self, limit):
+        self._reddit._request()
+        if self.display_name.lower() == 'all':
+            posts = [post for posts in self._reddit.fixture.data.values() for post in posts]
+        else:
+            posts = self._reddit.fixture.data.get(self.display_name.replace('r/', ''), [])
+        return [self._reddit.submission(id=post['id']) for post in posts[:limit]]
+
+    def hot(self, limit=10):
+        return iter(self._listing(limit))
+
+    def new(self, limit=10):
+        return iter(self._listing(limit))
+
+    def top(self, limit=10):
+        return iter(self._listing(limit))
+
+    def search(self, query, time_filter='all', limit=50):
+        terms = query.lower().split()
+        return iter([
+            submission for submission in self._listing(None)
+            if any(term in submission.title.lower() for term in terms)
+        ][:limit])
+
+class FakeComment:
+    def __init__(self, reddit, submission, data, parent_fullname):
+        self.id = data['id']
+        self.name = f"t1_{self.id}"
+        self.parent_id = parent_fullname
+        self.author = _Author(data['author']) if data['author'] else None
+        self.score = data['score']
+        self.body = data['body']
+        self.created_utc = data['created_utc']
+        self.subreddit = submission.subreddit
+        self.replies = FakeCommentForest([FakeComment(reddit, submission, reply, self.name) for reply in data['replies']])
+
+class FakeCommentForest(list):
+    def replace_more(self, limit=32):
+        self[:] = [node for node in self if not isinstance(node, MoreComments)]
+        for node in self:
+            node.replies.replace_more(limit)
+        return []
+
+    def list(self):
+        comments = []
+        queue = deque(self)
+        while queue:
+            node = queue.popleft()
+            comments.append(node)
+            if not isinstance(node, MoreComments):
+                queue.extend(node.replies)
+        return comments
+
+class FakeSubmission:
+    def __init__(self, reddit, subreddit, data):
+        self._reddit = reddit
+        self._fetched = False
+        self._comments = None
+        self.comment_limit = 2048
+        self.id = data['id']
+        self.name = f"t3_{self.id}"
+        self.title = data['title']
+        self.selftext = data['selftext']
+        self.author = _Author(data['author']) if data['author'] else None
+        self.score = data['score']
+        self.num_comments = data['num_comments']
+        self.created_utc = data['created_utc']
+        self.edited = data.get('edited', False)
+        self.url = data['url']
+        self.subreddit = _Subreddit(reddit, subreddit)
+
+    @property
+    def comments(self):
+        if self._comments is None:
+            self._reddit._request()
+            self._fetched = True
+            self._comments = FakeCommentForest(
+                FakeComment(self._reddit, self, data, self.name) for data in self._reddit.fixture.comments(self.id)
+            )
+        return self._comments
+
+class FakeReddit:
+    """Serves a ``RedditFixture`` through the PRAW calls ``RedditClient`` makes.
+
+    Every request (listing, comment thread, ``info`` batch) sleeps for
+    ``latency`` seconds and is counted in ``requests``.
+    """
+
+    def __init__(self, fixture, latency=0.0):
+        self.fixture = fixture
+        self.latency = latency
+        self.requests = 0
+        self.front = _Subreddit(self, 'all')
+
+    def _request(self):
+        self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def subreddit(self, name):
+        return _Subreddit(self, name)
+
+    def submission(self, id):
+        subreddit, data = self.fixture.posts[id]
+        return FakeSubmission(self, subreddit, data)
+
+    def info(self, fullnames):
+        self._request()
+        return iter([self.submission(id=fullname.split('_', 1)[1]) for fullname in fullnames
+                     if fullname.split('_', 1)[1] in self.fixture.posts])
+
+class _Namespace:
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+class FakeOpenAI:
+    """Chat completions client that answers after ``latency`` seconds.
+
+    Replies are ``completion_tokens`` words long. Streaming responses spread
+    the latency over the tokens: ``first_token_latency`` before the first
+    chunk, the rest evenly between chunks. ``calls`` counts requests.
+    """
+
+    def __init__(self, latency=0.5, completion_tokens=300, first_token_latency=None):
+        self.latency = latency
+        self.completion_tokens = completion_tokens
+        self.first_token_latency = latency * 0.2 if first_token_latency is None else first_token_latency
+        self.calls = 0
+        self.chat = _Namespace(completions=_Namespace(create=self._create))
+
+    def _reply(self, messages):
+        rng = random.Random(json.dumps(messages, sort_keys=True))
+        words = rng.choices(WORDS, k=self.completion_tokens)
+        prompt_tokens = sum(len(message['content']) for message in messages) // 4
+        return words, _Namespace(prompt_tokens=prompt_tokens, completion_tokens=len(words),
+                                 total_tokens=prompt_tokens + len(words))
+
+    def _create(self, model, messages, stream=False, stream_options=None, **params):
+        self.calls += 1
+        words, usage = self._reply(messages)
+        if stream:
+            return self._stream(words, usage)
+        time.sleep(self.latency)
+        message = _Namespace(role='assistant', content=" ".join(words))
+        return _Namespace(choices=[_Namespace(message=message, finish_reason='stop')], usage=usage, model=model)
+
+    def _stream(self, words, usage):
+        time.sleep(self.first_token_latency)
+        gap = max(self.latency - self.first_token_latency, 0.0) / max(len(words), 1)
+        for i, word in enumerate(words):
+            if i:
+                time.sleep(gap)
+            delta = _Namespace(content=word if i == 0 else " " + word)
+            yield _Namespace(choices=[_Namespace(delta=delta, finish_reason=None)], usage=None)
+        yield _Namespace(choices=[], usage=usage)
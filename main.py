@@ -1,35 +1,73 @@
 # main.py
 
+import time
+_STARTED_AT = time.perf_counter()
+
 from src.reddit_client import RedditClient
-from src.models import Post, Comment
 from src.display import ConsoleUI
-from src.comment_utils import CommentManager, get_comments
-from src.search import search_and_summarize
-from src.ai_analysis import AIClient
+from src.comment_utils import CommentManager, walk_comments
+from src.models import MoreReplies
+from src.search import search_and_summarize, search_local, parse_find_args
 from src.config import config
-from src.ai_crypto import AIClientCrypto, CRYPTO_SUBREDDITS
+from src.crypto_sweep import CryptoSweep, SweepState
+from src.prefetch import Prefetcher
+from src.timing import StartupTimer
+from src.metrics import metrics
+from src.dedup import dedup_stats, prepare_comments
+from rich.markup import escape
 
-import webbrowser
+# The OpenAI, tiktoken and TextBlob based modules are imported on first use
+# (see ai_client / ai_client_crypto) to keep them off the startup path.
 
 def open_in_browser(url):
+    import webbrowser
     webbrowser.open(url, new=2)
 
 class RedditTerminal:
-    def __init__(self):
+    def __init__(self, timer=None):
+        self.timer = timer
         self.reddit_client = RedditClient()
         self.console_ui = ConsoleUI()
         self.comment_manager = CommentManager()
-        self.ai_client = AIClient(config.OPENAI_API_KEY) if config.USE_AI_FEATURES else None
-        self.ai_client_crypto = AIClientCrypto(config.OPENAI_API_KEY) if config.USE_AI_FEATURES else None
+        self.prefetcher = Prefetcher(self.reddit_client) if config.PREFETCH_ENABLED and not self.reddit_client.offline else None
+        self._ai_client = None
+        self._ai_client_crypto = None
         self.current_subreddit = config.DEFAULT_SUBREDDIT
         self.current_posts = []
         self.post_limit = config.DEFAULT_POST_LIMIT
         self.post_sort_method = config.DEFAULT_POST_SORT
         self.selected_post_index = None
+        if self.timer:
+            self.timer.mark("RedditTerminal.__init__")
+
+    @property
+    def ai_client(self):
+        if self._ai_client is None and config.USE_AI_FEATURES:
+            from src.ai_analysis import AIClient
+            self._ai_client = AIClient(config.OPENAI_API_KEY)
+        return self._ai_client
+
+    @property
+    def ai_client_crypto(self):
+        if self._ai_client_crypto is None and config.USE_AI_FEATURES:
+            from src.ai_crypto import AIClientCrypto
+            self._ai_client_crypto = AIClientCrypto(config.OPENAI_API_KEY)
+        return self._ai_client_crypto
 
     def refresh_posts(self):
         self.current_posts = self.reddit_client.get_posts(self.current_subreddit, self.post_sort_method, self.post_limit)
         self.console_ui.display_posts(self.current_posts)
+        if self.prefetcher:
+            self.prefetcher.schedule(self.current_posts)
+
+    def show_posts(self):
+        # Going back re-renders the listing we have, refreshing scores and
+        # comment counts in one batched request instead of re-downloading it.
+        if not self.current_posts:
+            self.refresh_posts()
+            return
+        self.reddit_client.hydrate_posts(self.current_posts)
+        self.console_ui.display_posts(self.current_posts)
 
     def change_subreddit(self, new_subreddit: str):
         self.current_subreddit = new_subreddit if new_subreddit else None
@@ -52,17 +90,20 @@ class RedditTerminal:
     def view_post(self, post_index):
         if 0 <= post_index < len(self.current_posts):
             post = self.current_posts[post_index]
+            # Taken first: a prefetch still running for this post is waited for, not duplicated.
+            comments = self.prefetcher.take(post.id) if self.prefetcher else None
             post = self.reddit_client.get_post_content(post)  # Fetch the post content
-            comments = self.reddit_client.get_comments(post)  # Fetch comments
+            if comments is None:
+                comments = self.reddit_client.get_comments(post)  # Fetch comments
             self.comment_manager.current_comments = comments
             self.comment_manager.comment_page = 0
             self.selected_post_index = post_index
-            self.console_ui.display_post_and_comments(post, self.comment_manager.current_comments, self.comment_manager.comment_page)
+            self.console_ui.display_post_and_comments(post, self.comment_manager.comment_index, self.comment_manager.comment_page)
         else:
             print(f"Invalid post number. Please enter a number between 1 and {len(self.current_posts)}.")
 
     def display_post_and_comments(self, post):
-        self.console_ui.display_post_and_comments(post, self.comment_manager.current_comments, self.comment_manager.comment_page)
+        self.console_ui.display_post_and_comments(post, self.comment_manager.comment_index, self.comment_manager.comment_page)
 
     def navigate_comments(self, direction):
         if direction == 'next':
@@ -71,13 +112,27 @@ class RedditTerminal:
             self.comment_manager.comment_page -= 1
         self.display_post_and_comments(self.current_posts[self.selected_post_index])
 
+    def toggle_comment(self, action, comment_number):
+        if self.selected_post_index is None:
+            print("No post selected. Please select a post first.")
+            return
+        try:
+            comment = self.comment_manager.find_comment(comment_number)
+        except ValueError:
+            comment = None
+        if action == 'expand' and isinstance(comment, MoreReplies):
+            replies = self.reddit_client.expand_more(comment)
+            self.comment_manager.replace_placeholder(comment, replies)
+        else:
+            self.comment_manager.toggle_comment(action, comment_number)
+        self.display_post_and_comments(self.current_posts[self.selected_post_index])
+
     def analyze_specific_post(self, post_index):
         if 0 <= post_index < len(self.current_posts):
             post = self.current_posts[post_index]
             post = self.reddit_client.get_post_content(post)  # Fetch the post content
             comments = self.comment_manager.current_comments
-            analysis = self.perform_analysis(post, comments)
-            print(f"\nDetailed Analysis of '{post.title}':\n{analysis}")
+            self.show_analysis(post, comments)
         else:
             print(f"Invalid post number. Please enter a number between 1 and {len(self.current_posts)}.")
 
@@ -86,21 +141,35 @@ class RedditTerminal:
             post = self.current_posts[self.selected_post_index]
             post = self.reddit_client.get_post_content(post)  # Fetch the post content
             comments = self.comment_manager.current_comments
-            analysis = self.perform_analysis(post, comments)
-            print(f"\nDetailed Analysis of '{post.title}':\n{analysis}")
+            self.show_analysis(post, comments)
         else:
             print("No post selected. Please select a post first.")
 
-    def perform_analysis(self, post, comments):
+    def show_analysis(self, post, comments):
+        title = f"\nDetailed Analysis of '{post.title}':\n"
+        if not (self.ai_client and config.STREAM_AI_OUTPUT):
+            print(f"{title}{self.perform_analysis(post, comments)}")
+            return
+        with self.console_ui.stream_markdown(escape(title)) as stream:
+            self.perform_analysis(post, comments, stream=stream)
+
+    def perform_analysis(self, post, comments, stream=None):
         if self.ai_client:
-            comment_texts = [comment.body for comment in comments if hasattr(comment, 'body')]
-            input_text = f"Post Title: {post.title}\n\nPost Content: {post.selftext}\n\nComments:\n" + "\n".join(comment_texts)
-            
-            # Truncate input text to fit within token limit
-            max_tokens = 8192 - 500  # Leave some buffer for prompt and response
-            input_text = input_text[:max_tokens]
-
-            analysis = self.ai_client.system_command(input_text)
+            comments = list(walk_comments(comments))
+            comment_texts = [comment.body for comment in comments]
+            if config.ANALYSIS_MODE == 'chunked':
+                try:
+                    return self.ai_client.map_reduce_analysis(post.title, post.selftext, comment_texts, stream=stream)
+                except ValueError as e:
+                    return f"Error in analysis: {e}"  # misconfigured chunk sizes
+            if config.ANALYSIS_MODE == 'extractive':
+                return self.ai_client.extractive_analysis(post.title, post.selftext, comment_texts,
+                                                          [comment.score for comment in comments], stream=stream)
+
+            input_text = f"Post Title: {post.title}\n\nPost Content: {post.selftext}\n\nComments:\n" + "\n".join(prepare_comments(comment_texts))
+            # Truncate input text to fit within the token budget for the prompt
+            input_text = self.ai_client.truncate_text(input_text, config.ANALYSIS_INPUT_TOKENS)
+            analysis = self.ai_client.system_command(input_text, stream=stream)
             return analysis
         else:
             return "AI analysis is not enabled. Please check your configuration."
@@ -110,32 +179,49 @@ class RedditTerminal:
         if 0 <= post_index < len(self.current_posts):
             post = self.current_posts[post_index]
             post = self.reddit_client.get_post_content(post)  # Fetch the post content
-            comments = [comment.body for comment in self.comment_manager.current_comments]
+            comments = prepare_comments(comment.body for comment in walk_comments(self.comment_manager.current_comments))
             input_text = f"Post: {post.title}\n{post.selftext}\n\nComments:\n" + "\n".join(comments)
-            analysis = self.ai_client_crypto.system_command(input_text)
-            print(f"\nDetailed Crypto Analysis of '{post.title}':\n{analysis}")
+            title = f"\nDetailed Crypto Analysis of '{post.title}':\n"
+            if config.STREAM_AI_OUTPUT:
+                with self.console_ui.stream_markdown(escape(title)) as stream:
+                    self.ai_client_crypto.system_command(input_text, stream=stream)
+            else:
+                analysis = self.ai_client_crypto.system_command(input_text)
+                print(f"{title}{analysis}")
         else:
             print(f"Invalid post number. Please enter a number between 1 and {len(self.current_posts)}.")
 
     def search_and_analyze_crypto(self):
+        from src.ai_crypto import CRYPTO_SUBREDDITS
+        if not self.ai_client_crypto:
+            print("AI features are not enabled.")
+            return
+        state = SweepState.open() if config.SWEEP_INCREMENTAL else None
+        sweep = CryptoSweep(self.reddit_client, self.ai_client_crypto, CRYPTO_SUBREDDITS,
+                            post_limit=self.post_limit, sort=self.post_sort_method, state=state)
         report = []
-        for subreddit in CRYPTO_SUBREDDITS:
-            print(f"\nAnalyzing subreddit: {subreddit}\n")
-            self.change_subreddit(subreddit)
-            self.refresh_posts()
-            for i, post in enumerate(self.current_posts):
-                self.view_post(i)
-                comments = [comment.body for comment in self.comment_manager.current_comments]
-                input_text = f"Post: {post.title}\n{post.selftext}\n\nComments:\n" + "\n".join(comments)
-                analysis = self.ai_client_crypto.system_command(input_text)
-                report.append(f"\n### {post.title} ({subreddit})\n{analysis}\n")
+
+        def collect(result):
+            print(f"{'Unchanged' if result.reused else 'Analyzed'}: {result.post.title} ({result.subreddit})")
+            report.append(result.to_markdown())
+
+        sweep.run(on_result=collect)
         print("\nFinal Crypto Report:\n")
         print("\n".join(report))
         with open('crypto_report.md', 'w') as f:
             f.write("\n".join(report))
 
     def run(self):
-        self.refresh_posts()
+        if self.timer:
+            self.current_posts = self.reddit_client.get_posts(self.current_subreddit, self.post_sort_method, self.post_limit)
+            self.timer.mark("first listing fetched")
+            self.console_ui.display_posts(self.current_posts)
+            self.timer.mark("first listing rendered")
+            if self.prefetcher:
+                self.prefetcher.schedule(self.current_posts)
+            self.console_ui.display_startup_timing(self.timer.report())
+        else:
+            self.refresh_posts()
 
         while True:
             self.console_ui.print_status(self.current_subreddit, self.post_sort_method, self.post_limit)
@@ -160,12 +246,11 @@ class RedditTerminal:
             elif command[0] == 'p':
                 self.navigate_comments('prev')
             elif command[0] == 'b':
-                self.refresh_posts()
+                self.show_posts()
             elif command[0] == 'o':
                 self.open_current_post_in_browser()
             elif command[0] in ['e', 'c']:
-                self.comment_manager.toggle_comment('expand' if command[0] == 'e' else 'collapse', command[1] if len(command) > 1 else '')
-                self.display_post_and_comments(self.current_posts[self.selected_post_index])
+                self.toggle_comment('expand' if command[0] == 'e' else 'collapse', command[1] if len(command) > 1 else '')
             elif command[0] == 'sort' and len(command) > 1:
                 if self.comment_manager.change_comment_sort(command[1]):
                     self.display_post_and_comments(self.current_posts[self.selected_post_index])
@@ -175,6 +260,12 @@ class RedditTerminal:
             elif command[0] == 's':
                 query = ' '.join(command[1:]) if len(command) > 1 else input("Enter your search query: ")
                 search_and_summarize(self.reddit_client, self.ai_client, query, self.current_subreddit)
+            elif command[0] == 'find':
+                query, filters = parse_find_args(command[1:])
+                if not query:
+                    query = input("Enter your search query: ")
+                hits, seconds = search_local(self.reddit_client.index, query, **filters)
+                self.console_ui.display_search_hits(query, hits, seconds)
             elif command[0] == 'analyze':
                 if self.selected_post_index is not None:
                     self.analyze_current_post()
@@ -188,6 +279,19 @@ class RedditTerminal:
                         print("Please provide a valid post number to analyze.")
                 else:
                     print("AI features are not enabled.")
+            elif command[0] == 'cache':
+                if len(command) > 1 and command[1] == 'clear' and self.reddit_client.cache:
+                    self.reddit_client.cache.clear()
+                    print("Cache cleared.")
+                else:
+                    self.console_ui.display_cache_stats(self.reddit_client.cache_stats())
+                    self.console_ui.display_index_stats(self.reddit_client.index.stats() if self.reddit_client.index else None)
+                    completion_cache = self._ai_client.completion_cache if self._ai_client else None
+                    self.console_ui.display_completion_cache_stats(completion_cache.stats() if completion_cache else None)
+            elif command[0] == 'stats':
+                self.console_ui.display_metrics(metrics.snapshot())
+                self.console_ui.display_scheduler_stats(self.reddit_client.scheduler_stats())
+                self.console_ui.display_dedup_stats(dedup_stats.stats() if config.COMMENT_DEDUP_ENABLED else None)
             elif command[0] == 'analyze_crypto':
                 if len(command) > 1 and command[1].isdigit():
                     self.analyze_crypto_post(int(command[1]) - 1)
@@ -204,5 +308,19 @@ class RedditTerminal:
             print("No post selected or URL available.")
 
 if __name__ == "__main__":
-    reddit_terminal = RedditTerminal()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Browse Reddit from the terminal.")
+    parser.add_argument('--timing', action='store_true', help="print a startup timing report after the first listing")
+    args = parser.parse_args()
+
+    if config.METRICS_DUMP_PATH:
+        import atexit
+        atexit.register(metrics.dump, config.METRICS_DUMP_PATH, config.METRICS_DUMP_FORMAT)
+
+    timer = None
+    if args.timing:
+        timer = StartupTimer(_STARTED_AT)
+        timer.mark("imports")
+    reddit_terminal = RedditTerminal(timer=timer)
     reddit_terminal.run()
\ No newline at end of file
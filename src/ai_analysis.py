@@ -1,42 +1,33 @@
 # ai_analysis.py
-import tiktoken
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from openai import OpenAI
-from .post_analysis import (
-    extract_summary, extract_ideas, extract_insights, extract_quotes, extract_habits, 
-    extract_facts, extract_references, extract_one_sentence_takeaway, extract_recommendations
-)
+from .completions import complete, default_completion_cache
+from .config import config
+from .dedup import prepare_comments, prepare_scored_comments
+from .extractive import get_extractive_selector
+from .post_analysis import extract_sections, format_sections
+from .tokens import get_encoder
 
 class AIClient:
-    def __init__(self, api_key):
+    # Bump a template's version whenever its prompt text changes so stale
+    # cached completions are not reused.
+    PROMPT_VERSIONS = {'system_command': 1, 'summarize_comments': 1, 'extract_topics': 1, 'summarize_chunk': 1}
+    # Reduce rounds of map_reduce_analysis before falling back to truncation
+    MAX_REDUCE_ROUNDS = 4
+
+    def __init__(self, api_key, completion_cache=None):
         self.client = OpenAI(api_key=api_key)
         self.conversation_history = []
+        self.completion_cache = completion_cache if completion_cache is not None else default_completion_cache()
 
     def analyze_post(self, post_title, post_content, comments):
-        summary = extract_summary(post_title, post_content)
-        ideas = extract_ideas(comments)
-        insights = extract_insights(ideas)
-        quotes = extract_quotes(comments)
-        habits = extract_habits(comments)
-        facts = extract_facts(comments)
-        references = extract_references(comments)
-        takeaway = extract_one_sentence_takeaway(post_title, post_content)
-        recommendations = extract_recommendations(comments)
-
-        analysis = f"{summary}\n\n"
-        analysis += "IDEAS:\n" + "".join(f"- {idea}\n" for idea in ideas[:25]) + "\n"
-        analysis += "INSIGHTS:\n" + "".join(f"- {insight}\n" for insight in insights[:10]) + "\n"
-        analysis += "QUOTES:\n" + "".join(f"- {quote}\n" for quote in quotes[:20]) + "\n"
-        analysis += "HABITS:\n" + "".join(f"- {habit}\n" for habit in habits[:20]) + "\n"
-        analysis += "FACTS:\n" + "".join(f"- {fact}\n" for fact in facts[:20]) + "\n"
-        analysis += "REFERENCES:\n" + "".join(f"- {reference}\n" for reference in references[:20]) + "\n"
-        analysis += f"{takeaway}\n\n"
-        analysis += "RECOMMENDATIONS:\n" + "".join(f"- {recommendation}\n" for recommendation in recommendations[:20])
+        analysis = format_sections(extract_sections(post_title, post_content, comments))
 
         self.conversation_history.append({"role": "assistant", "content": analysis})
         return analysis
 
-    def system_command(self, input_text):
+    def system_command(self, input_text, bypass_cache=False, stream=None):
         prompt = f"""
         You extract surprising, insightful, and interesting information from text content. You are interested in insights related to the purpose and meaning of life, human flourishing, the role of technology in the future of humanity, artificial intelligence and its effect on humans, memes, learning, reading, books, continuous improvement, and similar topics.
 
@@ -73,25 +64,28 @@ class AIClient:
         {input_text}
         """
 
-        response = self.client.chat.completions.create(
-            model="gpt-4",
-            messages=[
+        analysis = complete(
+            self.client,
+            [
                 {"role": "system", "content": "You are a helpful assistant that extracts detailed insights from text."},
                 {"role": "user", "content": prompt}
             ],
+            'system_command', self.PROMPT_VERSIONS['system_command'],
+            cache=self.completion_cache,
+            bypass_cache=bypass_cache,
+            stream=stream,
+            model="gpt-4",
             max_tokens=3000,
             n=1,
             stop=None,
             temperature=0.7
         )
-
-        analysis = response.choices[0].message.content.strip()
         self.conversation_history.append({"role": "user", "content": input_text})
         self.conversation_history.append({"role": "assistant", "content": analysis})
         return analysis
     
     def truncate_comments(self, comments, max_tokens=2000):
-        encoder = tiktoken.get_encoding("cl100k_base")
+        encoder = get_encoder()
         truncated_comments = []
         token_count = 0
 
@@ -105,8 +99,153 @@ class AIClient:
         logging.info(f"Truncated comments from {len(comments)} to {len(truncated_comments)}")
         return truncated_comments
 
-    def summarize_comments(self, comments, post_title, subreddit):
-        truncated_comments = self.truncate_comments(comments)
+    def select_comments(self, comments, max_tokens=None, comment_scores=None, mode=None):
+        """Fit ``comments`` into ``max_tokens`` the way ``mode`` (COMMENT_SELECTION) says.
+
+        'extractive' keeps the most central, best-scored sentences of the whole
+        thread (see ``ExtractiveSelector``); 'truncate', or a missing NumPy or
+        scikit-learn, keeps the first comments that fit.
+        """
+        max_tokens = max_tokens or config.COMMENT_SELECTION_TOKENS
+        mode = mode or config.COMMENT_SELECTION
+        selector = get_extractive_selector() if mode == 'extractive' else None
+        if selector is None:
+            return self.truncate_comments(comments, max_tokens)
+        encoder = get_encoder()
+        selected = selector.select(comments, max_tokens, lambda texts: [len(tokens) for tokens in encoder.encode_ordinary_batch(texts)],
+                                   scores=comment_scores)
+        logging.info(f"Selected {len(selected)} of {len(comments)} comments by centrality and score")
+        return selected
+
+    def extractive_analysis(self, post_title, post_content, comments, comment_scores=None, input_tokens=None,
+                            bypass_cache=False, stream=None):
+        """``system_command`` on the post and the comment sentences that best fit ``input_tokens``."""
+        input_tokens = input_tokens or config.ANALYSIS_INPUT_TOKENS
+        header = f"Post Title: {post_title}\n\nPost Content: {post_content}\n\nComments:\n"
+        comments, comment_scores = prepare_scored_comments(comments, comment_scores)
+        budget = max(input_tokens - self.count_tokens(header), 1)
+        selected = self.select_comments(comments, budget, comment_scores, mode='extractive')
+        input_text = self.truncate_text(header + "\n".join(selected), input_tokens)
+        return self.system_command(input_text, bypass_cache=bypass_cache, stream=stream)
+
+    def count_tokens(self, text):
+        return len(get_encoder().encode(text))
+
+    def truncate_text(self, text, max_tokens):
+        encoder = get_encoder()
+        tokens = encoder.encode(text)
+        if len(tokens) <= max_tokens:
+            return text
+        logging.info(f"Truncated input from {len(tokens)} to {max_tokens} tokens")
+        return encoder.decode(tokens[:max_tokens])
+
+    def chunk_texts(self, texts, max_tokens):
+        """Pack texts, in order, into newline-joined chunks of at most ``max_tokens`` tokens.
+
+        A single text longer than the budget is split on token boundaries.
+        """
+        encoder = get_encoder()
+        chunks = []
+        current = []
+        current_tokens = 0
+
+        for text in texts:
+            tokens = encoder.encode(text)
+            pieces = [tokens[i:i + max_tokens] for i in range(0, len(tokens), max_tokens)] or [[]]
+            for piece in pieces:
+                # +1 for the newline that joins texts inside a chunk
+                if current and current_tokens + len(piece) + 1 > max_tokens:
+                    chunks.append("\n".join(current))
+                    current, current_tokens = [], 0
+                current.append(text if len(pieces) == 1 else encoder.decode(piece))
+                current_tokens += len(piece) + 1
+
+        if current:
+            chunks.append("\n".join(current))
+        return chunks
+
+    def summarize_chunk(self, chunk, part, total_parts, bypass_cache=False):
+        prompt = f"""
+        The following is part {part} of {total_parts} of a Reddit thread.
+        Summarize it as a dense bulleted list. Keep every distinct idea, fact, habit, reference and
+        recommendation, and copy the most interesting quotes verbatim. Do not add commentary.
+
+        INPUT:
+        {chunk}
+        """
+
+        return complete(
+            self.client,
+            [
+                {"role": "system", "content": "You are a helpful assistant that condenses discussions without losing details."},
+                {"role": "user", "content": prompt}
+            ],
+            'summarize_chunk', self.PROMPT_VERSIONS['summarize_chunk'],
+            cache=self.completion_cache,
+            bypass_cache=bypass_cache,
+            model="gpt-4",
+            max_tokens=config.ANALYSIS_MAP_MAX_TOKENS,
+            temperature=0.3
+        )
+
+    def map_reduce_analysis(self, post_title, post_content, comments, chunk_tokens=None, fanout=None,
+                            input_tokens=None, bypass_cache=False, stream=None):
+        """Analyze a thread of any size with ``system_command``.
+
+        Threads that fit in ``input_tokens`` are sent as-is. Larger ones are split
+        into ``chunk_tokens`` chunks that are summarized in parallel (at most
+        ``fanout`` requests at once); the summaries are reduced again until they
+        fit and then go through the final ``system_command`` call. Only that
+        final call is written to ``stream``. Reducing stops after
+        ``MAX_REDUCE_ROUNDS`` rounds, or as soon as a round fails to cut the
+        number of chunks or tokens; what is left is then truncated.
+        """
+        chunk_tokens = chunk_tokens or config.ANALYSIS_CHUNK_TOKENS
+        fanout = fanout or config.ANALYSIS_FANOUT
+        input_tokens = input_tokens or config.ANALYSIS_INPUT_TOKENS
+        if chunk_tokens <= config.ANALYSIS_MAP_MAX_TOKENS:
+            # Each summary could fill a whole chunk, so reducing would never converge.
+            raise ValueError(f"chunk_tokens ({chunk_tokens}) must be larger than "
+                             f"ANALYSIS_MAP_MAX_TOKENS ({config.ANALYSIS_MAP_MAX_TOKENS})")
+        comments = prepare_comments(comments)
+
+        header = f"Post Title: {post_title}\n\nPost Content: {post_content}"
+        input_text = f"{header}\n\nComments:\n" + "\n".join(comments)
+        if self.count_tokens(input_text) <= input_tokens:
+            return self.system_command(input_text, bypass_cache=bypass_cache, stream=stream)
+
+        texts = [f"Comments:\n{comment}" if i == 0 else comment for i, comment in enumerate(comments)]
+        header_budget = self.count_tokens(header)
+        previous_chunks = None
+        previous_tokens = self.count_tokens("\n".join(texts))
+        for _ in range(self.MAX_REDUCE_ROUNDS):
+            chunks = self.chunk_texts(texts, chunk_tokens)
+            if previous_chunks is not None and len(chunks) >= previous_chunks:
+                logging.warning(f"Reducing did not cut {previous_chunks} chunks; truncating the summaries")
+                break
+            logging.info(f"Summarizing {len(chunks)} chunks of up to {chunk_tokens} tokens")
+            with ThreadPoolExecutor(max_workers=fanout) as executor:
+                texts = list(executor.map(
+                    lambda args: self.summarize_chunk(args[1], args[0], len(chunks), bypass_cache=bypass_cache),
+                    enumerate(chunks, 1)
+                ))
+            summaries = "\n".join(texts)
+            summary_tokens = self.count_tokens(summaries)
+            if len(chunks) == 1 or header_budget + summary_tokens <= input_tokens:
+                break
+            if summary_tokens >= previous_tokens:
+                logging.warning(f"Summaries did not shrink below {previous_tokens} tokens; truncating them")
+                break
+            previous_chunks, previous_tokens = len(chunks), summary_tokens
+        else:
+            logging.warning(f"Summaries still too long after {self.MAX_REDUCE_ROUNDS} rounds; truncating them")
+
+        reduced_input = self.truncate_text(f"{header}\n\nSummarized discussion:\n{summaries}", input_tokens)
+        return self.system_command(reduced_input, bypass_cache=bypass_cache, stream=stream)
+
+    def summarize_comments(self, comments, post_title, subreddit, bypass_cache=False, stream=None, comment_scores=None):
+        comments, comment_scores = prepare_scored_comments(comments, comment_scores)
+        truncated_comments = self.select_comments(comments, comment_scores=comment_scores)
         
         prompt = f"""
         Post Title: {post_title}
@@ -116,25 +255,29 @@ class AIClient:
         """
 
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
+            summary = complete(
+                self.client,
+                [
                     {"role": "system", "content": "You are a helpful assistant that summarizes comments."},
                     {"role": "user", "content": prompt}
                 ],
+                'summarize_comments', self.PROMPT_VERSIONS['summarize_comments'],
+                cache=self.completion_cache,
+                bypass_cache=bypass_cache,
+                stream=stream,
+                model="gpt-4",
                 max_tokens=1000,
                 temperature=0.7
             )
-            
-            summary = response.choices[0].message.content.strip()
             logging.info("Successfully generated summary")
             return summary
         except Exception as e:
             logging.error(f"Error in summarize_comments: {str(e)}")
             return None
 
-    def extract_topics(self, comments):
-        truncated_comments = self.truncate_comments(comments)
+    def extract_topics(self, comments, bypass_cache=False, stream=None, comment_scores=None):
+        comments, comment_scores = prepare_scored_comments(comments, comment_scores)
+        truncated_comments = self.select_comments(comments, comment_scores=comment_scores)
         
         prompt = f"""
         Extract the main topics discussed in the following comments. 
@@ -146,18 +289,21 @@ class AIClient:
         """
 
         try:
-            response = self.client.chat.completions.create(
-                model="gpt-4",
-                messages=[
+            topics = complete(
+                self.client,
+                [
                     {"role": "system", "content": "You are a helpful assistant that extracts topics from comments."},
                     {"role": "user", "content": prompt}
                 ],
+                'extract_topics', self.PROMPT_VERSIONS['extract_topics'],
+                cache=self.completion_cache,
+                bypass_cache=bypass_cache,
+                stream=stream,
+                model="gpt-4",
                 max_tokens=1000,
                 temperature=0.7
             )
-            
-            topics = response.choices[0].message.content.strip()
-            
+
             # Split the topics into a list and clean them up
             topic_list = [topic.split('. ', 1)[-1].strip() for topic in topics.split('\n') if topic.strip()]
             
@@ -1,49 +1,36 @@
 # ai_crypto.py
 
 from openai import OpenAI
-from .post_analysis import (
-    extract_summary, extract_ideas, extract_insights, extract_quotes, extract_habits,
-    extract_facts, extract_references, extract_one_sentence_takeaway, extract_recommendations
-)
-from textblob import TextBlob
+from .completions import complete, default_completion_cache
+from .post_analysis import extract_sections, format_sections
+from .sentiment import score_comments
+from .coins import default_coin_universe
 
 class AIClientCrypto:
-    def __init__(self, api_key):
+    # Bump a template's version whenever its prompt text changes so stale
+    # cached completions are not reused.
+    PROMPT_VERSIONS = {'crypto_system_command': 1}
+
+    def __init__(self, api_key, completion_cache=None):
         self.client = OpenAI(api_key=api_key)
         self.conversation_history = []
+        self.completion_cache = completion_cache if completion_cache is not None else default_completion_cache()
 
-    def analyze_post(self, post_title, post_content, comments):
-        summary = extract_summary(post_title, post_content)
-        ideas = extract_ideas(comments)
-        insights = extract_insights(ideas)
-        quotes = extract_quotes(comments)
-        habits = extract_habits(comments)
-        facts = extract_facts(comments)
-        references = extract_references(comments)
-        takeaway = extract_one_sentence_takeaway(post_title, post_content)
-        recommendations = extract_recommendations(comments)
-        
-        sentiments = [TextBlob(comment).sentiment.polarity for comment in comments]
-        avg_sentiment = sum(sentiments) / len(sentiments) if sentiments else 0
+    def analyze_post(self, post_title, post_content, comments, comment_scores=None):
+        sentiments = score_comments(comments)
 
-        trending_coins = self.identify_trending_coins(comments)
+        trending_coins = self.identify_trending_coins(comments, comment_scores).symbols(weighted=comment_scores is not None)
 
-        analysis = f"{summary}\n\n"
-        analysis += "IDEAS:\n" + "".join(f"- {idea}\n" for idea in ideas[:25]) + "\n"
-        analysis += "INSIGHTS:\n" + "".join(f"- {insight}\n" for insight in insights[:10]) + "\n"
-        analysis += "QUOTES:\n" + "".join(f"- {quote}\n" for quote in quotes[:20]) + "\n"
-        analysis += "HABITS:\n" + "".join(f"- {habit}\n" for habit in habits[:20]) + "\n"
-        analysis += "FACTS:\n" + "".join(f"- {fact}\n" for fact in facts[:20]) + "\n"
-        analysis += "REFERENCES:\n" + "".join(f"- {reference}\n" for reference in references[:20]) + "\n"
-        analysis += f"{takeaway}\n\n"
-        analysis += "RECOMMENDATIONS:\n" + "".join(f"- {recommendation}\n" for recommendation in recommendations[:20]) + "\n"
-        analysis += f"AVERAGE SENTIMENT: {avg_sentiment:.2f}\n"
+        analysis = format_sections(extract_sections(post_title, post_content, comments)) + "\n"
+        analysis += f"AVERAGE SENTIMENT: {sentiments.mean:.2f}\n"
+        if comment_scores is not None:
+            analysis += f"SCORE-WEIGHTED SENTIMENT: {sentiments.weighted_mean(comment_scores):.2f}\n"
         analysis += f"TRENDING COINS: {', '.join(trending_coins)}\n"
 
         self.conversation_history.append({"role": "assistant", "content": analysis})
         return analysis
 
-    def system_command(self, input_text):
+    def system_command(self, input_text, bypass_cache=False, stream=None):
         prompt = f"""
         You extract surprising, insightful, and interesting information from text content, specifically focusing on cryptocurrency and finance. Your goal is to provide insights related to new altcoins, trending coins based on sentiment, and strategies for making money with cryptocurrency.
 
@@ -78,33 +65,29 @@ class AIClientCrypto:
         {input_text}
         """
 
-        response = self.client.chat.completions.create(
-            model="gpt-4",
-            messages=[
+        analysis = complete(
+            self.client,
+            [
                 {"role": "system", "content": "You are a helpful assistant that extracts detailed insights from text."},
                 {"role": "user", "content": prompt}
             ],
+            'crypto_system_command', self.PROMPT_VERSIONS['crypto_system_command'],
+            cache=self.completion_cache,
+            bypass_cache=bypass_cache,
+            stream=stream,
+            model="gpt-4",
             max_tokens=3000,
             n=1,
             stop=None,
             temperature=0.7
         )
-
-        analysis = response.choices[0].message.content.strip()
         self.conversation_history.append({"role": "user", "content": input_text})
         self.conversation_history.append({"role": "assistant", "content": analysis})
         return analysis
 
-    def identify_trending_coins(self, comments):
-        # This is a placeholder implementation
-        coins = ["BTC", "ETH", "DOGE", "ADA", "BNB", "XRP", "SOL", "DOT", "SHIB", "LTC"]
-        mentioned_coins = []
-        for comment in comments:
-            for coin in coins:
-                if coin.lower() in comment.lower():
-                    mentioned_coins.append(coin)
-        trending_coins = list(set(mentioned_coins))
-        return trending_coins
+    def identify_trending_coins(self, comments, comment_scores=None):
+        """Count the coins mentioned in ``comments``; see ``CoinUniverse.count``."""
+        return default_coin_universe().count(comments, comment_scores)
 
 # List of popular cryptocurrency subreddits
 CRYPTO_SUBREDDITS = [
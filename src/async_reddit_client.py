@@ -0,0 +1,247 @@
+# async_reddit_client.py
+
+import asyncio
+import time
+from .cache import DiskCache
+from .config import config
+from .metrics import metrics
+from .models import CommentStore
+from .rate_limit import INTERACTIVE, default_scheduler, retry_after
+from .reddit_client import build_comment_tree
+from .reddit_json import parse_comment_listing, post_from_json, post_index_row, submission_fields_from_json
+from .search_index import SearchIndex
+
+class AsyncRedditClient:
+    """asyncio Reddit client on one pooled, keep-alive aiohttp session.
+
+    Offers the read paths of ``RedditClient`` (``get_posts``,
+    ``get_post_content``, ``get_comments``, ``search``) as coroutines against
+    Reddit's JSON API with application-only OAuth, so many subreddits and
+    submissions can be fetched from one event loop instead of a thread per
+    request. It shares the Reddit cache (same kinds and keys), the search
+    index and the request scheduler with the sync client; ``priority`` is
+    the scheduler class of every request it makes.
+
+    Use it as an async context manager, or call ``close`` when done.
+    """
+
+    OAUTH_URL = 'https://oauth.reddit.com'
+    TOKEN_URL = 'https://www.reddit.com/api/v1/access_token'
+
+    def __init__(self, cache=None, offline=None, index=None, scheduler=None, priority=INTERACTIVE,
+                 max_connections=None, session=None):
+        self.offline = config.OFFLINE_MODE if offline is None else offline
+        if cache is None and config.CACHE_ENABLED:
+            cache = DiskCache(config.CACHE_PATH, config.CACHE_TTLS, config.CACHE_MAX_BYTES)
+        self.cache = cache
+        if index is None and config.SEARCH_INDEX_ENABLED:
+            index = SearchIndex(config.SEARCH_INDEX_PATH)
+        self.index = index
+        self.scheduler = scheduler or default_scheduler()
+        self.priority = priority
+        self.max_connections = max_connections or config.REDDIT_HTTP_MAX_CONNECTIONS
+
+        self._session = session
+        self._owns_session = session is None
+        self._token = None
+        self._token_expires = 0.0
+        self._token_lock = asyncio.Lock()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def close(self):
+        if self._session is not None and self._owns_session:
+            await self._session.close()
+        self._session = None
+
+    def _get_session(self):
+        if self._session is None:
+            import aiohttp  # only the async client needs it
+
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=config.REDDIT_HTTP_TIMEOUT),
+                headers={'User-Agent': config.REDDIT_USER_AGENT or 'reddit-terminal'},
+            )
+        return self._session
+
+    async def _access_token(self, refresh=False):
+        async with self._token_lock:
+            if refresh or self._token is None or time.time() >= self._token_expires:
+                import aiohttp
+
+                async with self._get_session().post(
+                    self.TOKEN_URL, data={'grant_type': 'client_credentials'},
+                    auth=aiohttp.BasicAuth(config.REDDIT_CLIENT_ID or '', config.REDDIT_CLIENT_SECRET or ''),
+                ) as response:
+                    response.raise_for_status()
+                    token = await response.json()
+                if 'access_token' not in token:
+                    raise RuntimeError(f"Reddit refused the credentials: {token.get('error', token)}")
+                self._token = token['access_token']
+                # Renew a minute early so no request goes out with an expiring token.
+                self._token_expires = time.time() + token.get('expires_in', 3600) - 60
+            return self._token
+
+    async def _get(self, path, operation, **params):
+        """GET ``path`` from the OAuth API through the scheduler and return the decoded JSON."""
+        params = {name: value for name, value in params.items() if value is not None}
+        params.setdefault('raw_json', 1)
+        refreshed = False
+        attempt = 0
+        while True:
+            token = await self._access_token()
+            await self.scheduler.acquire_async(self.priority)
+            response = None
+            try:
+                with metrics.timed('reddit', operation):
+                    response = await self._get_session().get(
+                        f"{self.OAUTH_URL}{path}", params=params, headers={'Authorization': f"bearer {token}"}
+                    )
+                    try:
+                        if response.status == 401 and not refreshed:
+                            refreshed = True
+                            await self._access_token(refresh=True)
+                            continue
+                        if response.status == 429 and attempt < self.scheduler.max_retries:
+                            self.scheduler.backoff(attempt, retry_after(response.headers))
+                            attempt += 1
+                            continue
+                        response.raise_for_status()
+                        return await response.json()
+                    finally:
+                        response.release()
+            finally:
+                self.scheduler.release(response.headers if response is not None else None,
+                                       response.status if response is not None else None)
+
+    async def _run_blocking(self, fn, *args):
+        # SQLite writes (cache, index) happen off the event loop.
+        return await asyncio.to_thread(fn, *args)
+
+    async def _cache_get(self, kind, key):
+        if self.cache is None:
+            return None
+        return await self._run_blocking(lambda: self.cache.get(kind, key, allow_stale=self.offline))
+
+    async def _cache_set(self, kind, key, value):
+        if self.cache is not None:
+            await self._run_blocking(self.cache.set, kind, key, value)
+
+    async def _index_posts(self, children):
+        if self.index is None or not children:
+            return
+        try:
+            await self._run_blocking(self.index.add_posts, [post_index_row(data) for data in children])
+        except Exception as e:
+            print(f"Error updating the search index: {e}")
+
+    async def _listing(self, path, operation, limit, **params):
+        # Reddit returns at most 100 things per page; follow ``after`` for more.
+        children = []
+        after = None
+        while len(children) < limit:
+            page = await self._get(path, operation, limit=min(100, limit - len(children)), after=after, **params)
+            things = [thing['data'] for thing in page['data']['children'] if thing['kind'] == 't3']
+            children.extend(things)
+            after = page['data'].get('after')
+            if not after or not things:
+                break
+        return children[:limit]
+
+    async def get_posts(self, subreddit_name: str = None, sort: str = 'hot', limit: int = 10):
+        cache_key = f"{(subreddit_name or 'front').lower()}:{sort}:{limit}"
+        cached = await self._cache_get('listing', cache_key)
+        if cached is not None:
+            return cached
+        if self.offline:
+            print("Offline mode: this listing is not cached.")
+            return []
+        sort = sort if sort in ('hot', 'new', 'top') else 'hot'
+        path = f"/r/{subreddit_name.removeprefix('r/')}/{sort}" if subreddit_name else f"/{sort}"
+        try:
+            children = await self._listing(path, 'listing', limit, **({'t': 'all'} if sort == 'top' else {}))
+        except Exception as e:
+            print(f"Error in get_posts: {e}")
+            return []
+        posts = []
+        for data in children:
+            await self._cache_set('submission', data['id'], submission_fields_from_json(data))
+            posts.append(post_from_json(data))
+        await self._cache_set('listing', cache_key, posts)
+        await self._index_posts(children)
+        return posts
+
+    async def get_post_content(self, post):
+        fields = await self._cache_get('submission', post.id)
+        if fields is None and not self.offline:
+            try:
+                page = await self._get('/api/info', 'submission', id=f"t3_{post.id}")
+                children = page['data']['children']
+                if children:
+                    fields = submission_fields_from_json(children[0]['data'])
+                    await self._cache_set('submission', post.id, fields)
+            except Exception as e:
+                print(f"Error in get_post_content: {e}")
+        if fields is not None:
+            for name, value in fields.items():
+                setattr(post, name, value)
+        return post
+
+    async def get_comments(self, post, max_comments=None, max_depth=None):
+        """Return the comment tree of ``post`` as ``CommentStore`` views; see ``RedditClient.get_comments``."""
+        max_comments = max_comments or config.COMMENT_TREE_BUDGET
+        max_depth = max_depth or config.COMMENT_TREE_MAX_DEPTH
+        cache_key = f"{post.id}:{max_comments}:{max_depth}"
+        cached = await self._cache_get('comments', cache_key)
+        if cached is not None:
+            return cached.roots()
+        if self.offline:
+            print("Offline mode: comments for this post are not cached.")
+            return []
+        try:
+            submission, comments = await self._get(f"/comments/{post.id}", 'comments', limit=max_comments,
+                                                   depth=max_depth)
+        except Exception as e:
+            print(f"Error in get_comments: {e}")
+            return []
+        indexed = [] if self.index is not None else None
+        store = CommentStore.from_tree(build_comment_tree(
+            parse_comment_listing(comments), post.id, 0, max_comments, max_depth, lambda node: node.replies, indexed
+        ))
+        if indexed:
+            try:
+                await self._run_blocking(self.index.add_comments, indexed)
+            except Exception as e:
+                print(f"Error updating the search index: {e}")
+        await self._cache_set('comments', cache_key, store)
+        return store.roots()
+
+    async def search(self, query, subreddit=None, time_filter='all', limit=50):
+        """Search Reddit (one subreddit, or all of it) and return ``Post`` objects."""
+        if self.offline:
+            print("Offline mode: use 'find <query>' to search what is already fetched.")
+            return []
+        path = f"/r/{(subreddit or 'all').removeprefix('r/')}/search"
+        try:
+            children = await self._listing(path, 'search', limit, q=query, t=time_filter,
+                                           restrict_sr=1 if subreddit else 0)
+        except Exception as e:
+            print(f"Error in search: {e}")
+            return []
+        await self._index_posts(children)
+        return [post_from_json(data) for data in children]
+
+    async def fetch_threads(self, subreddits, sort='hot', limit=10):
+        """Fetch the listings of ``subreddits`` and the comments of every post in them, all concurrently.
+
+        Returns ``(subreddit, post, comments)`` tuples in subreddit and listing order.
+        """
+        listings = await asyncio.gather(*(self.get_posts(subreddit, sort, limit) for subreddit in subreddits))
+        pairs = [(subreddit, post) for subreddit, posts in zip(subreddits, listings) for post in posts]
+        comments = await asyncio.gather(*(self.get_comments(post) for _, post in pairs))
+        return [(subreddit, post, tree) for (subreddit, post), tree in zip(pairs, comments)]
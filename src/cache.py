@@ -0,0 +1,161 @@
+# cache.py
+
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+class DiskCache:
+    """SQLite-backed key/value cache with per-kind TTLs and LRU eviction.
+
+    Values are pickled. Every entry belongs to a ``kind`` (e.g. 'listing',
+    'comments'); each kind has its own TTL in seconds, ``None`` meaning the
+    entry never expires. When the stored payload exceeds ``max_bytes`` the
+    least recently read entries are evicted first. Reads only note their
+    time in memory; the times are written with the next ``set``, on
+    ``close``, or once ``ACCESS_FLUSH_SIZE`` reads are pending, so a hit
+    costs no write.
+    """
+
+    ACCESS_FLUSH_SIZE = 256
+
+    def __init__(self, path, ttls=None, max_bytes=64 * 1024 * 1024):
+        self.path = path
+        self.ttls = dict(ttls or {})
+        self.max_bytes = max_bytes
+        self.hits = {}
+        self.misses = {}
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._accessed = {}  # (kind, key) -> time of the last read, not yet written
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        if path != ':memory:':
+            # Readers don't wait for the writer, and commits skip the fsync of rollback journaling.
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                kind TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                accessed REAL NOT NULL,
+                PRIMARY KEY (kind, key)
+            )
+        """)
+        self._conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, kind, key, default=None, allow_stale=False):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created FROM entries WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            ttl = self.ttls.get(kind)
+            if row is None or (not allow_stale and ttl is not None and now - row[1] > ttl):
+                self.misses[kind] = self.misses.get(kind, 0) + 1
+                return default
+            self._accessed[(kind, key)] = now
+            if len(self._accessed) >= self.ACCESS_FLUSH_SIZE:
+                self._flush_accessed()
+                self._conn.commit()
+            self.hits[kind] = self.hits.get(kind, 0) + 1
+        try:
+            return pickle.loads(row[0])
+        except Exception:
+            # Written by an older version of the models; drop it.
+            self.delete(kind, key)
+            return default
+
+    def set(self, kind, key, value):
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._lock:
+            self._accessed.pop((kind, key), None)
+            # Eviction below goes by read time, so write the pending ones first.
+            self._flush_accessed()
+            old = self._conn.execute(
+                "SELECT size FROM entries WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            if old:
+                self._total_bytes -= old[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (kind, key, value, size, created, accessed) VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, key, blob, len(blob), now, now)
+            )
+            self._total_bytes += len(blob)
+            self._evict()
+            self._conn.commit()
+
+    def delete(self, kind, key):
+        with self._lock:
+            self._accessed.pop((kind, key), None)
+            row = self._conn.execute(
+                "SELECT size FROM entries WHERE kind = ? AND key = ?", (kind, key)
+            ).fetchone()
+            if row:
+                self._conn.execute("DELETE FROM entries WHERE kind = ? AND key = ?", (kind, key))
+                self._conn.commit()
+                self._total_bytes -= row[0]
+
+    def clear(self):
+        with self._lock:
+            self._accessed.clear()
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+            self._total_bytes = 0
+
+    def _flush_accessed(self):
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE entries SET accessed = ? WHERE kind = ? AND key = ?",
+                [(accessed, kind, key) for (kind, key), accessed in self._accessed.items()]
+            )
+            self._accessed.clear()
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes:
+            rows = self._conn.execute(
+                "SELECT kind, key, size FROM entries ORDER BY accessed LIMIT 64"
+            ).fetchall()
+            if not rows:
+                break
+            for kind, key, size in rows:
+                self._conn.execute("DELETE FROM entries WHERE kind = ? AND key = ?", (kind, key))
+                self._total_bytes -= size
+                self.evictions += 1
+                if self._total_bytes <= self.max_bytes:
+                    break
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT kind, COUNT(*) FROM entries GROUP BY kind").fetchall())
+        kinds = sorted(set(counts) | set(self.hits) | set(self.misses) | set(self.ttls))
+        return {
+            'path': self.path,
+            'bytes': self._total_bytes,
+            'max_bytes': self.max_bytes,
+            'evictions': self.evictions,
+            'kinds': {
+                kind: {
+                    'entries': counts.get(kind, 0),
+                    'hits': self.hits.get(kind, 0),
+                    'misses': self.misses.get(kind, 0),
+                    'ttl': self.ttls.get(kind),
+                }
+                for kind in kinds
+            },
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush_accessed()
+            self._conn.commit()
+            self._conn.close()
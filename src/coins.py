@@ -0,0 +1,126 @@
+# coins.py
+
+import json
+import os
+import re
+import threading
+from .config import config
+
+DEFAULT_COIN_UNIVERSE = os.path.join(os.path.dirname(__file__), 'data', 'coins.json')
+
+_TOKEN_PATTERN = re.compile(r"\$?[A-Za-z0-9]+")
+
+class CoinMention:
+    def __init__(self, symbol):
+        self.symbol = symbol
+        self.mentions = 0
+        self.weighted = 0
+        self.comments = []
+
+class CoinMentions:
+    """Per-coin counts from one scan of a comment list.
+
+    ``mentions`` counts comments, not occurrences, so one comment repeating a
+    ticker counts once. ``weighted`` sums the comment scores (at least 1 per
+    comment) and ``comments`` holds the comments that mention the coin.
+    """
+
+    def __init__(self):
+        self.coins = {}
+
+    def add(self, symbol, comment, weight):
+        mention = self.coins.get(symbol)
+        if mention is None:
+            mention = self.coins[symbol] = CoinMention(symbol)
+        mention.mentions += 1
+        mention.weighted += max(weight, 1)
+        mention.comments.append(comment)
+
+    def ranked(self, weighted=False):
+        """Coins ordered by (score-weighted) mentions, most mentioned first."""
+        key = (lambda m: (-m.weighted, m.symbol)) if weighted else (lambda m: (-m.mentions, m.symbol))
+        return sorted(self.coins.values(), key=key)
+
+    def symbols(self, weighted=False):
+        return [mention.symbol for mention in self.ranked(weighted)]
+
+class CoinUniverse:
+    """Tickers and names to look for in comments, matched per word.
+
+    Each comment is split into words once. A bare ticker only matches in
+    upper case ("SOL", not "sol" in "solution" or the word "sol"), a
+    ``$``-prefixed ticker matches in any case, and aliases (names, or
+    tickers safe to match in lower case) match case-insensitively and may
+    span several words ("bitcoin cash"). Longer aliases win, so "bitcoin
+    cash" is BCH rather than BTC. Coins marked ``require_prefix`` have
+    tickers that are everyday words or abbreviations ("OP", "LINK"), so they
+    only match as ``$OP`` or by alias. Matching cost does not grow with the
+    size of the universe.
+    """
+
+    def __init__(self, coins):
+        self.symbols = {}
+        self.aliases = {}
+        self.max_alias_words = 1
+        for coin in coins:
+            symbol = coin['symbol'].upper()
+            if not coin.get('require_prefix'):
+                self.symbols[symbol] = symbol
+            self.aliases[('$' + symbol.lower(),)] = symbol
+            for alias in coin.get('aliases', ()):
+                words = tuple(_TOKEN_PATTERN.findall(alias.lower()))
+                if words:
+                    self.aliases[words] = symbol
+                    self.max_alias_words = max(self.max_alias_words, len(words))
+
+    @classmethod
+    def load(cls, path=None):
+        """Load a universe from a JSON list of ``{"symbol": ..., "aliases": [...]}`` entries.
+
+        An entry may also set ``"require_prefix": true``.
+        """
+        with open(path or DEFAULT_COIN_UNIVERSE, encoding='utf-8') as f:
+            return cls(json.load(f))
+
+    def __len__(self):
+        return len(set(self.aliases.values()))
+
+    def find(self, text):
+        """Return the set of coin symbols mentioned in ``text``."""
+        tokens = _TOKEN_PATTERN.findall(text)
+        lowered = [token.lower() for token in tokens]
+        found = set()
+        i = 0
+        while i < len(tokens):
+            for size in range(min(self.max_alias_words, len(tokens) - i), 0, -1):
+                symbol = self.aliases.get(tuple(lowered[i:i + size]))
+                if symbol is not None:
+                    found.add(symbol)
+                    i += size
+                    break
+            else:
+                symbol = self.symbols.get(tokens[i])
+                if symbol is not None:
+                    found.add(symbol)
+                i += 1
+        return found
+
+    def count(self, comments, comment_scores=None):
+        """Scan each comment once and return ``CoinMentions``."""
+        result = CoinMentions()
+        scores = comment_scores if comment_scores is not None else [1] * len(comments)
+        for comment, score in zip(comments, scores):
+            for symbol in self.find(comment):
+                result.add(symbol, comment, score)
+        return result
+
+_default_universe = None
+_default_universe_lock = threading.Lock()
+
+def default_coin_universe():
+    """Return the universe at ``COIN_UNIVERSE_PATH`` (or the bundled one), loaded once."""
+    global _default_universe
+    with _default_universe_lock:
+        if _default_universe is None:
+            _default_universe = CoinUniverse.load(config.COIN_UNIVERSE_PATH)
+    return _default_universe
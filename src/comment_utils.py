@@ -1,8 +1,104 @@
 # comment_utils.py
 
-from .models import Comment
-import requests
-from bs4 import BeautifulSoup
+import logging
+import re
+from .config import config
+from .models import Comment, MoreReplies
+
+class CommentIndex:
+    """Pre-order index over a comment tree for O(page) paging.
+
+    Rows are the comments in display order with their subtree sizes. A
+    Fenwick tree counts the rows that are visible, i.e. not inside a
+    collapsed comment, so finding the k-th visible comment is O(log n) and
+    a page is read by jumping over collapsed subtrees. Collapsing or
+    expanding only touches the rows whose visibility actually changes.
+    """
+
+    def __init__(self, comments):
+        self.nodes = []
+        self.sizes = []
+        stack = [(comment, -1) for comment in reversed(comments)]
+        open_rows = []  # rows whose subtree is still being emitted
+        while stack:
+            node, parent = stack.pop()
+            while open_rows and open_rows[-1] != parent:
+                row = open_rows.pop()
+                self.sizes[row] = len(self.nodes) - row
+            row = len(self.nodes)
+            open_rows.append(row)
+            self.nodes.append(node)
+            self.sizes.append(1)
+            stack.extend((child, row) for child in reversed(node.children))
+        for row in open_rows:
+            self.sizes[row] = len(self.nodes) - row
+
+        self._rows = {id(node): row for row, node in enumerate(self.nodes)}
+        self._visible = bytearray(len(self.nodes))
+        self._tree = [0] * (len(self.nodes) + 1)
+        row = 0
+        while row < len(self.nodes):
+            self._update(row, 1)
+            # A collapsed comment is shown, its replies are not.
+            row += self.sizes[row] if self.nodes[row].collapsed else 1
+
+    def _update(self, row, delta):
+        self._visible[row] = 1 if delta > 0 else 0
+        i = row + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def visible_count(self):
+        total = 0
+        i = len(self.nodes)
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _visible_row(self, position):
+        """Row of the ``position``-th (0-based) visible comment, or None."""
+        if position < 0 or position >= self.visible_count():
+            return None
+        row = 0
+        step = 1 << len(self.nodes).bit_length()
+        remaining = position + 1
+        while step:
+            candidate = row + step
+            if candidate <= len(self.nodes) and self._tree[candidate] < remaining:
+                row = candidate
+                remaining -= self._tree[candidate]
+            step >>= 1
+        return row
+
+    def comment_at(self, position):
+        row = self._visible_row(position)
+        return None if row is None else self.nodes[row]
+
+    def page(self, start, count):
+        row = self._visible_row(start)
+        comments = []
+        while row is not None and row < len(self.nodes) and len(comments) < count:
+            node = self.nodes[row]
+            comments.append(node)
+            row += self.sizes[row] if node.collapsed else 1
+        return comments
+
+    def set_collapsed(self, comment, collapsed):
+        row = self._rows.get(id(comment))
+        if row is None or bool(comment.collapsed) == collapsed:
+            comment.collapsed = collapsed
+            return
+        comment.collapsed = collapsed
+        if not self._visible[row]:
+            return
+        delta = -1 if collapsed else 1
+        child = row + 1
+        end = row + self.sizes[row]
+        while child < end:
+            self._update(child, delta)
+            child += self.sizes[child] if self.nodes[child].collapsed else 1
 
 class CommentManager:
     def __init__(self):
@@ -10,18 +106,36 @@ class CommentManager:
         self.comment_page = 0
         self.comment_sort_method = 'best'
 
-    def flatten_comments(self, comments, depth=0, max_depth=6):
+    @property
+    def current_comments(self):
+        return self._current_comments
+
+    @current_comments.setter
+    def current_comments(self, comments):
+        self._current_comments = comments
+        self.comment_index = CommentIndex(comments)
+
+    def flatten_comments(self, comments, depth=0, max_depth=None):
         for comment in comments:
-            if depth < max_depth:
+            if max_depth is None or depth < max_depth:
                 yield comment
                 yield from self.flatten_comments(comment.children, depth + 1, max_depth)
 
+    def clamp_page(self, per_page=10):
+        """Move ``comment_page`` back to the last page when fewer comments are visible than it needs."""
+        last_page = max(0, (self.comment_index.visible_count() - 1) // per_page)
+        self.comment_page = min(self.comment_page, last_page)
+
+    def find_comment(self, comment_number):
+        """Return the comment shown as ``comment_number`` in the threaded view."""
+        return self.comment_index.comment_at(int(comment_number) - 1)
+
     def toggle_comment(self, action, comment_number):
         try:
-            comment_index = int(comment_number) - 1
-            if 0 <= comment_index < len(self.current_comments):
-                comment = self.current_comments[comment_index]
-                comment.collapsed = action == 'collapse'
+            comment = self.find_comment(comment_number)
+            if comment is not None:
+                self.comment_index.set_collapsed(comment, action == 'collapse')
+                self.clamp_page()
                 return True
             else:
                 print("Invalid comment number.")
@@ -30,6 +144,33 @@ class CommentManager:
             print(f"Invalid {action} command. Use '{action[0]} <number>'.")
             return False
 
+    def replace_placeholder(self, placeholder, replies):
+        """Splice the replies loaded for a ``MoreReplies`` placeholder into the tree."""
+        if placeholder.store is not None:
+            store = placeholder.store
+            row = store.row_of(placeholder)
+            if row is None:
+                return False
+            self.current_comments = store.replace(row, replies, roots=self.current_comments).roots()
+            self.clamp_page()
+            return True
+
+        def replace_in(siblings, parent):
+            for i, comment in enumerate(siblings):
+                if comment is placeholder:
+                    siblings[i:i + 1] = replies
+                    if parent is not None:
+                        parent.has_more_replies = any(isinstance(c, MoreReplies) for c in siblings)
+                    return True
+                if replace_in(comment.children, comment):
+                    return True
+            return False
+        if not replace_in(self.current_comments, None):
+            return False
+        self.comment_index = CommentIndex(self.current_comments)
+        self.clamp_page()
+        return True
+
     def sort_comments(self, comments, method='best'):
         if method == 'best':
             return sorted(comments, key=lambda c: c.score, reverse=True)
@@ -44,6 +185,7 @@ class CommentManager:
         if new_sort in ['best', 'new', 'controversial']:
             self.comment_sort_method = new_sort
             self.current_comments = self.sort_comments(self.current_comments, self.comment_sort_method)
+            self.clamp_page()
             return True
         else:
             print("Invalid sort method. Use 'best', 'new', or 'controversial'.")
@@ -51,7 +193,8 @@ class CommentManager:
 
     def collapse_all_comments(self):
         for comment in self.current_comments:
-            comment.collapsed = True
+            self.comment_index.set_collapsed(comment, True)
+        self.clamp_page()
 
     def navigate_comments(self, direction):
         if direction == 'next':
@@ -61,10 +204,20 @@ class CommentManager:
         return self.comment_page
 
     def get_displayed_comments(self, start=0, count=10):
-        return self.current_comments[start:start+count]
+        return self.comment_index.page(start, count)
+
+def walk_comments(comments):
+    """Yield every loaded comment of a tree in pre-order, skipping ``MoreReplies`` placeholders."""
+    stack = list(reversed(comments))
+    while stack:
+        comment = stack.pop()
+        if isinstance(comment, MoreReplies):
+            continue
+        yield comment
+        stack.extend(reversed(comment.children))
 
 def get_comments(post, reddit_client):
-    if reddit_client.use_api:
+    if reddit_client.use_api and reddit_client.reddit:
         praw_post = reddit_client.reddit.submission(id=post.id)
         praw_post.comments.replace_more(limit=0)
         comments = praw_post.comments.list()
@@ -75,19 +228,97 @@ def get_comments(post, reddit_client):
             comment.depth,
             comment.id
         ) for comment in comments]
+    elif reddit_client.public:
+        # One request for the whole thread, built straight from the JSON.
+        return list(walk_comments(reddit_client.get_comments(post)))
     else:
         return scrape_comments(post.url)
 
-def scrape_comments(post_url):
-    response = requests.get(post_url, headers={'User-Agent': 'Mozilla/5.0'})
-    soup = BeautifulSoup(response.text, 'html.parser')
+# Deepest comment level the HTML scraper keeps (top-level comments are level 0)
+SCRAPE_MAX_DEPTH = 6
+
+def _html_parser():
+    if config.SCRAPE_HTML_PARSER != 'auto':
+        return config.SCRAPE_HTML_PARSER
+    try:
+        import lxml.html
+    except ImportError as e:
+        logging.info(f"lxml unavailable ({e}), scraping with html.parser")
+        return 'html.parser'
+    return 'lxml'
+
+def _leading_int(text):
+    match = re.match(r"-?\d+", text.strip())
+    return int(match.group()) if match else 0
+
+def _has_classes(element, *names):
+    classes = (element.get('class') or '').split()
+    return all(name in classes for name in names)
+
+def _scrape_lxml(page):
+    import lxml.html
+    from lxml import etree
+
+    comments = []
+    depth = -1  # of the innermost comment open during the walk
+    for event, element in etree.iterwalk(lxml.html.fromstring(page), events=('start', 'end'), tag='div'):
+        if not _has_classes(element, 'comment'):
+            continue
+        if event == 'end':
+            depth -= 1
+            continue
+        depth += 1
+        if depth > SCRAPE_MAX_DEPTH:
+            continue
+        # A comment's own author, score and text are in its entry; its replies follow it.
+        entry = next((child for child in element.iterchildren('div') if _has_classes(child, 'entry')), element)
+        author = next((a for a in entry.iter('a') if _has_classes(a, 'author')), None)
+        score = next((span for span in entry.iter('span') if _has_classes(span, 'score', 'unvoted')), None)
+        body = next((div for div in entry.iter('div') if _has_classes(div, 'md')), None)
+        comments.append(Comment(
+            author.text_content().strip() if author is not None else '[deleted]',
+            _leading_int(score.get('title') or score.text_content()) if score is not None else 0,
+            body.text_content().strip() if body is not None else '',
+            depth
+        ))
+    return comments
+
+def _scrape_soup(page, parser):
+    from bs4 import BeautifulSoup
+
     comments = []
-    for comment in soup.find_all('div', class_='comment'):
-        author = comment.find('a', class_='author').text.strip() if comment.find('a', class_='author') else '[deleted]'
-        score = comment.find('span', class_='score unvoted').text.strip() if comment.find('span', class_='score unvoted') else '0'
-        score = 0 if score == '' else int(score)  # Ensure score is parsed correctly
-        body = comment.find('div', class_='md').text.strip() if comment.find('div', class_='md') else ''
-        depth = len(comment.find_parents('div', class_='comment'))
-        if depth <= 6:  # Limit depth to 6
-            comments.append(Comment(author, score, body, depth))
+    depths = {}
+    for element in BeautifulSoup(page, parser).find_all('div', class_='comment'):
+        parent = element.find_parent('div', class_='comment')
+        depth = depths[id(parent)] + 1 if parent is not None else 0
+        depths[id(element)] = depth
+        if depth > SCRAPE_MAX_DEPTH:
+            continue
+        entry = element.find('div', class_='entry', recursive=False) or element
+        author = entry.find('a', class_='author')
+        score = entry.find('span', class_='score unvoted')
+        body = entry.find('div', class_='md')
+        comments.append(Comment(
+            author.text.strip() if author else '[deleted]',
+            _leading_int(score.get('title') or score.text) if score else 0,
+            body.text.strip() if body else '',
+            depth
+        ))
     return comments
+
+def scrape_comments(post_url, session=None, parser=None):
+    """Scrape the comments of an old-reddit thread page; the fallback when neither the API nor JSON is used.
+
+    ``parser`` is 'lxml', which walks the page with lxml directly, or a
+    BeautifulSoup parser such as 'html.parser'; see ``SCRAPE_HTML_PARSER``.
+    Depths come from the parent comment's depth, and each comment's fields
+    are looked up once in its own entry rather than in all its replies.
+    """
+    from .reddit_json import public_session
+
+    session = session or public_session()
+    response = session.get(post_url, timeout=config.REDDIT_HTTP_TIMEOUT)
+    parser = parser or _html_parser()
+    if parser == 'lxml':
+        return _scrape_lxml(response.text)
+    return _scrape_soup(response.text, parser)
@@ -0,0 +1,165 @@
+# completions.py
+
+import hashlib
+import json
+import threading
+import time
+from .cache import DiskCache
+from .config import config
+from .metrics import metrics
+
+class CompletionCache:
+    """Content-addressed store for chat completion results.
+
+    Entries are keyed on a hash of the model, prompt template id/version,
+    request parameters and the exact messages sent, so an unchanged post
+    always maps to the same entry. Tracks how many tokens and seconds the
+    hits would have cost.
+    """
+
+    KIND = 'completion'
+
+    def __init__(self, cache, bypass=False):
+        self.cache = cache
+        self.bypass = bypass
+        self.hits = 0
+        self.misses = 0
+        self.tokens_saved = 0
+        self.seconds_saved = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(model, template, template_version, params, messages):
+        payload = json.dumps({
+            'model': model,
+            'template': template,
+            'template_version': template_version,
+            'params': params,
+            'messages': messages,
+        }, sort_keys=True)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        entry = self.cache.get(self.KIND, key)
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.tokens_saved += entry['total_tokens']
+            self.seconds_saved += entry['seconds']
+        return entry['text']
+
+    def set(self, key, text, total_tokens, seconds):
+        self.cache.set(self.KIND, key, {'text': text, 'total_tokens': total_tokens, 'seconds': seconds})
+
+    def stats(self):
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'tokens_saved': self.tokens_saved,
+            'seconds_saved': self.seconds_saved,
+            'bytes': self.cache.stats()['bytes'],
+            'bypass': self.bypass,
+        }
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+def default_completion_cache():
+    """Return the process-wide completion cache, or None when it is disabled."""
+    global _default_cache
+    if not config.AI_CACHE_ENABLED:
+        return None
+    with _default_cache_lock:
+        if _default_cache is None:
+            store = DiskCache(config.AI_CACHE_PATH, {CompletionCache.KIND: config.AI_CACHE_TTL}, config.AI_CACHE_MAX_BYTES)
+            _default_cache = CompletionCache(store, bypass=config.AI_CACHE_BYPASS)
+    return _default_cache
+
+class StreamStats:
+    """Timing of one streamed completion, handed to the stream sink when it ends."""
+
+    def __init__(self, first_token_seconds=None, seconds=0.0, completion_tokens=0, cached=False):
+        self.first_token_seconds = first_token_seconds
+        self.seconds = seconds
+        self.completion_tokens = completion_tokens
+        self.cached = cached
+
+    @property
+    def tokens_per_second(self):
+        # Generation rate after the first token, so queueing/prompt time is not counted twice
+        generating = self.seconds - (self.first_token_seconds or 0.0)
+        return self.completion_tokens / generating if generating > 0 else 0.0
+
+def complete(client, messages, template, template_version, cache=None, bypass_cache=False, model="gpt-4",
+             stream=None, **params):
+    """Run a chat completion through ``cache`` and return the stripped text.
+
+    With ``bypass_cache`` (or ``cache.bypass``) the API is always called, but
+    the fresh result still replaces the cached one. ``stream`` is an optional
+    sink with ``write(delta)`` and ``close(stats)`` methods (see
+    ``ConsoleUI.stream_markdown``); when given, the response is requested in
+    streaming mode and each delta is written to it as it arrives. A cache hit
+    is written in one piece.
+    """
+    key = None
+    if cache is not None:
+        key = CompletionCache.make_key(model, template, template_version, params, messages)
+        if not (bypass_cache or cache.bypass):
+            text = cache.get(key)
+            if text is not None:
+                if stream is not None:
+                    stream.write(text)
+                    stream.close(StreamStats(cached=True))
+                return text
+
+    start = time.perf_counter()
+    if stream is None:
+        with metrics.timed('openai', template):
+            response = client.chat.completions.create(model=model, messages=messages, **params)
+        seconds = time.perf_counter() - start
+        text = response.choices[0].message.content.strip()
+        usage = getattr(response, 'usage', None)
+    else:
+        with metrics.timed('openai', template):
+            text, usage, stats = _complete_streaming(client, messages, model, params, stream, start)
+        metrics.observe_first_token('openai', template, stats.first_token_seconds or stats.seconds)
+        seconds = stats.seconds
+        stream.close(stats)
+    metrics.record_usage(model, template, usage)
+    total_tokens = usage.total_tokens if usage else 0
+
+    if cache is not None:
+        cache.set(key, text, total_tokens, seconds)
+    return text
+
+def _complete_streaming(client, messages, model, params, stream, start):
+    response = client.chat.completions.create(
+        model=model, messages=messages, stream=True, stream_options={'include_usage': True}, **params
+    )
+    parts = []
+    first_token_seconds = None
+    chunk_count = 0
+    usage = None
+    for chunk in response:
+        if getattr(chunk, 'usage', None):
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta.content
+        if not delta:
+            continue
+        if first_token_seconds is None:
+            first_token_seconds = time.perf_counter() - start
+        chunk_count += 1
+        parts.append(delta)
+        stream.write(delta)
+
+    stats = StreamStats(
+        first_token_seconds=first_token_seconds,
+        seconds=time.perf_counter() - start,
+        # Without usage (older API versions) each content chunk is roughly one token
+        completion_tokens=usage.completion_tokens if usage else chunk_count,
+    )
+    return ''.join(parts).strip(), usage, stats
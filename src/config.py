@@ -5,6 +5,12 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+def _env_flag(name, default=False):
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ('1', 'true', 'yes', 'on')
+
 class Config:
     # Reddit API credentials
     REDDIT_CLIENT_ID = os.getenv('REDDIT_CLIENT_ID')
@@ -20,6 +26,102 @@ class Config:
     DEFAULT_POST_SORT = 'hot'
     DEFAULT_COMMENT_SORT = 'best'
 
+    # Comment trees: how many comments are built up front and how deep. Anything
+    # past either limit is kept as a "load more" placeholder fetched on demand.
+    COMMENT_TREE_BUDGET = int(os.getenv('COMMENT_TREE_BUDGET', 200))
+    COMMENT_TREE_MAX_DEPTH = int(os.getenv('COMMENT_TREE_MAX_DEPTH', 5))
+
+    # Background prefetch of the top posts of the listing on screen
+    PREFETCH_ENABLED = _env_flag('PREFETCH_ENABLED', True)
+    PREFETCH_TOP_N = int(os.getenv('PREFETCH_TOP_N', 5))
+    PREFETCH_MAX_BYTES = int(os.getenv('PREFETCH_MAX_BYTES', 16 * 1024 * 1024))
+
+    # Crypto sweep concurrency (listing fetches, comment fetches, in-flight LLM requests)
+    SWEEP_LISTING_WORKERS = int(os.getenv('SWEEP_LISTING_WORKERS', 4))
+    SWEEP_COMMENT_WORKERS = int(os.getenv('SWEEP_COMMENT_WORKERS', 8))
+    SWEEP_MAX_INFLIGHT_LLM = int(os.getenv('SWEEP_MAX_INFLIGHT_LLM', 4))
+    # Comment trees fetched but not yet analyzed (bounds sweep memory)
+    SWEEP_MAX_PENDING_POSTS = int(os.getenv('SWEEP_MAX_PENDING_POSTS', 16))
+
+    # Incremental sweeps: an unchanged post is re-analyzed only once it has at least
+    # SWEEP_REANALYZE_MIN_COMMENTS new comments, and at least SWEEP_REANALYZE_GROWTH
+    # times as many as at its last analysis
+    SWEEP_INCREMENTAL = _env_flag('SWEEP_INCREMENTAL', True)
+    SWEEP_REANALYZE_MIN_COMMENTS = int(os.getenv('SWEEP_REANALYZE_MIN_COMMENTS', 20))
+    SWEEP_REANALYZE_GROWTH = float(os.getenv('SWEEP_REANALYZE_GROWTH', 0.25))
+    SWEEP_STATE_PATH = os.getenv('SWEEP_STATE_PATH', os.path.join(os.path.expanduser('~'), '.cache', 'reddit-terminal', 'sweep_state.sqlite3'))
+    SWEEP_STATE_MAX_BYTES = int(os.getenv('SWEEP_STATE_MAX_BYTES', 32 * 1024 * 1024))
+
+    # Shared Reddit request scheduler: pace used until Reddit's X-Ratelimit headers
+    # arrive, burst size, tokens only interactive requests may use, retries after a 429
+    REDDIT_REQUESTS_PER_MINUTE = int(os.getenv('REDDIT_REQUESTS_PER_MINUTE', 100))
+    REDDIT_REQUEST_BURST = int(os.getenv('REDDIT_REQUEST_BURST', 10))
+    REDDIT_INTERACTIVE_RESERVE = int(os.getenv('REDDIT_INTERACTIVE_RESERVE', 5))
+    REDDIT_MAX_RETRIES = int(os.getenv('REDDIT_MAX_RETRIES', 3))
+
+    # AsyncRedditClient and the public JSON session: connections kept open per pool, and the request timeout in seconds
+    REDDIT_HTTP_MAX_CONNECTIONS = int(os.getenv('REDDIT_HTTP_MAX_CONNECTIONS', 20))
+    REDDIT_HTTP_TIMEOUT = float(os.getenv('REDDIT_HTTP_TIMEOUT', 30))
+
+    # Without API credentials, read Reddit's public .json pages instead
+    PUBLIC_JSON_FALLBACK = _env_flag('PUBLIC_JSON_FALLBACK', True)
+    # HTML parser of the legacy scraper: 'auto' (lxml when installed), 'lxml', or a BeautifulSoup parser such as 'html.parser'
+    SCRAPE_HTML_PARSER = os.getenv('SCRAPE_HTML_PARSER', 'auto')
+
+    # Reddit response cache (TTLs in seconds)
+    CACHE_ENABLED = _env_flag('CACHE_ENABLED', True)
+    CACHE_PATH = os.getenv('CACHE_PATH', os.path.join(os.path.expanduser('~'), '.cache', 'reddit-terminal', 'reddit_cache.sqlite3'))
+    CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', 64 * 1024 * 1024))
+    CACHE_TTLS = {
+        'listing': int(os.getenv('CACHE_TTL_LISTING', 300)),
+        'submission': int(os.getenv('CACHE_TTL_SUBMISSION', 600)),
+        'comments': int(os.getenv('CACHE_TTL_COMMENTS', 600)),
+    }
+    OFFLINE_MODE = _env_flag('OFFLINE_MODE')
+
+    # Local full-text index of every post and comment fetched ('find' command)
+    SEARCH_INDEX_ENABLED = _env_flag('SEARCH_INDEX_ENABLED', True)
+    SEARCH_INDEX_PATH = os.getenv('SEARCH_INDEX_PATH', os.path.join(os.path.expanduser('~'), '.cache', 'reddit-terminal', 'search_index.sqlite3'))
+
+    # OpenAI completion cache (entries never expire unless AI_CACHE_TTL is set)
+    AI_CACHE_ENABLED = _env_flag('AI_CACHE_ENABLED', True)
+    AI_CACHE_BYPASS = _env_flag('AI_CACHE_BYPASS')
+    AI_CACHE_PATH = os.getenv('AI_CACHE_PATH', os.path.join(os.path.expanduser('~'), '.cache', 'reddit-terminal', 'ai_cache.sqlite3'))
+    AI_CACHE_MAX_BYTES = int(os.getenv('AI_CACHE_MAX_BYTES', 32 * 1024 * 1024))
+    AI_CACHE_TTL = int(os.getenv('AI_CACHE_TTL')) if os.getenv('AI_CACHE_TTL') else None
+
+    # Post analysis: 'chunked' map-reduces long threads, 'truncate' keeps the first ANALYSIS_INPUT_TOKENS,
+    # 'extractive' keeps the most central, best-scored comment sentences that fit ANALYSIS_INPUT_TOKENS
+    ANALYSIS_MODE = os.getenv('ANALYSIS_MODE', 'chunked')
+    ANALYSIS_INPUT_TOKENS = int(os.getenv('ANALYSIS_INPUT_TOKENS', 4000))
+    ANALYSIS_CHUNK_TOKENS = int(os.getenv('ANALYSIS_CHUNK_TOKENS', 3000))
+    ANALYSIS_MAP_MAX_TOKENS = int(os.getenv('ANALYSIS_MAP_MAX_TOKENS', 600))
+    ANALYSIS_FANOUT = int(os.getenv('ANALYSIS_FANOUT', 4))
+
+    # Collapse duplicate and near-duplicate comments (word n-gram cosine at or above
+    # COMMENT_DEDUP_THRESHOLD; 1.0 merges exact duplicates only) before they go to the LLM
+    COMMENT_DEDUP_ENABLED = _env_flag('COMMENT_DEDUP_ENABLED', True)
+    COMMENT_DEDUP_THRESHOLD = float(os.getenv('COMMENT_DEDUP_THRESHOLD', 0.8))
+
+    # Comments sent for search summaries and topics: 'extractive' picks the most central,
+    # best-scored sentences of the whole thread, 'truncate' the first comments, up to COMMENT_SELECTION_TOKENS
+    COMMENT_SELECTION = os.getenv('COMMENT_SELECTION', 'extractive')
+    COMMENT_SELECTION_TOKENS = int(os.getenv('COMMENT_SELECTION_TOKENS', 2000))
+
+    # Sentiment scoring for crypto posts: 'auto' (vectorized, TextBlob if NumPy/scikit-learn
+    # are missing), 'vectorized' or 'textblob'
+    SENTIMENT_BACKEND = os.getenv('SENTIMENT_BACKEND', 'auto')
+
+    # JSON list of {"symbol": ..., "aliases": [...]} coins to track; the bundled src/data/coins.json when unset
+    COIN_UNIVERSE_PATH = os.getenv('COIN_UNIVERSE_PATH')
+
+    # Render long AI answers token by token instead of waiting for the full completion
+    STREAM_AI_OUTPUT = _env_flag('STREAM_AI_OUTPUT', True)
+
+    # Write call metrics to this file on exit ('json' or 'prometheus' text)
+    METRICS_DUMP_PATH = os.getenv('METRICS_DUMP_PATH')
+    METRICS_DUMP_FORMAT = os.getenv('METRICS_DUMP_FORMAT', 'json')
+
     # Feature flags
     USE_AI_FEATURES = bool(OPENAI_API_KEY)
 
@@ -0,0 +1,156 @@
+# crypto_report.py
+"""Headless crypto report for cron jobs.
+
+Runs the same sweep as the interactive ``analyze_crypto`` command without
+any terminal UI and appends every result to JSONL and/or Markdown files as
+soon as it is analyzed. Run from the repository root:
+
+    python -m src.crypto_report --jsonl crypto_report.jsonl --markdown crypto_report.md
+
+Exit status: 0 when every post was analyzed (or reused), 1 when some posts or
+subreddit listings failed (an empty listing counts as failed) or a result could
+not be written, 2 for usage or configuration errors and 3 when nothing could be
+analyzed.
+"""
+
+import argparse
+import json
+import sys
+import time
+from .config import config
+from .metrics import metrics
+
+EXIT_OK = 0
+EXIT_PARTIAL = 1
+EXIT_CONFIG = 2
+EXIT_NO_RESULTS = 3
+
+class ReportWriter:
+    """Writes each ``SweepResult`` to the open report files and keeps only counts."""
+
+    def __init__(self, jsonl=None, markdown=None):
+        self.jsonl = jsonl
+        self.markdown = markdown
+        self.analyzed = 0
+        self.reused = 0
+        self.failed = 0
+        self.failed_listings = 0
+
+    def listing(self, subreddit, post_count, error):
+        # RedditClient.get_posts reports a failed listing as an empty one, so both count.
+        if error is not None or not post_count:
+            self.failed_listings += 1
+            print(f"No posts from r/{subreddit}" + (f": {error}" if error is not None else "."), file=sys.stderr)
+
+    def write(self, result):
+        if result.reused:
+            self.reused += 1
+        elif result.error is None:
+            self.analyzed += 1
+        else:
+            self.failed += 1
+        if self.jsonl is not None:
+            self.jsonl.write(json.dumps(self.to_record(result)) + "\n")
+            self.jsonl.flush()
+        if self.markdown is not None:
+            self.markdown.write(result.to_markdown())
+            self.markdown.flush()
+
+    @staticmethod
+    def to_record(result):
+        post = result.post
+        return {
+            'subreddit': result.subreddit,
+            'rank': result.rank,
+            'post_id': post.id,
+            'title': post.title,
+            'url': post.url,
+            'score': post.score,
+            'num_comments': post.num_comments,
+            'analysis': result.analysis,
+            'error': None if result.error is None else str(result.error),
+            'reused': result.reused,
+            'completed_utc': time.time(),
+        }
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Write the crypto subreddit report without the interactive UI.")
+    parser.add_argument('--subreddits', nargs='+', metavar='NAME',
+                        help="subreddits to sweep (default: the built-in crypto list)")
+    parser.add_argument('--subreddits-file', metavar='PATH', help="file with one subreddit per line")
+    parser.add_argument('--limit', type=int, default=config.DEFAULT_POST_LIMIT, help="posts per subreddit")
+    parser.add_argument('--sort', choices=['hot', 'new', 'top'], default=config.DEFAULT_POST_SORT)
+    parser.add_argument('--listing-workers', type=int, default=config.SWEEP_LISTING_WORKERS)
+    parser.add_argument('--comment-workers', type=int, default=config.SWEEP_COMMENT_WORKERS)
+    parser.add_argument('--llm-workers', type=int, default=config.SWEEP_MAX_INFLIGHT_LLM,
+                        help="concurrent OpenAI requests")
+    parser.add_argument('--max-pending', type=int, default=config.SWEEP_MAX_PENDING_POSTS,
+                        help="comment trees held in memory waiting for analysis")
+    parser.add_argument('--jsonl', metavar='PATH', help="append one JSON object per post")
+    parser.add_argument('--markdown', metavar='PATH', help="write the Markdown report")
+    parser.add_argument('--full', action='store_true',
+                        help="analyze every post again instead of reusing analyses of unchanged posts")
+    parser.add_argument('--metrics', metavar='PATH', default=config.METRICS_DUMP_PATH,
+                        help="write call latency and token metrics here when done")
+    parser.add_argument('--metrics-format', choices=['json', 'prometheus'], default=config.METRICS_DUMP_FORMAT)
+    parser.add_argument('--ordered', action='store_true',
+                        help="write results in subreddit/rank order instead of as they finish")
+    args = parser.parse_args(argv)
+    if not args.jsonl and not args.markdown:
+        parser.error("give --jsonl and/or --markdown")
+    return args
+
+def load_subreddits(args):
+    from .ai_crypto import CRYPTO_SUBREDDITS
+
+    subreddits = list(args.subreddits or [])
+    if args.subreddits_file:
+        with open(args.subreddits_file, encoding='utf-8') as f:
+            subreddits.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    return subreddits or CRYPTO_SUBREDDITS
+
+def main(argv=None):
+    args = parse_args(argv)
+    if not config.USE_AI_FEATURES:
+        print("OPENAI_API_KEY is not set.", file=sys.stderr)
+        return EXIT_CONFIG
+    if not config.is_reddit_api_configured() and not (config.OFFLINE_MODE or config.PUBLIC_JSON_FALLBACK):
+        print("Reddit API credentials are not set.", file=sys.stderr)
+        return EXIT_CONFIG
+
+    from .ai_crypto import AIClientCrypto
+    from .crypto_sweep import CryptoSweep, SweepState
+    from .reddit_client import RedditClient
+
+    sweep = CryptoSweep(RedditClient(), AIClientCrypto(config.OPENAI_API_KEY), load_subreddits(args),
+                        post_limit=args.limit, sort=args.sort, listing_workers=args.listing_workers,
+                        comment_workers=args.comment_workers, max_inflight_llm=args.llm_workers,
+                        max_pending_posts=args.max_pending, ordered=args.ordered,
+                        state=SweepState.open(reuse=not args.full) if config.SWEEP_INCREMENTAL else None)
+
+    jsonl = open(args.jsonl, 'a', encoding='utf-8') if args.jsonl else None
+    markdown = open(args.markdown, 'w', encoding='utf-8') if args.markdown else None
+    writer = ReportWriter(jsonl, markdown)
+    start = time.perf_counter()
+    write_failed = False
+    try:
+        sweep.run(on_result=writer.write, on_listing=writer.listing)
+    except OSError as e:
+        # The sweep finished; at least one result could not be written.
+        print(f"Error writing the report: {e}", file=sys.stderr)
+        write_failed = True
+    finally:
+        for f in (jsonl, markdown):
+            if f is not None:
+                f.close()
+        if args.metrics:
+            metrics.dump(args.metrics, args.metrics_format)
+
+    print(f"Analyzed {writer.analyzed} posts, reused {writer.reused}, {writer.failed} failed, "
+          f"{writer.failed_listings} listings failed, in {time.perf_counter() - start:.1f}s.", file=sys.stderr)
+    if not writer.analyzed and not writer.reused:
+        return EXIT_NO_RESULTS
+    return EXIT_PARTIAL if writer.failed or writer.failed_listings or write_failed else EXIT_OK
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,257 @@
+# crypto_sweep.py
+
+import hashlib
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from .cache import DiskCache
+from .comment_utils import walk_comments
+from .config import config
+from .dedup import prepare_comments
+from .rate_limit import SWEEP, request_priority
+
+class SweepResult:
+    def __init__(self, subreddit, rank, post, analysis=None, error=None, reused=False):
+        self.subreddit = subreddit
+        self.rank = rank
+        self.post = post
+        self.analysis = analysis
+        self.error = error
+        self.reused = reused  # analysis carried over from an earlier sweep
+
+    def to_markdown(self):
+        body = self.analysis if self.error is None else f"Analysis failed: {self.error}"
+        return f"\n### {self.post.title} ({self.subreddit})\n{body}\n"
+
+class SweepState:
+    """Per-post watermarks of earlier sweeps, with the analysis each one produced.
+
+    A post is analyzed again when it is new, its title or text changed (by
+    content hash or Reddit's edit time), or its comment count grew by at
+    least ``min_new_comments`` and by at least ``growth`` times the count at
+    the last analysis. Otherwise the stored analysis is reused. With
+    ``reuse=False`` every post is analyzed again and the watermarks are
+    refreshed.
+    """
+
+    KIND = 'watermark'
+
+    def __init__(self, cache, min_new_comments=None, growth=None, reuse=True):
+        self.cache = cache
+        self.reuse = reuse
+        self.min_new_comments = config.SWEEP_REANALYZE_MIN_COMMENTS if min_new_comments is None else min_new_comments
+        self.growth = config.SWEEP_REANALYZE_GROWTH if growth is None else growth
+
+    @classmethod
+    def open(cls, path=None, **kwargs):
+        return cls(DiskCache(path or config.SWEEP_STATE_PATH, {cls.KIND: None}, config.SWEEP_STATE_MAX_BYTES), **kwargs)
+
+    @staticmethod
+    def content_hash(post):
+        return hashlib.sha256(f"{post.title}\0{post.selftext}".encode('utf-8')).hexdigest()
+
+    def reusable_analysis(self, post):
+        """Return the stored analysis of ``post`` if it is still current, else None."""
+        if not self.reuse:
+            return None
+        mark = self.cache.get(self.KIND, post.id)
+        if mark is None:
+            return None
+        if mark['edited'] != getattr(post, 'edited', False) or mark['content_hash'] != self.content_hash(post):
+            return None
+        new_comments = post.num_comments - mark['num_comments']
+        if new_comments >= self.min_new_comments and new_comments >= mark['num_comments'] * self.growth:
+            return None
+        return mark['analysis']
+
+    def record(self, post, analysis):
+        self.cache.set(self.KIND, post.id, {
+            'edited': getattr(post, 'edited', False),
+            'num_comments': post.num_comments,
+            'content_hash': self.content_hash(post),
+            'analysis': analysis,
+            'analyzed_utc': time.time(),
+        })
+
+class CryptoSweep:
+    """Fetch -> analyze -> report pipeline over a list of subreddits.
+
+    Listing fetches, comment fetches and LLM calls each run in their own
+    bounded thread pool. Results are emitted in a stable order (subreddit
+    order, then listing rank) no matter which stage finishes first, or as
+    soon as they finish when ``ordered`` is False. At most
+    ``max_pending_posts`` comment trees are held between fetch and analysis,
+    so memory does not grow with the size of the sweep. With a ``state``
+    (``SweepState``), posts that have not changed enough since the last
+    sweep skip the comment fetch and the LLM and reuse their old analysis.
+    """
+
+    def __init__(self, reddit_client, ai_client, subreddits, post_limit=10, sort='hot',
+                 listing_workers=None, comment_workers=None, max_inflight_llm=None,
+                 max_pending_posts=None, ordered=True, state=None):
+        self.reddit_client = reddit_client
+        self.ai_client = ai_client
+        self.subreddits = list(subreddits)
+        self.post_limit = post_limit
+        self.sort = sort
+        self.listing_workers = listing_workers or config.SWEEP_LISTING_WORKERS
+        self.comment_workers = comment_workers or config.SWEEP_COMMENT_WORKERS
+        self.max_inflight_llm = max_inflight_llm or config.SWEEP_MAX_INFLIGHT_LLM
+        self.max_pending_posts = max_pending_posts or config.SWEEP_MAX_PENDING_POSTS
+        self.ordered = ordered
+        self.state = state
+        self._pending_posts = threading.BoundedSemaphore(self.max_pending_posts)
+
+        self._lock = threading.Condition()
+        self._outstanding = 0
+        self._listing_sizes = {}
+        self._ready = {}
+        self._cursor = (0, 0)
+        self._on_result = None
+        self._on_listing = None
+        # Results wait here until delivered outside the lock; _deliver_lock keeps their order.
+        self._outbox = deque()
+        self._deliver_lock = threading.Lock()
+        self.callback_errors = []
+
+    def build_input(self, post, comments):
+        comment_texts = prepare_comments(comment.body for comment in walk_comments(comments))
+        return f"Post: {post.title}\n{post.selftext}\n\nComments:\n" + "\n".join(comment_texts)
+
+    def run(self, on_result=None, on_listing=None):
+        """Run the sweep. Each result is passed to ``on_result`` in report order.
+
+        When no callback is given the results are collected and returned.
+        ``on_listing(subreddit, post_count, error)`` is called once per
+        subreddit; ``RedditClient`` reports a failed listing as an empty one.
+        Callbacks run outside the sweep's lock. If one raises, the sweep
+        carries on, and the first error is raised once it is done.
+        """
+        collected = []
+        self._on_result = on_result or collected.append
+        self._on_listing = on_listing
+        self.callback_errors = []
+
+        with ThreadPoolExecutor(max_workers=self.listing_workers) as self._listing_pool, \
+                ThreadPoolExecutor(max_workers=self.comment_workers) as self._comment_pool, \
+                ThreadPoolExecutor(max_workers=self.max_inflight_llm) as self._llm_pool:
+            for subreddit_index, subreddit in enumerate(self.subreddits):
+                self._submit(self._listing_pool, self._fetch_listing, subreddit_index, subreddit)
+            with self._lock:
+                while self._outstanding:
+                    self._lock.wait()
+
+        if self.callback_errors:
+            raise self.callback_errors[0]
+        return collected
+
+    def _submit(self, pool, fn, *args):
+        with self._lock:
+            self._outstanding += 1
+        pool.submit(self._run_stage, fn, *args)
+
+    def _run_stage(self, fn, *args):
+        try:
+            with request_priority(SWEEP):
+                fn(*args)
+        finally:
+            with self._lock:
+                self._outstanding -= 1
+                self._lock.notify_all()
+
+    def _fetch_listing(self, subreddit_index, subreddit):
+        error = None
+        try:
+            posts = self.reddit_client.get_posts(subreddit, self.sort, self.post_limit)
+            # A cached listing may be old: refresh its posts in one batched request.
+            self.reddit_client.hydrate_posts(posts)
+        except Exception as e:
+            print(f"Error fetching listing for {subreddit}: {e}")
+            posts = []
+            error = e
+        if self._on_listing is not None:
+            self._call(self._on_listing, subreddit, len(posts), error)
+        for rank, post in enumerate(posts):
+            self._submit(self._comment_pool, self._fetch_comments, subreddit_index, subreddit, rank, post)
+        if self.ordered:
+            with self._lock:
+                self._listing_sizes[subreddit_index] = len(posts)
+                self._emit_ready()
+            self._deliver()
+
+    def _fetch_comments(self, subreddit_index, subreddit, rank, post):
+        if self.state is not None:
+            try:
+                analysis = self.state.reusable_analysis(post)
+            except Exception as e:
+                print(f"Error reading the sweep state for {post.id}: {e}")
+                analysis = None
+            if analysis is not None:
+                self._finish(subreddit_index, SweepResult(subreddit, rank, post, analysis=analysis, reused=True))
+                return
+        # Blocks this comment worker while too many trees wait for the LLM.
+        self._pending_posts.acquire()
+        try:
+            comments = self.reddit_client.get_comments(post)
+        except Exception as e:
+            self._pending_posts.release()
+            self._finish(subreddit_index, SweepResult(subreddit, rank, post, error=e))
+            return
+        self._submit(self._llm_pool, self._analyze, subreddit_index, subreddit, rank, post, comments)
+
+    def _analyze(self, subreddit_index, subreddit, rank, post, comments):
+        try:
+            analysis = self.ai_client.system_command(self.build_input(post, comments))
+            result = SweepResult(subreddit, rank, post, analysis=analysis)
+        except Exception as e:
+            result = SweepResult(subreddit, rank, post, error=e)
+        finally:
+            self._pending_posts.release()
+        if self.state is not None and result.error is None:
+            try:
+                self.state.record(post, result.analysis)
+            except Exception as e:
+                print(f"Error saving the sweep state for {post.id}: {e}")
+        self._finish(subreddit_index, result)
+
+    def _finish(self, subreddit_index, result):
+        with self._lock:
+            if not self.ordered:
+                self._outbox.append(result)
+            else:
+                self._ready[(subreddit_index, result.rank)] = result
+                self._emit_ready()
+        self._deliver()
+
+    def _deliver(self):
+        # Called without the lock. One thread at a time drains the outbox, so results keep their order.
+        with self._deliver_lock:
+            while True:
+                with self._lock:
+                    if not self._outbox:
+                        return
+                    result = self._outbox.popleft()
+                self._call(self._on_result, result)
+
+    def _call(self, callback, *args):
+        try:
+            callback(*args)
+        except Exception as e:
+            print(f"Error in sweep callback: {e}")
+            with self._lock:
+                self.callback_errors.append(e)
+
+    def _emit_ready(self):
+        # Called with the lock held; queues results for delivery strictly in report order.
+        subreddit_index, rank = self._cursor
+        while subreddit_index in self._listing_sizes:
+            if rank >= self._listing_sizes[subreddit_index]:
+                subreddit_index, rank = subreddit_index + 1, 0
+                continue
+            result = self._ready.pop((subreddit_index, rank), None)
+            if result is None:
+                break
+            self._outbox.append(result)
+            rank += 1
+        self._cursor = (subreddit_index, rank)
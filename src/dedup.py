@@ -0,0 +1,175 @@
+# dedup.py
+
+import logging
+import re
+import threading
+from .config import config
+from .metrics import metrics
+from .tokens import get_encoder
+
+_NORMALIZE = re.compile(r"[\W_]+")
+
+class DedupResult:
+    """Comments with near-duplicates collapsed into their first occurrence.
+
+    ``texts`` keeps the input order; a representative of a group of ``n``
+    comments ends with " [xn]". ``counts[i]`` is the size of ``texts[i]``'s
+    group and ``indices[i]`` the input position of its representative.
+    Token counts are only computed when read.
+    """
+
+    def __init__(self, texts, counts, indices, comments):
+        self.texts = texts
+        self.counts = counts
+        self.indices = indices
+        self._comments = comments
+        self._tokens_before = None
+        self._tokens_after = None
+
+    @property
+    def tokens_before(self):
+        if self._tokens_before is None:
+            self._tokens_before = _count_tokens(self._comments)
+        return self._tokens_before
+
+    @property
+    def tokens_after(self):
+        if self._tokens_after is None:
+            self._tokens_after = self.tokens_before if self.texts is self._comments else _count_tokens(self.texts)
+        return self._tokens_after
+
+    @property
+    def comments_before(self):
+        return sum(self.counts)
+
+    @property
+    def removed(self):
+        return self.comments_before - len(self.texts)
+
+    @property
+    def tokens_removed(self):
+        return self.tokens_before - self.tokens_after if self.removed else 0
+
+class DedupStats:
+    """Running totals over every ``dedupe_comments`` call, for the 'stats' command."""
+
+    def __init__(self):
+        self.calls = 0
+        self.comments_in = 0
+        self.comments_out = 0
+        self.tokens_removed = 0
+        self._lock = threading.Lock()
+
+    def add(self, result):
+        # Tokens are only counted when something was removed.
+        removed = result.tokens_removed
+        with self._lock:
+            self.calls += 1
+            self.comments_in += result.comments_before
+            self.comments_out += len(result.texts)
+            self.tokens_removed += removed
+            tokens_removed = self.tokens_removed
+        if removed:
+            metrics.set_gauge('dedup_tokens_removed_total', tokens_removed)
+
+    def stats(self):
+        with self._lock:
+            return {'calls': self.calls, 'comments_in': self.comments_in, 'comments_out': self.comments_out,
+                    'tokens_removed': self.tokens_removed}
+
+dedup_stats = DedupStats()
+
+def _exact_groups(comments):
+    # Case, punctuation and whitespace never make two comments different:
+    # "This!!" and "this" are the same comment.
+    first = {}
+    groups = []
+    for i, comment in enumerate(comments):
+        key = _NORMALIZE.sub(' ', comment.lower()).strip()
+        if key in first:
+            groups[first[key]].append(i)
+        else:
+            first[key] = len(groups)
+            groups.append([i])
+    return groups
+
+def _near_duplicate_groups(comments, groups, threshold, block_size=512):
+    """Merge ``groups`` whose representatives have cosine similarity >= ``threshold``.
+
+    Representatives are vectorized as hashed word uni- and bigram counts, so
+    there is no vocabulary to fit. There is no IDF weighting on purpose:
+    fitted on one thread it would down-weight exactly the text that is
+    repeated, and a bot's one changed word would dominate the vector.
+    Similarities are computed ``block_size`` rows at a time to bound memory,
+    and each group absorbs the later, still unassigned groups similar enough.
+    """
+    from sklearn.feature_extraction.text import HashingVectorizer
+
+    representatives = [comments[group[0]] for group in groups]
+    vectorizer = HashingVectorizer(ngram_range=(1, 2), n_features=2 ** 20, alternate_sign=False)
+    matrix = vectorizer.transform(representatives).tocsr()
+    transposed = matrix.T.tocsc()
+
+    absorbed_by = [None] * len(groups)
+    for start in range(0, len(groups), block_size):
+        similarities = (matrix[start:start + block_size] @ transposed).tocsr()
+        similarities.data[similarities.data < threshold] = 0
+        similarities.eliminate_zeros()
+        for row in range(similarities.shape[0]):
+            i = start + row
+            if absorbed_by[i] is not None:
+                continue
+            begin, end = similarities.indptr[row], similarities.indptr[row + 1]
+            for j in similarities.indices[begin:end]:
+                if j > i and absorbed_by[j] is None:
+                    absorbed_by[j] = i
+
+    merged = {}
+    for i, group in enumerate(groups):
+        merged.setdefault(i if absorbed_by[i] is None else absorbed_by[i], []).extend(group)
+    return [sorted(group) for _, group in sorted(merged.items())]
+
+def _count_tokens(texts):
+    if not texts:
+        return 0
+    return sum(len(tokens) for tokens in get_encoder().encode_ordinary_batch(texts))
+
+def dedupe_comments(comments, threshold=None):
+    """Collapse duplicate and near-duplicate comment texts before they go into a prompt.
+
+    Exact duplicates (ignoring case and punctuation) are always merged;
+    near-duplicates need scikit-learn and are skipped without it. Returns a
+    ``DedupResult`` and adds it to ``dedup_stats``.
+    """
+    comments = list(comments)
+    threshold = config.COMMENT_DEDUP_THRESHOLD if threshold is None else threshold
+    groups = _exact_groups(comments)
+    if threshold < 1.0 and len(groups) > 1:
+        try:
+            groups = _near_duplicate_groups(comments, groups, threshold)
+        except ImportError as e:
+            logging.info(f"Near-duplicate detection unavailable ({e}), removing exact duplicates only")
+
+    texts = [comments[group[0]] + (f" [x{len(group)}]" if len(group) > 1 else "") for group in groups]
+    counts = [len(group) for group in groups]
+    indices = [group[0] for group in groups]
+    if len(texts) == len(comments):
+        result = DedupResult(comments, counts, indices, comments)
+    else:
+        result = DedupResult(texts, counts, indices, comments)
+    dedup_stats.add(result)
+    if result.removed:
+        logging.info(f"Collapsed {result.removed} duplicate comments, {result.tokens_removed} tokens removed")
+    return result
+
+def prepare_comments(comments):
+    """``dedupe_comments(comments).texts`` when COMMENT_DEDUP_ENABLED, else the comments as they are."""
+    return prepare_scored_comments(comments)[0]
+
+def prepare_scored_comments(comments, scores=None):
+    """Like ``prepare_comments``, also returning the scores of the comments kept (or None)."""
+    comments = list(comments)
+    if not config.COMMENT_DEDUP_ENABLED:
+        return comments, scores
+    result = dedupe_comments(comments)
+    return result.texts, None if scores is None else [scores[i] for i in result.indices]
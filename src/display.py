@@ -3,7 +3,59 @@
 from rich.console import Console
 from rich.table import Table
 from rich.text import Text
+from rich.markup import escape
 import textwrap
+from .models import MoreReplies
+from .comment_utils import CommentIndex
+from .search_index import MATCH_START, MATCH_END
+
+class MarkdownStream:
+    """Stream sink for ``completions.complete`` that renders the text so far as Markdown.
+
+    Use it as a context manager; the live view is stopped on exit even when
+    the request fails half way.
+    """
+
+    def __init__(self, console, title=None):
+        from rich.live import Live  # rich.markdown pulls in pygments; keep both off the startup path
+
+        self.console = console
+        self.title = title
+        self.parts = []
+        self.stats = None
+        # The Markdown is rebuilt at each refresh rather than per delta, so a
+        # long answer is parsed a few times a second instead of once per token.
+        self._live = Live(console=console, get_renderable=self._render, refresh_per_second=8,
+                          vertical_overflow="visible")
+
+    def __enter__(self):
+        if self.title:
+            self.console.print(self.title)
+        self._live.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._live.stop()
+        return False
+
+    def _render(self):
+        from rich.markdown import Markdown
+
+        return Markdown("".join(self.parts))
+
+    def write(self, delta):
+        self.parts.append(delta)
+
+    def close(self, stats):
+        self._live.stop()
+        self.stats = stats
+        if stats.cached:
+            self.console.print("[dim](cached response)[/dim]")
+        elif stats.first_token_seconds is not None:
+            self.console.print(
+                f"[dim]First token after {stats.first_token_seconds:.1f}s, "
+                f"{stats.completion_tokens} tokens at {stats.tokens_per_second:.1f} tokens/s[/dim]"
+            )
 
 class ConsoleUI:
     def __init__(self):
@@ -80,22 +132,27 @@ class ConsoleUI:
             self.console.print("No topics were extracted.")
 
     def display_threaded_comments(self, comments, start=0, count=10):
+        # Accepts a prebuilt CommentIndex (see CommentManager) or a plain comment list.
+        index = comments if isinstance(comments, CommentIndex) else CommentIndex(comments)
         displayed = 0
-        flat_comments = list(self.flatten_comments(comments))
-        for i, comment in enumerate(flat_comments[start:], start=1):
-            if displayed >= count:
-                break
+        for i, comment in enumerate(index.page(start, count), start=start + 1):
             self.display_comment(comment, i)
             displayed += 1
-        self.console.print("\nEnter 'e <number>' to expand or 'c <number>' to collapse a comment thread.")
+        self.console.print("\nEnter 'e <number>' to expand or 'c <number>' to collapse a comment thread, or 'e <number>' on a 'load more' entry to fetch it.")
         return displayed
 
+    def stream_markdown(self, title=None):
+        return MarkdownStream(self.console, title)
+
     def display_ai_analysis(self, subreddit, analysis):
         self.console.print(f"\n[bold]AI Analysis of r/{subreddit}:[/bold]\n")
         self.console.print(analysis)
 
     def display_comment(self, comment, number):
         indent = "  " * min(comment.depth, 6)  # Limit depth to 6
+        if isinstance(comment, MoreReplies):
+            self.console.print(f"{indent}\\[+] [cyan]{number}.[/cyan] [blue]{escape(comment.body)}[/blue]")
+            return
         collapse_symbol = "[-]" if not comment.collapsed else "[+]"
         self.console.print(f"{indent}{collapse_symbol} [cyan]{number}.[/cyan] [yellow]{comment.author}[/yellow] [green](Score: {comment.score})[/green]")
         
@@ -108,12 +165,136 @@ class ConsoleUI:
             if comment.collapsed or comment.is_root:
                 self.console.print(f"{indent}  [blue]{reply_count} repl{'y' if reply_count == 1 else 'ies'}[/blue]")
 
-    def flatten_comments(self, comments, depth=0, max_depth=6):
+    def flatten_comments(self, comments, depth=0, max_depth=None):
         for comment in comments:
-            if depth < max_depth:
+            if max_depth is None or depth < max_depth:
                 yield comment
                 yield from self.flatten_comments(comment.children, depth + 1, max_depth)
 
+    def display_cache_stats(self, stats):
+        if not stats:
+            self.console.print("Caching is disabled.")
+            return
+        table = Table(title=f"Cache ({stats['bytes'] / 1024:.0f} KiB of {stats['max_bytes'] / 1024:.0f} KiB)")
+        table.add_column("Kind", style="cyan")
+        table.add_column("Entries", style="magenta")
+        table.add_column("Hits", style="green")
+        table.add_column("Misses", style="red")
+        table.add_column("TTL (s)", style="yellow")
+
+        for kind, kind_stats in stats['kinds'].items():
+            table.add_row(kind, str(kind_stats['entries']), str(kind_stats['hits']),
+                          str(kind_stats['misses']), str(kind_stats['ttl']))
+
+        self.console.print(table)
+        self.console.print(f"Evictions: {stats['evictions']}")
+
+    def display_index_stats(self, stats):
+        if not stats:
+            self.console.print("The local search index is disabled.")
+            return
+        self.console.print(f"Search index: {stats['posts']} posts, {stats['comments']} comments")
+
+    def display_completion_cache_stats(self, stats):
+        if not stats:
+            self.console.print("AI response caching is disabled.")
+            return
+        self.console.print(
+            f"AI cache: {stats['hits']} hits, {stats['misses']} misses, "
+            f"{stats['tokens_saved']} tokens and {stats['seconds_saved']:.1f}s saved"
+            + (" (bypassed)" if stats['bypass'] else "")
+        )
+
+    def display_scheduler_stats(self, stats):
+        remaining = "unknown" if stats['remaining'] is None else f"{stats['remaining']:.0f}"
+        queued = ", ".join(f"{name} {depth}" for name, depth in stats['queued'].items())
+        self.console.print(
+            f"Reddit scheduler: {stats['rate_per_minute']:.0f} requests/min, {remaining} left in the window, "
+            f"{stats['in_flight']} in flight, queued: {queued}, {stats['throttled']} throttled (429)"
+        )
+
+    def display_dedup_stats(self, stats):
+        if not stats:
+            self.console.print("Comment deduplication is disabled.")
+            return
+        self.console.print(
+            f"Comment dedup: {stats['comments_in'] - stats['comments_out']} of {stats['comments_in']} comments collapsed "
+            f"in {stats['calls']} prompts, {stats['tokens_removed']} tokens removed"
+        )
+
+    def display_search_hits(self, query, hits, seconds):
+        if not hits:
+            self.console.print(f"No fetched posts or comments match '{escape(query)}' ({seconds * 1000:.1f} ms).")
+            return
+        table = Table(title=f"Local results for '{escape(query)}' ({len(hits)} in {seconds * 1000:.1f} ms)")
+        table.add_column("No.", style="cyan", no_wrap=True)
+        table.add_column("Kind", style="blue")
+        table.add_column("Subreddit", style="yellow")
+        table.add_column("Score", style="bold")
+        table.add_column("Match", style="magenta")
+
+        for i, hit in enumerate(hits, 1):
+            snippet = escape(hit.snippet).replace(MATCH_START, "[bold red]").replace(MATCH_END, "[/bold red]")
+            match = f"[bold]{escape(textwrap.shorten(hit.title, width=60))}[/bold]\n{snippet}"
+            table.add_row(str(i), hit.kind, hit.subreddit or "", self.color_score(hit.score), match)
+
+        self.console.print(table)
+
+    def display_metrics(self, snapshot):
+        if not snapshot['calls']:
+            self.console.print("No Reddit or OpenAI calls made yet.")
+            return
+        table = Table(title=f"Outbound calls ({snapshot['uptime_seconds']:.0f}s)")
+        table.add_column("Service", style="cyan")
+        table.add_column("Operation", style="magenta", no_wrap=True)
+        table.add_column("Calls", justify="right")
+        table.add_column("Errors", style="red", justify="right")
+        table.add_column("Total (s)", justify="right")
+        table.add_column("p50 (s)", justify="right")
+        table.add_column("p95 (s)", justify="right")
+        table.add_column("Max (s)", justify="right")
+
+        for call in snapshot['calls']:
+            table.add_row(call['service'], call['operation'], str(call['calls']), str(call['errors']),
+                          f"{call['seconds_total']:.2f}", f"{call['seconds_p50']:.2f}", f"{call['seconds_p95']:.2f}",
+                          f"{call['seconds_max']:.2f}")
+        self.console.print(table)
+
+        if snapshot['first_token']:
+            streams = Table(title="Time to first token")
+            streams.add_column("Service", style="cyan")
+            streams.add_column("Operation", style="magenta", no_wrap=True)
+            streams.add_column("Streams", justify="right")
+            streams.add_column("p50 (s)", justify="right")
+            streams.add_column("p95 (s)", justify="right")
+            streams.add_column("Max (s)", justify="right")
+            for row in snapshot['first_token']:
+                streams.add_row(row['service'], row['operation'], str(row['streams']), f"{row['seconds_p50']:.2f}",
+                                f"{row['seconds_p95']:.2f}", f"{row['seconds_max']:.2f}")
+            self.console.print(streams)
+
+        if snapshot['tokens']:
+            tokens = Table(title="OpenAI tokens")
+            tokens.add_column("Model", style="cyan")
+            tokens.add_column("Template", style="magenta")
+            tokens.add_column("Requests", justify="right")
+            tokens.add_column("Prompt", justify="right")
+            tokens.add_column("Completion", justify="right")
+            for row in snapshot['tokens']:
+                tokens.add_row(row['model'], row['template'], str(row['requests']), str(row['prompt']), str(row['completion']))
+            self.console.print(tokens)
+
+    def display_startup_timing(self, rows):
+        table = Table(title="Startup Timing")
+        table.add_column("Phase", style="cyan")
+        table.add_column("Step (ms)", style="magenta", justify="right")
+        table.add_column("Total (ms)", style="bold", justify="right")
+
+        for label, step, total in rows:
+            table.add_row(label, f"{step * 1000:.0f}", f"{total * 1000:.0f}")
+
+        self.console.print(table)
+
     def display_help(self):
         help_text = """
         Available commands:
@@ -127,13 +308,18 @@ class ConsoleUI:
         p                   - View previous page of comments
         b                   - Go back to post list
         o                   - Open the current post's URL in your default web browser
-        e <number>          - Expand a specific comment thread
+        e <number>          - Expand a specific comment thread, or load the replies behind a 'load more' entry
         c <number>          - Collapse a specific comment thread
         sort <method>       - Sort comments. Options: best, new, controversial
         collapse_all        - Collapse all comments to show only root-level comments
         more                - Show more comments (not implemented)
+        cache               - Show Reddit and AI cache statistics
+        stats               - Show latency, call counts, errors and OpenAI token usage
+        cache clear         - Empty the Reddit cache
         q                   - Quit the program
         s                   - Search and summarize (available globally)
+        find <query>        - Search posts and comments already fetched, also offline. Filters:
+                              r/<subreddit>, t:<hour|day|week|month|year>, score:<minimum>
         analyze             - Get AI analysis of the current subreddit
         analyze_post [number] - Analyze a specific post from the list
 
@@ -144,6 +330,7 @@ class ConsoleUI:
         - The default post limit is 10.
         - The search and summarize feature can now be used globally.
         - You need to set up your OpenAI API key in the .env file for the summarize feature to work.
+        - Set OFFLINE_MODE=1 in the .env file to browse only what is already cached.
         """
 
         self.console.print(help_text)
@@ -0,0 +1,123 @@
+# extractive.py
+
+import logging
+import math
+import re
+import threading
+
+_SENTENCE_END = re.compile(r"(?<=[.!?])\s+|\n+")
+
+class ExtractiveSelector:
+    """Picks the most central, best-scored comment sentences that fit a token budget.
+
+    Every sentence of every comment becomes a TF-IDF vector. Sentences are
+    ranked with TextRank, i.e. PageRank over their cosine similarity graph,
+    teleporting to sentences in proportion to ``1 + log(1 + score)`` of the
+    comment they come from, so upvoted comments and sentences many others
+    agree with come first. Sentences are then taken best first, skipping
+    any that is too similar to one already taken, until the budget is full,
+    and put back together in their original order.
+    """
+
+    def __init__(self, max_sentences=2000, min_words=3, damping=0.85, redundancy=0.6, iterations=50):
+        import numpy as np
+        from sklearn.feature_extraction.text import TfidfVectorizer
+
+        self._np = np
+        self._vectorizer_class = TfidfVectorizer
+        self.max_sentences = max_sentences
+        self.min_words = min_words
+        self.damping = damping
+        self.redundancy = redundancy
+        self.iterations = iterations
+
+    def split(self, comments, scores=None):
+        """Return ``(comment_index, sentence)`` pairs, capped at ``max_sentences``.
+
+        Sentences shorter than ``min_words`` words are dropped unless they are a
+        whole comment. Past the cap, the best-scored comments are kept.
+        """
+        order = range(len(comments))
+        if scores is not None:
+            order = sorted(order, key=lambda i: -scores[i])
+        sentences = []
+        for i in order:
+            parts = [part.strip() for part in _SENTENCE_END.split(comments[i]) if part.strip()]
+            for part in parts:
+                if len(parts) == 1 or len(part.split()) >= self.min_words:
+                    sentences.append((i, part))
+            if len(sentences) >= self.max_sentences:
+                break
+        return sorted(sentences[:self.max_sentences], key=lambda pair: pair[0])
+
+    def rank(self, sentences, weights):
+        """TextRank score of each sentence, personalized by ``weights``, and the similarity matrix."""
+        np = self._np
+        try:
+            vectors = self._vectorizer_class(stop_words='english', sublinear_tf=True).fit_transform(sentences)
+        except ValueError:
+            # Nothing but stop words: fall back to the weights alone.
+            return np.asarray(weights, dtype=np.float64), None
+        similarity = (vectors @ vectors.T).toarray()
+        np.fill_diagonal(similarity, 0.0)
+        out_weight = similarity.sum(axis=1, keepdims=True)
+        transition = np.divide(similarity, out_weight, out=np.zeros_like(similarity), where=out_weight > 0)
+
+        teleport = np.asarray(weights, dtype=np.float64)
+        teleport /= teleport.sum()
+        ranks = teleport.copy()
+        dangling = out_weight.ravel() == 0
+        for _ in range(self.iterations):
+            # Sentences with no neighbours hand their rank back through the teleport vector.
+            updated = self.damping * (ranks @ transition + ranks[dangling].sum() * teleport) + (1 - self.damping) * teleport
+            if np.abs(updated - ranks).sum() < 1e-6:
+                ranks = updated
+                break
+            ranks = updated
+        return ranks, similarity
+
+    def select(self, comments, max_tokens, count_tokens, scores=None):
+        """Return the selected sentences of ``comments`` as one string per comment kept."""
+        np = self._np
+        sentences = self.split(comments, scores)
+        if not sentences:
+            return []
+        texts = [sentence for _, sentence in sentences]
+        weights = [1.0 + math.log1p(max(scores[i], 0)) if scores is not None else 1.0 for i, _ in sentences]
+        ranks, similarity = self.rank(texts, weights)
+        tokens = count_tokens(texts)
+
+        chosen = []
+        used = 0
+        for position in np.argsort(-ranks, kind='stable'):
+            if max_tokens - used < 2:
+                break
+            # +1 for the space or newline the sentence is joined with
+            if used + tokens[position] + 1 > max_tokens:
+                continue
+            if similarity is not None and chosen and similarity[position, chosen].max() >= self.redundancy:
+                continue
+            chosen.append(position)
+            used += tokens[position] + 1
+
+        kept = {}
+        for position in sorted(chosen):
+            comment_index, sentence = sentences[position]
+            kept.setdefault(comment_index, []).append(sentence)
+        return [" ".join(parts) for _, parts in sorted(kept.items())]
+
+_selector = None
+_selector_lock = threading.Lock()
+_selector_unavailable = False
+
+def get_extractive_selector():
+    """The shared ``ExtractiveSelector``, or None when NumPy or scikit-learn is missing."""
+    global _selector, _selector_unavailable
+    with _selector_lock:
+        if _selector is None and not _selector_unavailable:
+            try:
+                _selector = ExtractiveSelector()
+            except ImportError as e:
+                logging.info(f"Extractive comment selection unavailable ({e}), truncating instead")
+                _selector_unavailable = True
+        return _selector
@@ -0,0 +1,208 @@
+# metrics.py
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+
+# Upper bounds (seconds) of the latency histogram buckets; the last bucket is +Inf
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        """Upper bound of the bucket holding the ``q`` quantile, capped at the largest value seen."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return min(self.buckets[i], self.max) if i < len(self.buckets) else self.max
+        return self.max
+
+class Metrics:
+    """Process-wide counters for every outbound Reddit and OpenAI call.
+
+    ``timed(service, operation)`` wraps a call: it counts it, records its
+    latency in a histogram and counts it as an error when it raises.
+    ``record_usage`` adds the prompt and completion tokens OpenAI billed, and
+    ``set_gauge`` holds point-in-time values such as queue depths.
+    ``observe_first_token`` records the time to the first streamed token of
+    a call already counted by ``timed``; it has its own histograms so it
+    does not add to the call counts.
+    ``snapshot`` returns everything as plain data, and ``to_prometheus``
+    renders it in the Prometheus text exposition format.
+    """
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._latency = {}
+        self._errors = {}
+        self._first_token = {}
+        self._tokens = {}
+        self._gauges = {}
+
+    @contextmanager
+    def timed(self, service, operation):
+        start = time.perf_counter()
+        failed = False
+        try:
+            yield
+        except BaseException:
+            failed = True
+            raise
+        finally:
+            self.observe(service, operation, time.perf_counter() - start, failed)
+
+    def observe(self, service, operation, seconds, failed=False):
+        key = (service, operation)
+        with self._lock:
+            histogram = self._latency.get(key)
+            if histogram is None:
+                histogram = self._latency[key] = Histogram(self.buckets)
+                self._errors[key] = 0
+            histogram.observe(seconds)
+            if failed:
+                self._errors[key] += 1
+
+    def observe_first_token(self, service, operation, seconds):
+        key = (service, operation)
+        with self._lock:
+            histogram = self._first_token.get(key)
+            if histogram is None:
+                histogram = self._first_token[key] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def record_usage(self, model, template, usage):
+        if usage is None:
+            return
+        key = (model, template)
+        with self._lock:
+            tokens = self._tokens.setdefault(key, {'requests': 0, 'prompt': 0, 'completion': 0})
+            tokens['requests'] += 1
+            tokens['prompt'] += getattr(usage, 'prompt_tokens', 0) or 0
+            tokens['completion'] += getattr(usage, 'completion_tokens', 0) or 0
+
+    def set_gauge(self, name, value, **labels):
+        with self._lock:
+            self._gauges[(name, tuple(sorted(labels.items())))] = value
+
+    def reset(self):
+        with self._lock:
+            self._latency.clear()
+            self._errors.clear()
+            self._first_token.clear()
+            self._tokens.clear()
+            self._gauges.clear()
+            self.started = time.time()
+
+    def snapshot(self):
+        with self._lock:
+            calls = [{
+                'service': service,
+                'operation': operation,
+                'calls': histogram.count,
+                'errors': self._errors[(service, operation)],
+                'seconds_total': histogram.sum,
+                'seconds_max': histogram.max,
+                'seconds_p50': histogram.quantile(0.5),
+                'seconds_p95': histogram.quantile(0.95),
+                'buckets': dict(zip([str(bound) for bound in histogram.buckets] + ['+Inf'], histogram.counts)),
+            } for (service, operation), histogram in sorted(self._latency.items())]
+            first_token = [{
+                'service': service,
+                'operation': operation,
+                'streams': histogram.count,
+                'seconds_total': histogram.sum,
+                'seconds_max': histogram.max,
+                'seconds_p50': histogram.quantile(0.5),
+                'seconds_p95': histogram.quantile(0.95),
+                'buckets': dict(zip([str(bound) for bound in histogram.buckets] + ['+Inf'], histogram.counts)),
+            } for (service, operation), histogram in sorted(self._first_token.items())]
+            tokens = [{'model': model, 'template': template, **counts}
+                      for (model, template), counts in sorted(self._tokens.items())]
+            gauges = [{'name': name, 'labels': dict(labels), 'value': value}
+                      for (name, labels), value in sorted(self._gauges.items())]
+        return {'started_utc': self.started, 'uptime_seconds': time.time() - self.started,
+                'calls': calls, 'first_token': first_token, 'tokens': tokens, 'gauges': gauges}
+
+    def to_json(self):
+        return json.dumps(self.snapshot(), indent=2)
+
+    def to_prometheus(self, prefix='reddit_terminal'):
+        snapshot = self.snapshot()
+        lines = [
+            f"# HELP {prefix}_call_duration_seconds Latency of outbound Reddit and OpenAI calls.",
+            f"# TYPE {prefix}_call_duration_seconds histogram",
+        ]
+        for call in snapshot['calls']:
+            labels = f'service="{call["service"]}",operation="{call["operation"]}"'
+            cumulative = 0
+            for bound, count in call['buckets'].items():
+                cumulative += count
+                lines.append(f'{prefix}_call_duration_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{prefix}_call_duration_seconds_sum{{{labels}}} {call['seconds_total']}")
+            lines.append(f"{prefix}_call_duration_seconds_count{{{labels}}} {call['calls']}")
+        lines += [
+            f"# HELP {prefix}_first_token_seconds Time to the first token of streamed OpenAI calls.",
+            f"# TYPE {prefix}_first_token_seconds histogram",
+        ]
+        for stream in snapshot['first_token']:
+            labels = f'service="{stream["service"]}",operation="{stream["operation"]}"'
+            cumulative = 0
+            for bound, count in stream['buckets'].items():
+                cumulative += count
+                lines.append(f'{prefix}_first_token_seconds_bucket{{{labels},le="{bound}"}} {cumulative}')
+            lines.append(f"{prefix}_first_token_seconds_sum{{{labels}}} {stream['seconds_total']}")
+            lines.append(f"{prefix}_first_token_seconds_count{{{labels}}} {stream['streams']}")
+        lines += [
+            f"# HELP {prefix}_call_errors_total Outbound calls that raised.",
+            f"# TYPE {prefix}_call_errors_total counter",
+        ]
+        for call in snapshot['calls']:
+            lines.append(f'{prefix}_call_errors_total{{service="{call["service"]}",operation="{call["operation"]}"}} {call["errors"]}')
+        lines += [
+            f"# HELP {prefix}_openai_tokens_total Tokens billed by OpenAI.",
+            f"# TYPE {prefix}_openai_tokens_total counter",
+        ]
+        for tokens in snapshot['tokens']:
+            labels = f'model="{tokens["model"]}",template="{tokens["template"]}"'
+            lines.append(f'{prefix}_openai_tokens_total{{{labels},type="prompt"}} {tokens["prompt"]}')
+            lines.append(f'{prefix}_openai_tokens_total{{{labels},type="completion"}} {tokens["completion"]}')
+        typed = set()
+        for gauge in snapshot['gauges']:
+            name = f"{prefix}_{gauge['name']}"
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} {'counter' if name.endswith('_total') else 'gauge'}")
+            labels = ",".join(f'{key}="{value}"' for key, value in gauge['labels'].items())
+            lines.append(f"{name}{{{labels}}} {gauge['value']}" if labels else f"{name} {gauge['value']}")
+        return "\n".join(lines) + "\n"
+
+    def dump(self, path, fmt='json'):
+        """Write the metrics to ``path`` as 'json' or 'prometheus' text."""
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(self.to_prometheus() if fmt == 'prometheus' else self.to_json() + "\n")
+
+metrics = Metrics()
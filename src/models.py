@@ -1,6 +1,10 @@
 # models.py
 
+from array import array
+
 class Post:
+    __slots__ = ('title', 'score', 'author', 'num_comments', 'url', 'id', 'text', 'selftext', 'created_utc', 'edited')
+
     def __init__(self, title, score, author, num_comments, url, id=None, text=''):
         self.title = title
         self.score = score
@@ -9,8 +13,13 @@ class Post:
         self.url = url
         self.id = id
         self.text = text
+        self.selftext = text  # Refreshed by RedditClient.get_post_content
+        self.created_utc = None
+        self.edited = False  # Reddit's edit timestamp, or False
 
 class Comment:
+    __slots__ = ('id', 'author', 'score', 'body', 'depth', 'children', 'collapsed', 'has_more_replies', 'is_root')
+
     def __init__(self, author, score, body, depth=0, id=None):
         self.id = id
         self.author = author if author else '[deleted]'
@@ -20,4 +29,225 @@ class Comment:
         self.children = []
         self.collapsed = False  # Start expanded by default
         self.has_more_replies = False
-        self.is_root = depth == 0
\ No newline at end of file
+        self.is_root = depth == 0
+
+
+class MoreReplies(Comment):
+    """Placeholder for replies that have not been fetched yet.
+
+    ``reply_ids`` are the ids Reddit reported for the missing comments; an
+    empty list with ``count == 0`` is a "continue this thread" link, which is
+    loaded through ``parent_id`` instead.
+    """
+
+    __slots__ = ('submission_id', 'parent_id', 'reply_ids', 'count', 'store')
+
+    def __init__(self, submission_id, parent_id, reply_ids, count, depth=0):
+        count = count or len(reply_ids)
+        label = f"load {count} more repl{'y' if count == 1 else 'ies'}" if count else "continue this thread"
+        super().__init__('', 0, f"[{label}]", depth)
+        self.submission_id = submission_id
+        self.parent_id = parent_id
+        self.reply_ids = list(reply_ids)
+        self.count = count
+        self.store = None  # Set when the placeholder lives in a CommentStore
+
+
+class CommentStore:
+    """A whole comment thread held as parallel arrays in pre-order.
+
+    Each comment is a row: ``parents`` holds the row of its parent (-1 for
+    top-level comments), ``sizes`` the number of rows in its subtree
+    (itself included), authors are interned and bodies live in one string
+    addressed by ``body_offsets``. ``MoreReplies`` placeholders keep their
+    row but are stored as objects on the side.
+
+    ``roots()`` returns ``CommentView`` objects that behave like ``Comment``
+    for the display and analysis code.
+    """
+
+    __slots__ = ('ids', 'parents', 'depths', 'scores', 'sizes', 'author_ids', 'authors',
+                 'body_offsets', 'bodies', 'collapsed', 'placeholders')
+
+    def __init__(self):
+        self.ids = []
+        self.parents = array('i')
+        self.depths = array('H')
+        self.scores = array('i')
+        self.sizes = array('I')
+        self.author_ids = array('I')
+        self.authors = []
+        self.body_offsets = array('I', [0])
+        self.bodies = ''
+        self.collapsed = bytearray()
+        self.placeholders = {}
+
+    @classmethod
+    def from_tree(cls, comments):
+        store = cls()
+        author_index = {}
+        body_parts = []
+        offset = 0
+        # (comment, parent row); sizes are filled in once a subtree is done.
+        stack = [(comment, -1) for comment in reversed(comments)]
+        open_rows = []
+
+        while stack:
+            comment, parent = stack.pop()
+            while open_rows and open_rows[-1] != parent:
+                row = open_rows.pop()
+                store.sizes[row] = len(store.ids) - row
+            row = len(store.ids)
+            store.ids.append(comment.id)
+            store.parents.append(parent)
+            store.depths.append(comment.depth)
+            store.scores.append(comment.score)
+            store.sizes.append(1)
+            store.collapsed.append(1 if comment.collapsed else 0)
+            if isinstance(comment, MoreReplies):
+                comment.store = store
+                store.placeholders[row] = comment
+            author = comment.author
+            if author not in author_index:
+                author_index[author] = len(store.authors)
+                store.authors.append(author)
+            store.author_ids.append(author_index[author])
+            body_parts.append(comment.body)
+            offset += len(comment.body)
+            store.body_offsets.append(offset)
+            open_rows.append(row)
+            stack.extend((child, row) for child in reversed(comment.children))
+
+        for row in open_rows:
+            store.sizes[row] = len(store.ids) - row
+        store.bodies = ''.join(body_parts)
+        return store
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __getstate__(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __setstate__(self, state):
+        for name, value in state.items():
+            setattr(self, name, value)
+        for placeholder in self.placeholders.values():
+            placeholder.store = self
+
+    def node(self, row):
+        return self.placeholders.get(row) or CommentView(self, row)
+
+    def children_rows(self, row):
+        child = row + 1
+        end = row + self.sizes[row]
+        while child < end:
+            yield child
+            child += self.sizes[child]
+
+    def children(self, row):
+        return [self.node(child) for child in self.children_rows(row)]
+
+    def roots(self):
+        rows = []
+        row = 0
+        while row < len(self.ids):
+            rows.append(self.node(row))
+            row += self.sizes[row]
+        return rows
+
+    def row_of(self, placeholder):
+        for row, candidate in self.placeholders.items():
+            if candidate is placeholder:
+                return row
+        return None
+
+    def replace(self, row, comments, roots=None):
+        """Return a new store with the subtree at ``row`` replaced by ``comments``.
+
+        ``roots`` gives the top-level order to keep (e.g. after re-sorting);
+        it defaults to the stored order.
+        """
+        def rebuild(siblings):
+            tree = []
+            for node in siblings:
+                index = node.row if isinstance(node, CommentView) else self.row_of(node)
+                if index == row:
+                    tree.extend(comments)
+                    continue
+                if isinstance(node, MoreReplies):
+                    tree.append(node)
+                    continue
+                comment = Comment(node.author, node.score, node.body, node.depth, node.id)
+                comment.collapsed = node.collapsed
+                comment.children = rebuild(node.children)
+                tree.append(comment)
+            return tree
+        return CommentStore.from_tree(rebuild(self.roots() if roots is None else roots))
+
+    def nbytes(self):
+        """Approximate memory held by the columns (interned strings counted once)."""
+        import sys
+        columns = (self.parents, self.depths, self.scores, self.sizes, self.author_ids, self.body_offsets)
+        total = sum(column.itemsize * len(column) for column in columns)
+        total += sys.getsizeof(self.ids) + sum(sys.getsizeof(comment_id) for comment_id in self.ids)
+        total += sys.getsizeof(self.authors) + sum(sys.getsizeof(author) for author in self.authors)
+        total += sys.getsizeof(self.bodies) + len(self.collapsed)
+        return total
+
+
+class CommentView:
+    """Read-mostly ``Comment`` facade over one row of a ``CommentStore``."""
+
+    __slots__ = ('store', 'row')
+
+    def __init__(self, store, row):
+        self.store = store
+        self.row = row
+
+    @property
+    def id(self):
+        return self.store.ids[self.row]
+
+    @property
+    def author(self):
+        return self.store.authors[self.store.author_ids[self.row]]
+
+    @property
+    def score(self):
+        return self.store.scores[self.row]
+
+    @property
+    def body(self):
+        offsets = self.store.body_offsets
+        return self.store.bodies[offsets[self.row]:offsets[self.row + 1]]
+
+    @property
+    def depth(self):
+        return self.store.depths[self.row]
+
+    @property
+    def is_root(self):
+        return self.store.parents[self.row] == -1
+
+    @property
+    def children(self):
+        return self.store.children(self.row)
+
+    @property
+    def has_more_replies(self):
+        return any(child in self.store.placeholders for child in self.store.children_rows(self.row))
+
+    @property
+    def collapsed(self):
+        return bool(self.store.collapsed[self.row])
+
+    @collapsed.setter
+    def collapsed(self, value):
+        self.store.collapsed[self.row] = 1 if value else 0
+
+    def __eq__(self, other):
+        return isinstance(other, CommentView) and other.store is self.store and other.row == self.row
+
+    def __hash__(self):
+        return hash((id(self.store), self.row))
@@ -1,5 +1,7 @@
 # post_analysis.py
 
+import re
+
 def extract_summary(post_title, post_content):
     return f"SUMMARY:\n- {post_title}: {post_content[:25]}..."
 
@@ -50,4 +52,83 @@ def extract_recommendations(comments):
     for comment in comments:
         if 'recommendation' in comment:
             recommendations.append(f"- {comment.strip()}.")
-    return recommendations
\ No newline at end of file
+    return recommendations
+# Single-pass extraction used by analyze_post. Produces the same entries as
+# the extract_* functions above, truncated to SECTION_CAPS.
+
+SECTION_CAPS = {
+    'ideas': 25,
+    'insights': 10,
+    'quotes': 20,
+    'habits': 20,
+    'facts': 20,
+    'references': 20,
+    'recommendations': 20,
+}
+
+SECTION_KEYWORDS = {
+    'habit': 'habits',
+    'fact': 'facts',
+    'reference': 'references',
+    'recommendation': 'recommendations',
+}
+
+_KEYWORD_PATTERN = re.compile('|'.join(re.escape(keyword) for keyword in SECTION_KEYWORDS))
+
+def extract_sections(post_title, post_content, comments, caps=None):
+    """Fill every analyze_post section in one pass over ``comments``.
+
+    Each comment is split into sentences at most once (ideas, insights and
+    quotes all come from the same sentences) and searched once for all
+    section keywords. A section stops collecting when it reaches its cap and
+    the scan ends as soon as every section is full, so the cost depends on
+    the caps rather than on the number of comments.
+    """
+    caps = {**SECTION_CAPS, **(caps or {})}
+    sections = {name: [] for name in caps}
+    sentence_cap = max(caps['ideas'], caps['quotes'], caps['insights'])
+    sentences = []
+    keyword_open = {keyword: caps[name] > 0 for keyword, name in SECTION_KEYWORDS.items()}
+    keywords_left = sum(keyword_open.values())
+
+    for comment in comments:
+        if len(sentences) < sentence_cap:
+            for sentence in comment.split('.'):
+                sentence = sentence.strip()
+                if sentence:
+                    sentences.append(f"- {sentence}.")
+                    if len(sentences) == sentence_cap:
+                        break
+        if keywords_left:
+            entry = None
+            for keyword in set(_KEYWORD_PATTERN.findall(comment)):
+                if not keyword_open[keyword]:
+                    continue
+                section = sections[SECTION_KEYWORDS[keyword]]
+                entry = entry or f"- {comment.strip()}."
+                section.append(entry)
+                if len(section) == caps[SECTION_KEYWORDS[keyword]]:
+                    keyword_open[keyword] = False
+                    keywords_left -= 1
+        elif len(sentences) >= sentence_cap:
+            break
+
+    sections['ideas'] = sentences[:caps['ideas']]
+    sections['quotes'] = sentences[:caps['quotes']]
+    sections['insights'] = extract_insights(sentences[:caps['insights']])
+    sections['summary'] = extract_summary(post_title, post_content)
+    sections['takeaway'] = extract_one_sentence_takeaway(post_title, post_content)
+    return sections
+
+def format_sections(sections):
+    """Render ``extract_sections`` output as the analyze_post report text."""
+    analysis = f"{sections['summary']}\n\n"
+    analysis += "IDEAS:\n" + "".join(f"- {idea}\n" for idea in sections['ideas']) + "\n"
+    analysis += "INSIGHTS:\n" + "".join(f"- {insight}\n" for insight in sections['insights']) + "\n"
+    analysis += "QUOTES:\n" + "".join(f"- {quote}\n" for quote in sections['quotes']) + "\n"
+    analysis += "HABITS:\n" + "".join(f"- {habit}\n" for habit in sections['habits']) + "\n"
+    analysis += "FACTS:\n" + "".join(f"- {fact}\n" for fact in sections['facts']) + "\n"
+    analysis += "REFERENCES:\n" + "".join(f"- {reference}\n" for reference in sections['references']) + "\n"
+    analysis += f"{sections['takeaway']}\n\n"
+    analysis += "RECOMMENDATIONS:\n" + "".join(f"- {recommendation}\n" for recommendation in sections['recommendations'])
+    return analysis
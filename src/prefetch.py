@@ -0,0 +1,114 @@
+# prefetch.py
+
+import itertools
+import threading
+from collections import OrderedDict
+from queue import PriorityQueue
+from .config import config
+from .rate_limit import PREFETCH, request_priority
+
+class Prefetcher:
+    """Warms post bodies and comment trees for the listing on screen.
+
+    A single background thread works through the top ``top_n`` posts in rank
+    order. Scheduling a new listing bumps the generation, which cancels
+    whatever is still queued for the old one and discards its results.
+    Prefetched trees are kept until ``take`` hands them out, up to
+    ``max_bytes``; past that, lower-ranked posts are simply not prefetched.
+    Taking a post that is being fetched waits for that fetch instead of
+    starting a second one on the same PRAW submission.
+    """
+
+    def __init__(self, reddit_client, top_n=None, max_bytes=None):
+        self.reddit_client = reddit_client
+        self.top_n = top_n if top_n is not None else config.PREFETCH_TOP_N
+        self.max_bytes = max_bytes if max_bytes is not None else config.PREFETCH_MAX_BYTES
+        self.generation = 0
+        self._queue = PriorityQueue()
+        self._sequence = itertools.count()
+        self._results = OrderedDict()
+        self._bytes = 0
+        self._in_flight = set()
+        self._handoff = {}  # post id -> comments (or None) of fetches ``take`` is waiting for
+        self._wanted = set()
+        self._lock = threading.Condition()
+        self._thread = None
+
+    def schedule(self, posts):
+        """Replace the prefetch queue with the top posts of a new listing."""
+        with self._lock:
+            self.generation += 1
+            self._results.clear()
+            self._bytes = 0
+            generation = self.generation
+        for rank, post in enumerate(posts[:self.top_n]):
+            self._queue.put((-generation, rank, next(self._sequence), post))
+        self._start()
+
+    def cancel(self):
+        with self._lock:
+            self.generation += 1
+            self._results.clear()
+            self._bytes = 0
+
+    def take(self, post_id):
+        """Return and forget the prefetched comments of ``post_id``, or None.
+
+        If ``post_id`` is being fetched right now, waits for it and takes its result.
+        """
+        with self._lock:
+            if post_id in self._in_flight:
+                self._wanted.add(post_id)
+                while post_id in self._in_flight:
+                    self._lock.wait()
+                self._wanted.discard(post_id)
+                return self._handoff.pop(post_id, None)
+            entry = self._results.pop(post_id, None)
+            if entry is None:
+                return None
+            comments, size = entry
+            self._bytes -= size
+            return comments
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, name="prefetcher", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            negative_generation, rank, _, post = self._queue.get()
+            with self._lock:
+                if -negative_generation != self.generation or self._bytes >= self.max_bytes:
+                    continue
+                self._in_flight.add(post.id)
+            comments = None
+            try:
+                # Queued behind anything the user is waiting for.
+                with request_priority(PREFETCH):
+                    self.reddit_client.get_post_content(post)
+                    comments = self.reddit_client.get_comments(post)
+            except Exception as e:
+                print(f"Error prefetching post {post.id}: {e}")
+            finally:
+                with self._lock:
+                    self._in_flight.discard(post.id)
+                    if post.id in self._wanted:
+                        # Someone is already waiting: hand it over, whatever the budget or generation.
+                        self._handoff[post.id] = comments
+                        comments = None
+                    self._lock.notify_all()
+            if comments is None:
+                continue
+            size = self._estimate_size(comments)
+            with self._lock:
+                if -negative_generation == self.generation and self._bytes + size <= self.max_bytes:
+                    self._results[post.id] = (comments, size)
+                    self._bytes += size
+
+    @staticmethod
+    def _estimate_size(comments):
+        store = getattr(comments[0], 'store', None) if comments else None
+        if store is not None:
+            return store.nbytes()
+        return sum(len(comment.body) + 200 for comment in comments)
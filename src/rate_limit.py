@@ -0,0 +1,269 @@
+# rate_limit.py
+
+import asyncio
+import heapq
+import itertools
+import logging
+import random
+import threading
+import time
+from contextlib import contextmanager
+from prawcore import Requestor
+from .config import config
+from .metrics import metrics
+
+# Priority classes, most urgent first. Requests made on a thread inherit the
+# class set with ``request_priority``; anything else counts as interactive.
+INTERACTIVE = 0
+PREFETCH = 1
+SWEEP = 2
+PRIORITY_NAMES = {INTERACTIVE: 'interactive', PREFETCH: 'prefetch', SWEEP: 'sweep'}
+
+_thread_priority = threading.local()
+
+@contextmanager
+def request_priority(priority):
+    """Run the enclosed Reddit requests of this thread in ``priority``'s class."""
+    previous = getattr(_thread_priority, 'value', INTERACTIVE)
+    _thread_priority.value = priority
+    try:
+        yield
+    finally:
+        _thread_priority.value = previous
+
+def current_priority():
+    return getattr(_thread_priority, 'value', INTERACTIVE)
+
+class RequestScheduler:
+    """Token bucket shared by every thread that talks to Reddit.
+
+    Until Reddit reports its quota the bucket refills at
+    ``requests_per_minute``. After that it follows the
+    ``X-Ratelimit-Remaining``/``X-Ratelimit-Reset`` headers: the requests
+    left in the window are spread evenly over the seconds until it resets,
+    with bursts of up to ``burst`` requests. Waiting requests are served
+    by priority class, then in arrival order, and only interactive requests
+    may spend the last ``reserve`` tokens. A 429 pauses everyone, with
+    exponential backoff and full jitter unless Reddit says how long to wait.
+    """
+
+    def __init__(self, requests_per_minute=None, burst=None, reserve=None, max_retries=None,
+                 backoff_base=1.0, backoff_max=60.0):
+        self.default_rate = (requests_per_minute or config.REDDIT_REQUESTS_PER_MINUTE) / 60.0
+        self.rate = self.default_rate
+        self.burst = max(1, burst or config.REDDIT_REQUEST_BURST)
+        self.reserve = config.REDDIT_INTERACTIVE_RESERVE if reserve is None else reserve
+        if self.reserve >= self.burst:
+            # The bucket never holds more than ``burst`` tokens, so other requests could never go.
+            logging.warning(f"Interactive reserve {self.reserve} leaves no room in a burst of {self.burst}; "
+                            f"using {self.burst - 1}")
+            self.reserve = self.burst - 1
+        self.max_retries = config.REDDIT_MAX_RETRIES if max_retries is None else max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+
+        self.tokens = float(self.burst)
+        self.remaining = None
+        self.window_end = None
+        self.paused_until = 0.0
+        self.throttled = 0
+        self._updated = time.monotonic()
+        self._in_flight = 0
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._depth = dict.fromkeys(PRIORITY_NAMES, 0)
+        self._lock = threading.Condition()
+
+    def _refill(self, now):
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self.window_end is not None and now >= self.window_end:
+            # The reported window is over; Reddit has reset the quota.
+            self.remaining = None
+            self.window_end = None
+            self.rate = self.default_rate
+        if self.remaining is not None:
+            self.tokens = min(self.tokens, self.remaining - self._in_flight)
+
+    def _needed(self, priority):
+        # Tokens that must be available for a request of ``priority`` to go.
+        if priority == INTERACTIVE:
+            return 1
+        return 1 + max(0, min(self.reserve, self.burst - 1))
+
+    def acquire(self, priority=None):
+        """Block until a request of ``priority`` may be sent; returns the seconds waited."""
+        priority = current_priority() if priority is None else priority
+        start = time.monotonic()
+        with self._lock:
+            entry = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, entry)
+            self._set_depth(priority, 1)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._refill(now)
+                    needed = self._needed(priority)
+                    if self._waiting[0] == entry and now >= self.paused_until and self.tokens >= needed:
+                        break
+                    if self._waiting[0] != entry:
+                        timeout = None  # woken when the queue moves
+                    elif now < self.paused_until:
+                        timeout = self.paused_until - now
+                    elif self.rate > 0:
+                        timeout = max((needed - self.tokens) / self.rate, 0.01)
+                    else:
+                        timeout = 1.0
+                    self._lock.wait(timeout)
+                heapq.heappop(self._waiting)
+                self.tokens -= 1
+                self._in_flight += 1
+            finally:
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+                self._set_depth(priority, -1)
+                self._lock.notify_all()
+        waited = time.monotonic() - start
+        metrics.observe('scheduler', f"wait:{PRIORITY_NAMES.get(priority, priority)}", waited)
+        return waited
+
+    async def acquire_async(self, priority=INTERACTIVE):
+        """``acquire`` for coroutines: sleeps on the event loop instead of blocking a thread.
+
+        Threads already waiting in the same or a more urgent class go first.
+        """
+        start = time.monotonic()
+        with self._lock:
+            self._set_depth(priority, 1)
+        try:
+            while True:
+                with self._lock:
+                    delay = self._take(priority)
+                if delay is None:
+                    break
+                await asyncio.sleep(delay)
+        finally:
+            with self._lock:
+                self._set_depth(priority, -1)
+        waited = time.monotonic() - start
+        metrics.observe('scheduler', f"wait:{PRIORITY_NAMES.get(priority, priority)}", waited)
+        return waited
+
+    def _take(self, priority):
+        # Called with the lock held: takes a token and returns None, or returns the seconds to wait.
+        now = time.monotonic()
+        self._refill(now)
+        needed = self._needed(priority)
+        if self._waiting and self._waiting[0][0] <= priority:
+            return 0.05
+        if now < self.paused_until:
+            return self.paused_until - now
+        if self.tokens < needed:
+            return max((needed - self.tokens) / self.rate, 0.01) if self.rate > 0 else 1.0
+        self.tokens -= 1
+        self._in_flight += 1
+        return None
+
+    def release(self, headers=None, status=None):
+        """Record the response of an acquired request and feed its rate limit headers back."""
+        with self._lock:
+            self._in_flight -= 1
+            now = time.monotonic()
+            self._refill(now)
+            if headers is not None:
+                self._update(headers, now)
+            if status == 429:
+                self.throttled += 1
+                metrics.set_gauge('reddit_throttled_total', self.throttled)
+            self._lock.notify_all()
+
+    def _update(self, headers, now):
+        try:
+            remaining = float(headers['x-ratelimit-remaining'])
+            reset = float(headers['x-ratelimit-reset'])
+        except (KeyError, TypeError, ValueError):
+            return
+        window_end = now + reset
+        if self.window_end is not None and window_end <= self.window_end + 1.0 and self.remaining is not None:
+            # Responses of one window can arrive out of order; trust the lowest count.
+            remaining = min(remaining, self.remaining)
+        self.remaining = remaining
+        self.window_end = window_end
+        self.rate = max(remaining - self._in_flight, 0.0) / max(reset, 1.0)
+        self.tokens = min(self.tokens, remaining - self._in_flight)
+        metrics.set_gauge('reddit_ratelimit_remaining', remaining)
+
+    def backoff(self, attempt, retry_after=None):
+        """Pause every request after a 429; returns the delay chosen."""
+        if retry_after is None:
+            delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+        else:
+            delay = retry_after + random.uniform(0, self.backoff_base)
+        with self._lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + delay)
+            self._lock.notify_all()
+        return delay
+
+    def _set_depth(self, priority, change):
+        self._depth[priority] = self._depth.get(priority, 0) + change
+        metrics.set_gauge('reddit_queue_depth', self._depth[priority], priority=PRIORITY_NAMES.get(priority, str(priority)))
+
+    def stats(self):
+        with self._lock:
+            self._refill(time.monotonic())
+            return {
+                'tokens': self.tokens,
+                'rate_per_minute': self.rate * 60,
+                'remaining': self.remaining,
+                'in_flight': self._in_flight,
+                'queued': {PRIORITY_NAMES.get(priority, priority): depth for priority, depth in self._depth.items()},
+                'throttled': self.throttled,
+            }
+
+def retry_after(headers):
+    """Seconds Reddit asked us to wait after a 429, or None."""
+    for name in ('retry-after', 'x-ratelimit-reset'):
+        try:
+            return float(headers[name])
+        except (KeyError, TypeError, ValueError):
+            continue
+    return None
+
+class ScheduledRequestor(Requestor):
+    """prawcore requestor that sends every request through a ``RequestScheduler``.
+
+    Passed to ``praw.Reddit`` as ``requestor_class``, so listings, comment
+    threads, ``info`` batches, pagination and lazy attribute fetches are all
+    scheduled. 429 responses are retried up to ``max_retries`` times.
+    """
+
+    def __init__(self, *args, scheduler=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.scheduler = scheduler or default_scheduler()
+
+    def request(self, *args, **kwargs):
+        attempt = 0
+        while True:
+            self.scheduler.acquire()
+            response = None
+            try:
+                response = super().request(*args, **kwargs)
+            finally:
+                self.scheduler.release(response.headers if response is not None else None,
+                                       response.status_code if response is not None else None)
+            if response.status_code != 429 or attempt >= self.scheduler.max_retries:
+                return response
+            self.scheduler.backoff(attempt, retry_after(response.headers))
+            attempt += 1
+
+_default_scheduler = None
+_default_scheduler_lock = threading.Lock()
+
+def default_scheduler():
+    """The process-wide scheduler shared by every ``RedditClient``."""
+    global _default_scheduler
+    with _default_scheduler_lock:
+        if _default_scheduler is None:
+            _default_scheduler = RequestScheduler()
+    return _default_scheduler
@@ -1,32 +1,162 @@
-import os
+import threading
+from collections import OrderedDict, deque
 import praw
 import prawcore
-from dotenv import load_dotenv
-from .models import Post, Comment
+from praw.models import Comment as PrawComment, MoreComments
+from .cache import DiskCache
+from .config import config
+from .metrics import metrics
+from .models import Post, Comment, CommentStore, MoreReplies
+from .rate_limit import ScheduledRequestor, default_scheduler
+from .reddit_json import JsonComment, PublicRedditJSON, post_index_row, submission_fields_from_json
+from .search_index import SearchIndex
 
 class RedditClient:
-    def __init__(self, use_api=True):
+    # PRAW submission objects kept for reuse between content and comment fetches
+    MAX_SUBMISSIONS = 512
+
+    def __init__(self, use_api=True, cache=None, offline=None, index=None, scheduler=None):
         self.use_api = use_api
+        self.scheduler = scheduler or default_scheduler()
+        self.offline = config.OFFLINE_MODE if offline is None else offline
+        if cache is None and config.CACHE_ENABLED:
+            cache = DiskCache(config.CACHE_PATH, config.CACHE_TTLS, config.CACHE_MAX_BYTES)
+        self.cache = cache
+        if index is None and config.SEARCH_INDEX_ENABLED:
+            index = SearchIndex(config.SEARCH_INDEX_PATH)
+        self.index = index
+
+        # The PRAW instance is built on first use; see the ``reddit`` property.
+        self._reddit = None
+        self._authenticated = False
+        self._auth_lock = threading.Lock()
+        self._public = None
+        self._submissions = OrderedDict()
+        self._submissions_lock = threading.Lock()
+
+    @property
+    def reddit(self):
+        if not self._authenticated and not self.offline:
+            with self._auth_lock:
+                if not self._authenticated:
+                    self._reddit = self._authenticate()
+                    self._authenticated = True
+        return self._reddit
+
+    @reddit.setter
+    def reddit(self, reddit):
+        self._reddit = reddit
+        self._authenticated = True
 
-        load_dotenv()
-        self.reddit = self._authenticate()
+    @property
+    def public(self):
+        """The public JSON reader used when the API is not available, or None if that fallback is off."""
+        if self._public is None and config.PUBLIC_JSON_FALLBACK:
+            with self._auth_lock:
+                if self._public is None:
+                    self._public = PublicRedditJSON(scheduler=self.scheduler)
+        return self._public
 
     def _authenticate(self):
+        # Read-only, application-only access: there is no user to verify with
+        # reddit.user.me(), so bad credentials surface on the first request.
+        # Every request goes through the shared scheduler, whichever thread makes it.
+        if not self.use_api or (config.PUBLIC_JSON_FALLBACK and not config.is_reddit_api_configured()):
+            return None  # the public JSON pages are read instead
         try:
-            reddit = praw.Reddit(
-                client_id=os.getenv('REDDIT_CLIENT_ID'),
-                client_secret=os.getenv('REDDIT_CLIENT_SECRET'),
-                user_agent=os.getenv('REDDIT_USER_AGENT')
+            return praw.Reddit(
+                client_id=config.REDDIT_CLIENT_ID,
+                client_secret=config.REDDIT_CLIENT_SECRET,
+                user_agent=config.REDDIT_USER_AGENT,
+                requestor_class=ScheduledRequestor,
+                requestor_kwargs={'scheduler': self.scheduler},
             )
-            reddit.user.me()
-            return reddit
         except prawcore.exceptions.ResponseException as e:
             print(f"Error authenticating with Reddit API: {e}")
         except Exception as e:
             print(f"An error occurred: {e}")
         return None
 
+    def _cache_get(self, kind, key):
+        if self.cache is None:
+            return None
+        # Offline mode serves whatever we have, however old it is.
+        return self.cache.get(kind, key, allow_stale=self.offline)
+
+    def _cache_set(self, kind, key, value):
+        if self.cache is not None:
+            self.cache.set(kind, key, value)
+
+    def _submission(self, submission_id):
+        """Return the one PRAW submission object kept per id, creating it if needed."""
+        with self._submissions_lock:
+            submission = self._submissions.pop(submission_id, None)
+            if submission is None:
+                submission = self.reddit.submission(id=submission_id)
+                submission.comment_limit = config.COMMENT_TREE_BUDGET
+            self._submissions[submission_id] = submission
+            while len(self._submissions) > self.MAX_SUBMISSIONS:
+                self._submissions.popitem(last=False)
+        return submission
+
+    def _index_submissions(self, submissions):
+        if self.index is None:
+            return
+        try:
+            self.index.add_posts([{
+                'id': submission.id,
+                'subreddit': submission.subreddit.display_name,
+                'title': submission.title,
+                'body': submission.selftext,
+                'author': submission.author.name if submission.author else '[deleted]',
+                'score': submission.score,
+                'created_utc': submission.created_utc,
+                'url': submission.url,
+            } for submission in submissions])
+        except Exception as e:
+            print(f"Error updating the search index: {e}")
+
+    def _index_posts(self, children):
+        # Posts read from the public JSON pages
+        if self.index is None or not children:
+            return
+        try:
+            self.index.add_posts([post_index_row(data) for data in children])
+        except Exception as e:
+            print(f"Error updating the search index: {e}")
+
+    def _remember_submission(self, submission):
+        # Listing and info() objects already carry the post fields, so reading
+        # them costs nothing; the first .comments access fetches the thread.
+        submission.comment_limit = config.COMMENT_TREE_BUDGET
+        with self._submissions_lock:
+            self._submissions.pop(submission.id, None)
+            self._submissions[submission.id] = submission
+            while len(self._submissions) > self.MAX_SUBMISSIONS:
+                self._submissions.popitem(last=False)
+
+    def _forget_submission(self, submission_id):
+        with self._submissions_lock:
+            self._submissions.pop(submission_id, None)
+
+    @staticmethod
+    def _submission_fields(submission):
+        return {
+            'selftext': submission.selftext,
+            'score': submission.score,
+            'num_comments': submission.num_comments,
+            'created_utc': submission.created_utc,
+            'edited': submission.edited,
+        }
+
     def get_posts(self, subreddit_name: str = None, sort: str = 'hot', limit: int = 10):
+        cache_key = f"{(subreddit_name or 'front').lower()}:{sort}:{limit}"
+        cached = self._cache_get('listing', cache_key)
+        if cached is not None:
+            return cached
+        if self.offline:
+            print("Offline mode: this listing is not cached.")
+            return []
         try:
             if self.reddit:
                 subreddit = self.reddit.subreddit(subreddit_name) if subreddit_name else self.reddit.front
@@ -35,8 +165,25 @@ class RedditClient:
                     'new': subreddit.new,
                     'top': subreddit.top
                 }
-                posts = sorting.get(sort, subreddit.hot)(limit=limit)
-                return [Post(post.title, post.score, post.author.name if post.author else '[deleted]', post.num_comments, post.url, post.id, post.selftext) for post in posts]
+                with metrics.timed('reddit', 'listing'):
+                    submissions = list(sorting.get(sort, subreddit.hot)(limit=limit))
+                posts = []
+                for submission in submissions:
+                    self._remember_submission(submission)
+                    self._cache_set('submission', submission.id, self._submission_fields(submission))
+                    post = Post(submission.title, submission.score, submission.author.name if submission.author else '[deleted]', submission.num_comments, submission.url, submission.id, submission.selftext)
+                    post.edited = submission.edited
+                    posts.append(post)
+                self._cache_set('listing', cache_key, posts)
+                self._index_submissions(submissions)
+                return posts
+            elif self.public:
+                posts, children = self.public.get_posts(subreddit_name, sort, limit)
+                for data in children:
+                    self._cache_set('submission', data['id'], submission_fields_from_json(data))
+                self._cache_set('listing', cache_key, posts)
+                self._index_posts(children)
+                return posts
             else:
                 print("Reddit API not authenticated.")
                 return []
@@ -48,32 +195,244 @@ class RedditClient:
             return []
 
     def get_post_content(self, post):
-        if self.reddit:
-            full_post = self.reddit.submission(id=post.id)
-            post.selftext = full_post.selftext
-            post.score = full_post.score
-            post.num_comments = full_post.num_comments
-            post.created_utc = full_post.created_utc
+        fields = self._cache_get('submission', post.id)
+        if fields is None and self.reddit:
+            with metrics.timed('reddit', 'submission'):
+                fields = self._submission_fields(self._submission(post.id))
+            self._cache_set('submission', post.id, fields)
+        elif fields is None and not self.offline and self.public:
+            try:
+                children = self.public.info([post.id], 'submission')
+                fields = submission_fields_from_json(children[0]) if children else None
+            except Exception as e:
+                print(f"Error in get_post_content: {e}")
+            if fields is not None:
+                self._cache_set('submission', post.id, fields)
+        if fields is not None:
+            for name, value in fields.items():
+                setattr(post, name, value)
         return post
 
-    def get_comments(self, post, max_comments=50):
+    def hydrate_posts(self, posts, force=False):
+        """Refresh score, selftext, comment count and creation time of many posts.
+
+        Posts with fresh 'submission' cache entries are updated from the cache
+        (unless ``force``); the rest are looked up with ``reddit.info`` in
+        batches of 100 fullnames, i.e. one request per 100 posts.
+        """
+        stale = {}
+        for post in posts:
+            fields = None if force else self._cache_get('submission', post.id)
+            if fields is None:
+                stale.setdefault(post.id, []).append(post)
+            else:
+                for name, value in fields.items():
+                    setattr(post, name, value)
+        if not stale or self.offline:
+            return posts
+        try:
+            if not self.reddit and not self.public:
+                print("Reddit API not authenticated.")
+                return posts
+            ids = list(stale)
+            for start in range(0, len(ids), 100):
+                if self.reddit:
+                    fullnames = [f"t3_{submission_id}" for submission_id in ids[start:start + 100]]
+                    with metrics.timed('reddit', 'info'):
+                        submissions = list(self.reddit.info(fullnames=fullnames))
+                    self._index_submissions(submissions)
+                    found = []
+                    for submission in submissions:
+                        self._remember_submission(submission)
+                        found.append((submission.id, self._submission_fields(submission)))
+                else:
+                    children = self.public.info(ids[start:start + 100])
+                    self._index_posts(children)
+                    found = [(data['id'], submission_fields_from_json(data)) for data in children]
+                for submission_id, fields in found:
+                    self._cache_set('submission', submission_id, fields)
+                    for post in stale.get(submission_id, []):
+                        for name, value in fields.items():
+                            setattr(post, name, value)
+        except Exception as e:
+            print(f"Error in hydrate_posts: {e}")
+        return posts
+
+    def get_comments(self, post, max_comments=None, max_depth=None):
+        """Return the comment tree of ``post`` as ``CommentStore`` views.
+
+        At most ``max_comments`` comments are built, breadth first, and no
+        deeper than ``max_depth``. Replies Reddit did not send, or that fall
+        outside the budget, become ``MoreReplies`` placeholders that
+        ``expand_more`` fetches on demand.
+        """
+        max_comments = max_comments or config.COMMENT_TREE_BUDGET
+        max_depth = max_depth or config.COMMENT_TREE_MAX_DEPTH
+        cache_key = f"{post.id}:{max_comments}:{max_depth}"
+        cached = self._cache_get('comments', cache_key)
+        if cached is not None:
+            return cached.roots()
+        if self.offline:
+            print("Offline mode: comments for this post are not cached.")
+            return []
         try:
             if self.reddit:
-                submission = self.reddit.submission(id=post.id)
-                submission.comments.replace_more(limit=0)  # Fetch all comments
-                comments = []
-                for top_level_comment in submission.comments[:max_comments]:
-                    comments.append(Comment(
-                        author=top_level_comment.author.name if top_level_comment.author else '[deleted]',
-                        score=top_level_comment.score,
-                        body=top_level_comment.body[:500],  # Truncate long comments
-                        depth=top_level_comment.depth,
-                        id=top_level_comment.id
-                    ))
-                return comments
+                submission = self._submission(post.id)
+                if not submission._fetched:
+                    submission.comment_limit = max_comments
+                with metrics.timed('reddit', 'comments'):
+                    forest = submission.comments  # fetches the thread unless it is loaded already
+                indexed = []
+                store = CommentStore.from_tree(self._build_comment_tree(
+                    forest, post.id, 0, max_comments, max_depth, lambda node: node.replies, indexed
+                ))
+                self._index_comments(indexed)
+                # The tree is cached now; a later miss should fetch a fresh thread.
+                self._forget_submission(post.id)
+                self._cache_set('comments', cache_key, store)
+                return store.roots()
+            elif self.public:
+                nodes = self.public.get_comment_nodes(post.id, max_comments, max_depth)
+                indexed = []
+                store = CommentStore.from_tree(self._build_comment_tree(
+                    nodes, post.id, 0, max_comments, max_depth, lambda node: node.replies, indexed
+                ))
+                self._index_comments(indexed)
+                self._cache_set('comments', cache_key, store)
+                return store.roots()
             else:
                 print("Reddit API not authenticated.")
                 return []
         except Exception as e:
             print(f"Error in get_comments: {e}")
-            return []
\ No newline at end of file
+            return []
+
+    def expand_more(self, placeholder, max_comments=None, max_depth=None):
+        """Fetch the replies behind a ``MoreReplies`` placeholder and return them as a tree."""
+        if self.offline:
+            print("Offline mode: cannot load more comments.")
+            return []
+        max_comments = max_comments or config.COMMENT_TREE_BUDGET
+        max_depth = max_depth or config.COMMENT_TREE_MAX_DEPTH
+        try:
+            if self.reddit:
+                submission = self.reddit.submission(id=placeholder.submission_id)
+                more = MoreComments(self.reddit, _data={
+                    'count': placeholder.count if placeholder.reply_ids else 0,
+                    'children': placeholder.reply_ids,
+                    'parent_id': placeholder.parent_id,
+                })
+                more.submission = submission
+                with metrics.timed('reddit', 'morechildren'):
+                    items = more.comments()
+            elif self.public:
+                items = self.public.get_more_nodes(placeholder.submission_id, placeholder.parent_id,
+                                                   placeholder.reply_ids)
+            else:
+                print("Reddit API not authenticated.")
+                return []
+            indexed = []
+            if not placeholder.reply_ids:
+                # "Continue this thread" returns an already nested forest.
+                replies = self._build_comment_tree(
+                    items, placeholder.submission_id, placeholder.depth, max_comments,
+                    placeholder.depth + max_depth, lambda node: node.replies, indexed
+                )
+                self._index_comments(indexed)
+                return replies
+
+            # /api/morechildren returns a flat list; nest it by parent_id.
+            fullnames = {item.name for item in items if isinstance(item, (PrawComment, JsonComment))}
+            children = {}
+            roots = []
+            for item in items:
+                if item.parent_id in fullnames:
+                    children.setdefault(item.parent_id, []).append(item)
+                else:
+                    roots.append(item)
+            replies = self._build_comment_tree(
+                roots, placeholder.submission_id, placeholder.depth, max_comments,
+                placeholder.depth + max_depth, lambda node: children.get(node.name, []), indexed
+            )
+            self._index_comments(indexed)
+            return replies
+        except Exception as e:
+            print(f"Error in expand_more: {e}")
+            return []
+
+    def _index_comments(self, comments):
+        if self.index is None or not comments:
+            return
+        try:
+            self.index.add_comments(comments)
+        except Exception as e:
+            print(f"Error updating the search index: {e}")
+
+    def _build_comment_tree(self, roots, submission_id, depth, max_comments, max_depth, children_of, indexed=None):
+        return build_comment_tree(roots, submission_id, depth, max_comments, max_depth, children_of,
+                                  indexed if self.index is not None else None)
+
+    def scheduler_stats(self):
+        return self.scheduler.stats()
+
+    def cache_stats(self):
+        return self.cache.stats() if self.cache is not None else None
+
+def build_comment_tree(roots, submission_id, depth, max_comments, max_depth, children_of, indexed=None):
+    """Build ``Comment``/``MoreReplies`` trees from PRAW-shaped comment nodes, breadth first.
+
+    Shared by ``RedditClient`` and ``AsyncRedditClient``. Every comment built
+    is also appended to ``indexed`` as a search index row.
+    """
+    top_level = []
+    queue = deque([(roots, None, top_level, depth, f"t3_{submission_id}")])
+    built = 0
+
+    while queue:
+        nodes, parent, siblings, level, parent_fullname = queue.popleft()
+        skipped_ids = []
+        skipped_count = 0
+        for node in nodes:
+            if isinstance(node, MoreComments):
+                if node.children:
+                    skipped_ids.extend(node.children)
+                    skipped_count += node.count or len(node.children)
+                else:
+                    siblings.append(MoreReplies(submission_id, node.parent_id, [], 0, level))
+                    if parent is not None:
+                        parent.has_more_replies = True
+                continue
+            if built >= max_comments or level >= max_depth:
+                skipped_ids.append(node.id)
+                skipped_count += 1
+                continue
+            comment = Comment(
+                author=node.author.name if node.author else '[deleted]',
+                score=node.score,
+                body=node.body[:500],  # Truncate long comments
+                depth=level,
+                id=node.id
+            )
+            built += 1
+            siblings.append(comment)
+            if indexed is not None:
+                indexed.append({
+                    'id': node.id,
+                    'post_id': submission_id,
+                    'subreddit': node.subreddit.display_name,
+                    'body': node.body,
+                    'author': comment.author,
+                    'score': node.score,
+                    'created_utc': node.created_utc,
+                })
+            queue.append((children_of(node), comment, comment.children, level + 1, node.name))
+        if skipped_ids:
+            if level >= max_depth:
+                # Too deep to show inline: offer it as "continue this thread".
+                siblings.append(MoreReplies(submission_id, parent_fullname, [], 0, level))
+            else:
+                siblings.append(MoreReplies(submission_id, parent_fullname, skipped_ids, skipped_count, level))
+            if parent is not None:
+                parent.has_more_replies = True
+
+    return top_level
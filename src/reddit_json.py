@@ -0,0 +1,170 @@
+# reddit_json.py
+
+import threading
+from praw.models import MoreComments
+from .config import config
+from .metrics import metrics
+from .models import Post
+from .rate_limit import default_scheduler, retry_after
+
+class _Named:
+    __slots__ = ('name', 'display_name')
+
+    def __init__(self, name):
+        self.name = name
+        self.display_name = name
+
+class JsonComment:
+    """A comment from Reddit's JSON with the attributes ``build_comment_tree`` reads from PRAW comments."""
+
+    __slots__ = ('id', 'name', 'parent_id', 'author', 'score', 'body', 'created_utc', 'subreddit', 'replies')
+
+    def __init__(self, data):
+        self.id = data['id']
+        self.name = data.get('name') or f"t1_{data['id']}"
+        self.parent_id = data.get('parent_id')
+        author = data.get('author')
+        self.author = _Named(author) if author and author != '[deleted]' else None
+        self.score = data.get('score', 0)
+        self.body = data.get('body', '')
+        self.created_utc = data.get('created_utc')
+        self.subreddit = _Named(data.get('subreddit'))
+        self.replies = parse_comment_listing(data.get('replies'))
+
+def parse_comment_listing(listing):
+    """Turn a comment listing into ``JsonComment`` and PRAW ``MoreComments`` nodes."""
+    # A comment with no replies has "" instead of a listing.
+    if not listing:
+        return []
+    nodes = []
+    for thing in listing['data']['children']:
+        if thing['kind'] == 'more':
+            nodes.append(MoreComments(None, _data=thing['data']))
+        elif thing['kind'] == 't1':
+            nodes.append(JsonComment(thing['data']))
+    return nodes
+
+def post_from_json(data):
+    post = Post(data['title'], data['score'], data.get('author') or '[deleted]', data['num_comments'], data['url'],
+                data['id'], data.get('selftext', ''))
+    post.created_utc = data.get('created_utc')
+    post.edited = data.get('edited', False)
+    return post
+
+def submission_fields_from_json(data):
+    """The 'submission' cache entry of a post, as ``RedditClient._submission_fields`` builds it."""
+    return {
+        'selftext': data.get('selftext', ''),
+        'score': data['score'],
+        'num_comments': data['num_comments'],
+        'created_utc': data.get('created_utc'),
+        'edited': data.get('edited', False),
+    }
+
+def post_index_row(data):
+    """The search index row of a post."""
+    return {
+        'id': data['id'],
+        'subreddit': data.get('subreddit'),
+        'title': data['title'],
+        'body': data.get('selftext', ''),
+        'author': data.get('author') or '[deleted]',
+        'score': data['score'],
+        'created_utc': data.get('created_utc'),
+        'url': data['url'],
+    }
+
+_session = None
+_session_lock = threading.Lock()
+
+def public_session():
+    """The process-wide ``requests.Session`` for Reddit's public pages, with pooled keep-alive connections."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=config.REDDIT_HTTP_MAX_CONNECTIONS)
+            _session.mount('https://', adapter)
+            _session.mount('http://', adapter)
+            _session.headers['User-Agent'] = config.REDDIT_USER_AGENT or 'reddit-terminal (public JSON)'
+    return _session
+
+class PublicRedditJSON:
+    """Credential-free reads from Reddit's public ``.json`` endpoints.
+
+    The fallback when the API is not configured. Requests share one pooled
+    session and go through the request scheduler like PRAW's do (Reddit
+    sends the same rate limit headers, with a much smaller quota). Threads
+    are built straight from the JSON by ``build_comment_tree``.
+    """
+
+    BASE_URL = 'https://www.reddit.com'
+
+    def __init__(self, session=None, scheduler=None):
+        self.session = session or public_session()
+        self.scheduler = scheduler or default_scheduler()
+
+    def _get(self, path, operation, **params):
+        params = {name: value for name, value in params.items() if value is not None}
+        params.setdefault('raw_json', 1)
+        attempt = 0
+        while True:
+            self.scheduler.acquire()
+            response = None
+            try:
+                with metrics.timed('reddit', operation):
+                    response = self.session.get(f"{self.BASE_URL}{path}.json", params=params,
+                                                timeout=config.REDDIT_HTTP_TIMEOUT)
+            finally:
+                self.scheduler.release(response.headers if response is not None else None,
+                                       response.status_code if response is not None else None)
+            if response.status_code == 429 and attempt < self.scheduler.max_retries:
+                self.scheduler.backoff(attempt, retry_after(response.headers))
+                attempt += 1
+                continue
+            response.raise_for_status()
+            return response.json()
+
+    def get_posts(self, subreddit_name=None, sort='hot', limit=10):
+        """Return ``(posts, json_children)`` for a listing, following ``after`` past 100 posts."""
+        sort = sort if sort in ('hot', 'new', 'top') else 'hot'
+        path = f"/r/{subreddit_name.removeprefix('r/')}/{sort}" if subreddit_name else f"/{sort}"
+        children = []
+        after = None
+        while len(children) < limit:
+            page = self._get(path, 'listing', limit=min(100, limit - len(children)), after=after,
+                             t='all' if sort == 'top' else None)
+            things = [thing['data'] for thing in page['data']['children'] if thing['kind'] == 't3']
+            children.extend(things)
+            after = page['data'].get('after')
+            if not after or not things:
+                break
+        children = children[:limit]
+        return [post_from_json(data) for data in children], children
+
+    def info(self, post_ids, operation='info'):
+        """The JSON of the posts ``post_ids`` (up to 100) that Reddit knows, in one request."""
+        page = self._get('/by_id/' + ','.join(f"t3_{post_id}" for post_id in post_ids), operation)
+        return [thing['data'] for thing in page['data']['children'] if thing['kind'] == 't3']
+
+    def get_comment_nodes(self, post_id, max_comments, max_depth, sort='confidence'):
+        """Fetch a thread and return its top-level ``JsonComment``/``MoreComments`` nodes."""
+        _, comments = self._get(f"/comments/{post_id}", 'comments', limit=max_comments, depth=max_depth, sort=sort)
+        return parse_comment_listing(comments)
+
+    def get_more_nodes(self, submission_id, parent_id, reply_ids):
+        """The nodes behind a "load more comments" stub, as PRAW's ``MoreComments.comments()`` returns them.
+
+        With ``reply_ids`` this is a flat list from /api/morechildren; without,
+        it is the nested replies of ``parent_id`` ("continue this thread").
+        """
+        if reply_ids:
+            page = self._get('/api/morechildren', 'morechildren', api_type='json', link_id=f"t3_{submission_id}",
+                             children=','.join(reply_ids))
+            return parse_comment_listing({'data': {'children': page['json']['data']['things']}})
+        _, comments = self._get(f"/comments/{submission_id}/_/{parent_id.split('_', 1)[-1]}", 'morechildren')
+        parents = parse_comment_listing(comments)
+        return parents[0].replies if parents and isinstance(parents[0], JsonComment) else []
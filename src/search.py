@@ -1,59 +1,154 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from queue import Queue
+from threading import Lock
+from .metrics import metrics
+from .search_index import TIME_FILTERS
 
 def search_reddit(reddit_client, query, subreddit=None, time_filter='all', min_comments=0, min_score=0):
-    print("Debug: Starting search_reddit")
-    if reddit_client.use_api:
-        if subreddit:
-            results = list(reddit_client.reddit.subreddit(subreddit).search(query, time_filter=time_filter, limit=50))
-        else:
-            results = list(reddit_client.reddit.subreddit('all').search(query, time_filter=time_filter, limit=50))
-        print(f"Debug: Found {len(results)} results")
+    logging.debug("Starting search_reddit")
+    if reddit_client.use_api and reddit_client.reddit:
+        with metrics.timed('reddit', 'search'):
+            if subreddit:
+                results = list(reddit_client.reddit.subreddit(subreddit).search(query, time_filter=time_filter, limit=50))
+            else:
+                results = list(reddit_client.reddit.subreddit('all').search(query, time_filter=time_filter, limit=50))
+        logging.debug(f"Found {len(results)} results")
 
         filtered_results = [
             post for post in results
             if post.num_comments >= min_comments and post.score >= min_score
         ]
-        print(f"Debug: Filtered down to {len(filtered_results)} results based on comments and score")
+        logging.debug(f"Filtered down to {len(filtered_results)} results based on comments and score")
         return filtered_results[:5]
     else:
-        print("Search functionality not available without API access.")
+        print("Search functionality not available without API access. Use 'find <query>' to search what is already fetched.")
         return []
 
-def fetch_post_comments(post):
-    print(f"Debug: Fetching comments for post {post.id}")
-    post.comments.replace_more(limit=0)
-    comments = [comment.body for comment in post.comments.list() if len(comment.body) > 50]
-    print(f"Debug: Fetched {len(comments)} comments")
+def search_local(index, query, subreddit=None, time_filter='all', min_score=None, limit=10):
+    """Search the posts and comments already fetched, BM25-ranked; works offline.
+
+    Returns ``(hits, seconds)``.
+    """
+    if index is None:
+        print("The local search index is disabled.")
+        return [], 0.0
+    start = time.perf_counter()
+    hits = index.search(query, subreddit=subreddit, min_score=min_score, time_filter=time_filter, limit=limit)
+    return hits, time.perf_counter() - start
+
+def parse_find_args(words):
+    """Split ``find`` arguments into the query and its filters.
+
+    ``r/<subreddit>``, ``t:<hour|day|week|month|year>`` and ``score:<n>``
+    filter the results; every other word is part of the query.
+    """
+    filters = {'subreddit': None, 'time_filter': 'all', 'min_score': None}
+    query = []
+    for word in words:
+        if word.startswith('r/') and len(word) > 2:
+            filters['subreddit'] = word[2:]
+        elif word.startswith('t:') and word[2:] in TIME_FILTERS:
+            filters['time_filter'] = word[2:]
+        elif word.startswith('score:') and word[6:].lstrip('-').isdigit():
+            filters['min_score'] = int(word[6:])
+        else:
+            query.append(word)
+    return ' '.join(query), filters
+
+def fetch_post_comments(post, with_scores=False):
+    """Bodies of the post's comments longer than 50 characters, and their scores if ``with_scores``."""
+    logging.debug(f"Fetching comments for post {post.id}")
+    with metrics.timed('reddit', 'comments'):
+        post.comments.replace_more(limit=0)
+    kept = [comment for comment in post.comments.list() if len(comment.body) > 50]
+    comments = [comment.body for comment in kept]
+    logging.debug(f"Fetched {len(comments)} comments for post {post.id}")
+    if with_scores:
+        return comments, [comment.score for comment in kept]
     return comments
 
+class SearchResult:
+    def __init__(self, post, summary=None, topics=None, error=None):
+        self.post = post
+        self.summary = summary
+        self.topics = topics
+        self.error = error
+        self.rating = None
+
+def summarize_posts(ai_client, posts, subreddit=None, fetch_workers=5, ai_workers=10):
+    """Fetch, summarize and extract topics for ``posts`` concurrently.
+
+    Yields a ``SearchResult`` per post as soon as its summary and topics are
+    both done. Summarization and topic extraction of a post run in parallel
+    with each other and with the remaining fetches; the caller consuming the
+    results (e.g. waiting for a rating) never holds up the workers.
+    """
+    finished = Queue()
+
+    def on_fetched(fetch_future, post):
+        try:
+            comments, scores = fetch_future.result()
+        except Exception as exc:
+            finished.put(SearchResult(post, error=exc))
+            return
+        summary_future = ai_executor.submit(ai_client.summarize_comments, comments, post.title, subreddit or 'all',
+                                            comment_scores=scores)
+        topics_future = ai_executor.submit(ai_client.extract_topics, comments, comment_scores=scores)
+        pending = [summary_future, topics_future]
+        lock = Lock()
+
+        def on_analyzed(_):
+            with lock:
+                if not all(future.done() for future in pending) or not pending:
+                    return
+                pending.clear()
+            try:
+                finished.put(SearchResult(post, summary_future.result(), topics_future.result()))
+            except Exception as exc:
+                finished.put(SearchResult(post, error=exc))
+
+        summary_future.add_done_callback(on_analyzed)
+        topics_future.add_done_callback(on_analyzed)
+
+    # The fetch pool is shut down first so its callbacks can still hand work
+    # to the AI pool.
+    with ThreadPoolExecutor(max_workers=ai_workers) as ai_executor, \
+            ThreadPoolExecutor(max_workers=fetch_workers) as fetch_executor:
+        for post in posts:
+            future = fetch_executor.submit(fetch_post_comments, post, with_scores=True)
+            future.add_done_callback(lambda f, post=post: on_fetched(f, post))
+        for _ in posts:
+            yield finished.get()
+
 def search_and_summarize(reddit_client, ai_client, query, subreddit=None):
-    print(f"Debug: Starting search_and_summarize with query '{query}' and subreddit '{subreddit}'")
+    logging.debug(f"Starting search_and_summarize with query '{query}' and subreddit '{subreddit}'")
+    if not ai_client:
+        print("AI features are not enabled.")
+        return []
     if subreddit and subreddit.lower() != 'askreddit':
         print("This feature is currently optimized for AskReddit but will perform a global search.")
 
     posts = search_reddit(reddit_client, query, subreddit)
     if not posts:
         print("No relevant posts found.")
-        return
+        return []
 
     print(f"\nTop 5 relevant posts for '{query}':\n")
 
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_post = {executor.submit(fetch_post_comments, post): post for post in posts[:5]}
-        for future in as_completed(future_to_post):
-            post = future_to_post[future]
-            try:
-                comments = future.result()
-                print(f"Debug: Summarizing comments for post {post.id}")
-                summary = ai_client.summarize_comments(comments, post.title, subreddit or 'all')
-                print(f"Title: {post.title}")
-                print(f"Summary: {summary}\n")
-                rating = get_feedback()
-                print(f"Received rating: {rating}")
-                topics = ai_client.extract_topics(comments)
-                display_topics(topics)
-            except Exception as exc:
-                print(f"An error occurred while processing a post: {exc}")
+    results = []
+    for result in summarize_posts(ai_client, posts[:5], subreddit):
+        if result.error is not None:
+            print(f"An error occurred while processing a post: {result.error}")
+            continue
+        print(f"Title: {result.post.title}")
+        print(f"Summary: {result.summary}\n")
+        display_topics(result.topics)
+        result.rating = get_feedback()
+        print(f"Received rating: {result.rating}")
+        results.append(result)
+    return results
 
 def get_feedback():
     while True:
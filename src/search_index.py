@@ -0,0 +1,158 @@
+# search_index.py
+
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# Seconds covered by Reddit's search time filters
+TIME_FILTERS = {
+    'hour': 3600,
+    'day': 86400,
+    'week': 7 * 86400,
+    'month': 30 * 86400,
+    'year': 365 * 86400,
+    'all': None,
+}
+
+# Wrapped around the matched terms in IndexHit.snippet
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+class IndexHit:
+    __slots__ = ('kind', 'id', 'post_id', 'subreddit', 'title', 'author', 'score', 'created_utc', 'url', 'snippet', 'rank')
+
+    def __init__(self, kind, id, post_id, subreddit, title, author, score, created_utc, url, snippet, rank):
+        self.kind = kind
+        self.id = id
+        self.post_id = post_id
+        self.subreddit = subreddit
+        self.title = title
+        self.author = author
+        self.score = score
+        self.created_utc = created_utc
+        self.url = url
+        self.snippet = snippet
+        self.rank = rank
+
+class SearchIndex:
+    """SQLite FTS5 index of the posts and comments the terminal has fetched.
+
+    Rows are upserted by Reddit id, so re-fetching a post or comment updates
+    its score and text instead of adding a duplicate. Queries are ranked by
+    BM25 (titles weigh twice as much as bodies) and can be filtered by
+    subreddit, minimum score, age and kind.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+
+        if path != ':memory:':
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS docs (
+                rowid INTEGER PRIMARY KEY,
+                kind TEXT NOT NULL,
+                reddit_id TEXT NOT NULL,
+                post_id TEXT NOT NULL,
+                subreddit TEXT COLLATE NOCASE,
+                title TEXT,
+                author TEXT,
+                score INTEGER NOT NULL DEFAULT 0,
+                created_utc REAL,
+                url TEXT,
+                indexed REAL NOT NULL,
+                UNIQUE (kind, reddit_id)
+            );
+            CREATE INDEX IF NOT EXISTS docs_subreddit ON docs (subreddit);
+            CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(title, body, tokenize = 'porter unicode61');
+        """)
+        self._conn.commit()
+
+    def add_posts(self, posts):
+        """Upsert post dicts with id, subreddit, title, body, author, score, created_utc and url."""
+        self._upsert('post', ((post['id'], post['id'], post) for post in posts))
+
+    def add_comments(self, comments):
+        """Upsert comment dicts with id, post_id, subreddit, body, author, score and created_utc."""
+        self._upsert('comment', ((comment['id'], comment['post_id'], comment) for comment in comments))
+
+    def _upsert(self, kind, rows):
+        now = time.time()
+        with self._lock:
+            for reddit_id, post_id, row in rows:
+                existing = self._conn.execute(
+                    "SELECT rowid FROM docs WHERE kind = ? AND reddit_id = ?", (kind, reddit_id)
+                ).fetchone()
+                values = (post_id, row.get('subreddit'), row.get('title'), row.get('author'), row.get('score') or 0,
+                          row.get('created_utc'), row.get('url'), now)
+                if existing:
+                    rowid = existing[0]
+                    self._conn.execute(
+                        "UPDATE docs SET post_id = ?, subreddit = ?, title = ?, author = ?, score = ?, created_utc = ?, url = ?, indexed = ? "
+                        "WHERE rowid = ?", values + (rowid,)
+                    )
+                    self._conn.execute("DELETE FROM docs_fts WHERE rowid = ?", (rowid,))
+                else:
+                    rowid = self._conn.execute(
+                        "INSERT INTO docs (kind, reddit_id, post_id, subreddit, title, author, score, created_utc, url, indexed) "
+                        "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", (kind, reddit_id) + values
+                    ).lastrowid
+                self._conn.execute(
+                    "INSERT INTO docs_fts (rowid, title, body) VALUES (?, ?, ?)",
+                    (rowid, row.get('title') or '', row.get('body') or '')
+                )
+            self._conn.commit()
+
+    @staticmethod
+    def match_expression(query):
+        # Free text becomes quoted terms (all must match), so punctuation in
+        # the query can never be read as FTS5 syntax.
+        terms = re.findall(r"\w+(?:'\w+)*", query)
+        return " ".join(f'"{term}"' for term in terms)
+
+    def search(self, query, subreddit=None, min_score=None, time_filter='all', kind=None, limit=20):
+        """Return the best ``limit`` ``IndexHit`` rows for ``query``, best first."""
+        match = self.match_expression(query)
+        if not match:
+            return []
+        sql = [
+            # Comments show the title and URL of their post when it is indexed too
+            "SELECT d.kind, d.reddit_id, d.post_id, d.subreddit, COALESCE(d.title, p.title, ''),",
+            "       d.author, d.score, d.created_utc, COALESCE(d.url, p.url),",
+            "       snippet(docs_fts, 1, ?, ?, '...', 16), bm25(docs_fts, 2.0, 1.0) AS rank",
+            "FROM docs_fts JOIN docs d ON d.rowid = docs_fts.rowid",
+            "LEFT JOIN docs p ON p.kind = 'post' AND p.reddit_id = d.post_id",
+            "WHERE docs_fts MATCH ?",
+        ]
+        params = [MATCH_START, MATCH_END, match]
+        if subreddit:
+            sql.append("AND d.subreddit = ?")
+            params.append(subreddit[2:] if subreddit.lower().startswith('r/') else subreddit)
+        if min_score is not None:
+            sql.append("AND d.score >= ?")
+            params.append(min_score)
+        max_age = TIME_FILTERS.get(time_filter)
+        if max_age is not None:
+            sql.append("AND d.created_utc >= ?")
+            params.append(time.time() - max_age)
+        if kind:
+            sql.append("AND d.kind = ?")
+            params.append(kind)
+        sql.append("ORDER BY rank LIMIT ?")
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute("\n".join(sql), params).fetchall()
+        return [IndexHit(*row) for row in rows]
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT kind, COUNT(*) FROM docs GROUP BY kind").fetchall())
+        return {'path': self.path, 'posts': counts.get('post', 0), 'comments': counts.get('comment', 0)}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
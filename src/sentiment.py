@@ -0,0 +1,111 @@
+# sentiment.py
+
+import logging
+import threading
+from .config import config
+
+class SentimentScores:
+    """Polarity of each comment in a batch, in [-1, 1], with aggregates."""
+
+    def __init__(self, scores):
+        self.scores = [float(score) for score in scores]
+
+    def __len__(self):
+        return len(self.scores)
+
+    @property
+    def mean(self):
+        return sum(self.scores) / len(self.scores) if self.scores else 0.0
+
+    def weighted_mean(self, weights):
+        """Mean polarity weighted by ``weights`` (e.g. comment scores).
+
+        Weights below 1 count as 1, so downvoted comments still count but
+        never cancel out or outweigh the others.
+        """
+        weights = [max(weight, 1) for weight in weights]
+        total = sum(weights)
+        if not total:
+            return 0.0
+        return sum(score * weight for score, weight in zip(self.scores, weights)) / total
+
+class TextBlobSentiment:
+    """One ``TextBlob`` per comment: the reference scores, and the fallback."""
+
+    name = 'textblob'
+
+    def score(self, comments):
+        from textblob import TextBlob  # slow to import, only needed here
+
+        return SentimentScores(TextBlob(comment).sentiment.polarity for comment in comments)
+
+class LexiconSentiment:
+    """Scores a whole batch with one sparse term-count matrix.
+
+    Uses TextBlob's own polarity lexicon: a comment's polarity is the mean
+    polarity of the lexicon words it contains, computed for all comments at
+    once as a sparse matrix-vector product. TextBlob's intensifiers
+    ("very good") and negation ("not good") are not applied, so scores of
+    comments that use them differ from ``TextBlobSentiment``.
+    """
+
+    name = 'vectorized'
+    TOKEN_PATTERN = r"(?u)\b\w+(?:['-]\w+)*\b"
+
+    def __init__(self):
+        import numpy as np
+        from sklearn.feature_extraction.text import CountVectorizer
+        from textblob.en import sentiment as lexicon
+
+        polarities = {}
+        for word, senses in lexicon.items():
+            if ' ' in word or not senses:
+                continue
+            # None holds the average over all senses of the word
+            values = [senses[None]] if None in senses else list(senses.values())
+            polarities[word.lower()] = sum(value[0] for value in values) / len(values)
+
+        vocabulary = sorted(polarities)
+        self._np = np
+        self._vectorizer = CountVectorizer(vocabulary=vocabulary, lowercase=True, token_pattern=self.TOKEN_PATTERN)
+        self._polarity = np.array([polarities[word] for word in vocabulary], dtype=np.float64)
+
+    def score(self, comments):
+        np = self._np
+        if not comments:
+            return SentimentScores([])
+        counts = self._vectorizer.transform(comments)
+        totals = counts @ self._polarity
+        matched = np.asarray(counts.sum(axis=1)).ravel()
+        scores = np.divide(totals, matched, out=np.zeros_like(totals), where=matched > 0)
+        return SentimentScores(np.clip(scores, -1.0, 1.0))
+
+_scorers = {}
+_scorers_lock = threading.Lock()
+
+def get_sentiment_scorer(backend=None):
+    """Return the shared scorer for ``backend`` ('auto', 'vectorized' or 'textblob').
+
+    'auto' uses the vectorized scorer and falls back to TextBlob when NumPy
+    or scikit-learn is not installed.
+    """
+    backend = backend or config.SENTIMENT_BACKEND
+    with _scorers_lock:
+        if backend not in _scorers:
+            if backend == 'textblob':
+                _scorers[backend] = TextBlobSentiment()
+            elif backend == 'vectorized':
+                _scorers[backend] = LexiconSentiment()
+            elif backend == 'auto':
+                try:
+                    _scorers[backend] = LexiconSentiment()
+                except ImportError as e:
+                    logging.info(f"Vectorized sentiment unavailable ({e}), using TextBlob")
+                    _scorers[backend] = TextBlobSentiment()
+            else:
+                raise ValueError(f"Unknown sentiment backend: {backend}")
+        return _scorers[backend]
+
+def score_comments(comments, backend=None):
+    """Score every comment in ``comments`` and return ``SentimentScores``."""
+    return get_sentiment_scorer(backend).score(list(comments))
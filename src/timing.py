@@ -0,0 +1,21 @@
+# timing.py
+
+import time
+
+class StartupTimer:
+    """Records named checkpoints relative to a start time for the --timing report."""
+
+    def __init__(self, start=None):
+        self.start = start if start is not None else time.perf_counter()
+        self.marks = []
+
+    def mark(self, label):
+        self.marks.append((label, time.perf_counter() - self.start))
+
+    def report(self):
+        rows = []
+        previous = 0.0
+        for label, elapsed in self.marks:
+            rows.append((label, elapsed - previous, elapsed))
+            previous = elapsed
+        return rows
@@ -0,0 +1,40 @@
+# tokens.py
+
+import logging
+import threading
+
+class ApproximateEncoder:
+    """Stands in for tiktoken's cl100k_base when it can't be loaded.
+
+    Every 4 characters count as one token, which is close to what OpenAI
+    models average on English text. Tokens are the 4-character slices
+    themselves, so ``decode`` inverts ``encode`` and truncation still works.
+    """
+
+    CHARS_PER_TOKEN = 4
+
+    def encode(self, text):
+        return [text[i:i + self.CHARS_PER_TOKEN] for i in range(0, len(text), self.CHARS_PER_TOKEN)]
+
+    def encode_ordinary_batch(self, texts):
+        return [self.encode(text) for text in texts]
+
+    def decode(self, tokens):
+        return "".join(tokens)
+
+_encoder = None
+_encoder_lock = threading.Lock()
+
+def get_encoder():
+    """The cl100k_base encoder, or an ``ApproximateEncoder`` when tiktoken or its encoding file can't be loaded."""
+    global _encoder
+    with _encoder_lock:
+        if _encoder is None:
+            try:
+                import tiktoken
+
+                _encoder = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:  # ImportError, or the encoding could not be downloaded
+                logging.info(f"Token counting unavailable ({e}), estimating 4 characters per token")
+                _encoder = ApproximateEncoder()
+        return _encoder
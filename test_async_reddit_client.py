@@ -0,0 +1,97 @@
+import asyncio
+
+import pytest
+
+from src.async_reddit_client import AsyncRedditClient
+from src.config import config
+from src.rate_limit import RequestScheduler
+
+class HTTPError(Exception):
+    pass
+
+class FakeResponse:
+    def __init__(self, status, body=None, headers=None):
+        self.status = status
+        self.body = body
+        self.headers = headers or {}
+        self.released = False
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+    async def json(self):
+        return self.body
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise HTTPError(self.status)
+
+    def release(self):
+        self.released = True
+
+class FakeSession:
+    """Replays canned responses: ``tokens`` for the token endpoint, ``responses`` for API GETs."""
+
+    def __init__(self, tokens, responses):
+        self.tokens = list(tokens)
+        self.responses = list(responses)
+        self.token_requests = 0
+        self.authorizations = []
+        self.served = []
+
+    def post(self, url, **kwargs):
+        self.token_requests += 1
+        return FakeResponse(200, self.tokens.pop(0))
+
+    async def get(self, url, params=None, headers=None):
+        self.authorizations.append(headers['Authorization'])
+        response = self.responses.pop(0)
+        self.served.append(response)
+        return response
+
+    async def close(self):
+        pass
+
+LISTING = {'data': {'children': [], 'after': None}}
+
+@pytest.fixture
+def make_client(monkeypatch):
+    monkeypatch.setattr(config, 'CACHE_ENABLED', False)
+    monkeypatch.setattr(config, 'SEARCH_INDEX_ENABLED', False)
+
+    def make(session):
+        scheduler = RequestScheduler(requests_per_minute=6000, burst=10, reserve=0, max_retries=2, backoff_base=0)
+        return AsyncRedditClient(offline=False, scheduler=scheduler, session=session)
+    return make
+
+def test_expired_token_is_renewed_once(make_client):
+    session = FakeSession([{'access_token': 'old', 'expires_in': 3600}, {'access_token': 'new', 'expires_in': 3600}],
+                          [FakeResponse(401), FakeResponse(200, LISTING)])
+    client = make_client(session)
+    assert asyncio.run(client._get('/r/python/hot', 'listing')) == LISTING
+    assert session.token_requests == 2
+    assert session.authorizations == ['bearer old', 'bearer new']
+    assert all(response.released for response in session.served)
+
+def test_second_401_is_raised(make_client):
+    session = FakeSession([{'access_token': 'a'}, {'access_token': 'b'}], [FakeResponse(401), FakeResponse(401)])
+    with pytest.raises(HTTPError):
+        asyncio.run(make_client(session)._get('/r/python/hot', 'listing'))
+
+def test_429_backs_off_and_retries(make_client):
+    session = FakeSession([{'access_token': 'a'}],
+                          [FakeResponse(429, headers={'Retry-After': '0'}), FakeResponse(429), FakeResponse(200, LISTING)])
+    client = make_client(session)
+    assert asyncio.run(client._get('/r/python/hot', 'listing')) == LISTING
+    assert client.scheduler.throttled == 2
+    assert session.token_requests == 1
+
+def test_429_gives_up_after_max_retries(make_client):
+    session = FakeSession([{'access_token': 'a'}], [FakeResponse(429) for _ in range(3)])
+    client = make_client(session)
+    with pytest.raises(HTTPError):
+        asyncio.run(client._get('/r/python/hot', 'listing'))
+    assert client.scheduler.throttled == 3
@@ -0,0 +1,19 @@
+from src.coins import CoinUniverse
+
+universe = CoinUniverse.load()
+
+def test_bare_tickers_match_in_upper_case():
+    assert universe.find("Bought more SOL and BTC today") == {'SOL', 'BTC'}
+    assert universe.find("that was the solution") == set()
+
+def test_ambiguous_tickers_need_a_prefix():
+    assert universe.find("OP said he sold everything") == set()
+    assert universe.find("Check the LINK NEAR the top, ETC") == set()
+    assert universe.find("Loading up on $OP and $link") == {'OP', 'LINK'}
+    assert universe.find("chainlink and the optimism network are up") == {'LINK', 'OP'}
+
+def test_everyday_words_are_not_coins():
+    assert universe.find("stay optimistic, optimism is key") == set()
+    assert universe.find("a stellar avalanche of ripples across the cosmos") == set()
+    assert universe.find("draw a polygon, pour the ether, watch Tron") == set()
+    assert universe.find("moving to the Cosmos Hub and Stellar Lumens") == {'ATOM', 'XLM'}